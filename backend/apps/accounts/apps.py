@@ -6,3 +6,7 @@ class AccountsConfig(AppConfig):
     name = 'apps.accounts'
     label = 'apps_accounts'
     verbose_name = 'Accounts'
+
+    def ready(self):
+        # connect therapist listing cache invalidation
+        from . import signals  # noqa: F401
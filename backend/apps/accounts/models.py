@@ -104,6 +104,9 @@ class User(AbstractBaseUser, PermissionsMixin):
         indexes = [
             models.Index(fields=["email"]),
             models.Index(fields=["token_version"]),
+            models.Index(fields=["role", "is_active"]),
+            # TherapistListView: counsellors, newest first
+            models.Index(fields=["role", "-date_joined", "-id"]),
         ]
 
     def __str__(self):
@@ -362,6 +365,9 @@ class CounsellorProfile(models.Model):
         verbose_name = "Counsellor Profile"
         verbose_name_plural = "Counsellor Profiles"
         ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["fees_per_session"]),
+        ]
 
     def clean(self):
         # role enforcement and basic validations
@@ -0,0 +1,9 @@
+from rest_framework.pagination import PageNumberPagination
+
+from apps.search.pagination import CountStrategyMixin
+
+
+class TherapistPagination(CountStrategyMixin, PageNumberPagination):
+    page_size = 20
+    page_size_query_param = "page_size"
+    max_page_size = 100
@@ -0,0 +1,133 @@
+"""
+Keep state derived from the account tables in step with writes.
+
+- the cached therapist directory (TherapistListView): handlers only bump a
+  generation counter, after commit; the next request rebuilds the payload
+- profile updated_at: also moved when the profile's user columns, M2M links or
+  linked option names change, so it is a complete Last-Modified for the
+  profile/therapist payloads (see conditional_response in views.py)
+"""
+from django.db.models.signals import post_init, post_save, post_delete, pre_delete, m2m_changed
+from django.dispatch import receiver
+from django.utils import timezone
+
+from apps.search.cache import bump_generation_on_commit, get_generation
+from .models import User, ClientProfile, CounsellorProfile, Specialization, AvailabilitySlot
+
+THERAPIST_LIST_GENERATION = "accounts:therapists-generation"
+
+# User columns that show up in the therapist payload
+THERAPIST_USER_FIELDS = {"email", "first_name", "last_name", "phone", "profile_picture", "role"}
+# User columns that show up in ProfileView / TherapistDetailView responses
+PROFILE_USER_FIELDS = THERAPIST_USER_FIELDS | {"bio", "gender", "date_of_birth"}
+
+
+def therapist_list_generation():
+    return get_generation(THERAPIST_LIST_GENERATION)
+
+
+def invalidate_therapist_list():
+    # after commit, or a directory read in between would cache the old rows under the new generation
+    bump_generation_on_commit(THERAPIST_LIST_GENERATION)
+
+
+def _profile_values(instance):
+    # read from __dict__ so deferred columns are not fetched
+    return {name: instance.__dict__.get(name) for name in PROFILE_USER_FIELDS}
+
+
+@receiver(post_init, sender=User)
+def remember_profile_values(sender, instance, **kwargs):
+    instance._loaded_profile_values = _profile_values(instance)
+
+
+def changed_user_fields(instance, created, update_fields):
+    """
+    User columns a save may have changed: all of them for a new row, else
+    ``update_fields`` or, for a full save(), the payload columns whose value
+    differs from what was loaded (so e.g. a password change touches nothing).
+    """
+    if created:
+        return PROFILE_USER_FIELDS
+    if update_fields is not None:
+        return set(update_fields)
+    loaded = instance._loaded_profile_values
+    return {name for name, value in _profile_values(instance).items() if value != loaded[name]}
+
+
+@receiver(post_save, sender=User)
+def therapist_user_changed(sender, instance, created, update_fields=None, **kwargs):
+    was_counsellor = instance._loaded_profile_values["role"] == User.Roles.COUNSELLOR
+    if instance.role != User.Roles.COUNSELLOR and not was_counsellor:
+        return
+    # e.g. last_login / token_version updates don't change the listing
+    if THERAPIST_USER_FIELDS.intersection(changed_user_fields(instance, created, update_fields)):
+        invalidate_therapist_list()
+
+
+@receiver(post_delete, sender=User)
+def therapist_user_deleted(sender, instance, **kwargs):
+    if instance.role == User.Roles.COUNSELLOR:
+        invalidate_therapist_list()
+
+
+@receiver(post_save, sender=CounsellorProfile)
+@receiver(post_delete, sender=CounsellorProfile)
+@receiver(post_save, sender=Specialization)
+@receiver(post_delete, sender=Specialization)
+@receiver(post_save, sender=AvailabilitySlot)
+@receiver(post_delete, sender=AvailabilitySlot)
+def therapist_profile_changed(sender, **kwargs):
+    invalidate_therapist_list()
+
+
+@receiver(m2m_changed, sender=CounsellorProfile.specializations.through)
+@receiver(m2m_changed, sender=CounsellorProfile.availability.through)
+def therapist_options_changed(sender, action, **kwargs):
+    if action in ("post_add", "post_remove", "post_clear"):
+        invalidate_therapist_list()
+
+
+def touch_profiles(model, **filters):
+    """Move updated_at without save(), so no post_save handlers fire again."""
+    model.objects.filter(**filters).update(updated_at=timezone.now())
+
+
+@receiver(post_save, sender=User)
+def touch_profile_on_user_change(sender, instance, created, update_fields=None, **kwargs):
+    changed = not created and PROFILE_USER_FIELDS.intersection(changed_user_fields(instance, created, update_fields))
+    # the values just saved are what the next save compares against
+    instance._loaded_profile_values = _profile_values(instance)
+    if not changed:
+        return
+    if instance.role == User.Roles.COUNSELLOR:
+        touch_profiles(CounsellorProfile, user=instance)
+    elif instance.role == User.Roles.CLIENT:
+        touch_profiles(ClientProfile, user=instance)
+
+
+@receiver(m2m_changed, sender=CounsellorProfile.specializations.through)
+@receiver(m2m_changed, sender=CounsellorProfile.availability.through)
+def touch_profile_on_options_change(sender, instance, action, reverse, pk_set, model, **kwargs):
+    if not reverse:
+        if action in ("post_add", "post_remove", "post_clear"):
+            touch_profiles(CounsellorProfile, pk=instance.pk)
+    elif action in ("post_add", "post_remove"):
+        touch_profiles(CounsellorProfile, pk__in=pk_set)
+    elif action == "pre_clear":
+        # the links are gone after the clear; touch the holders while we can find them
+        touch_profiles(CounsellorProfile, pk__in=instance.counsellors.values("pk"))
+
+
+@receiver(post_save, sender=Specialization)
+@receiver(pre_delete, sender=Specialization)
+def touch_profiles_on_specialization_change(sender, instance, created=False, **kwargs):
+    if not created:
+        touch_profiles(CounsellorProfile, specializations=instance)
+
+
+@receiver(post_save, sender=AvailabilitySlot)
+@receiver(pre_delete, sender=AvailabilitySlot)
+def touch_profiles_on_slot_change(sender, instance, created=False, **kwargs):
+    if not created:
+        touch_profiles(CounsellorProfile, availability=instance)
@@ -1,3 +1,6 @@
+from unittest.mock import patch
+
+from django.core.cache import cache
 from django.urls import reverse
 from django.utils import timezone
 from django.test import TestCase
@@ -12,6 +15,8 @@ from .models import (
     Specialization,
     AvailabilitySlot,
 )
+from .views import TherapistListView, therapist_queryset
+from apps.search.query_plans import QueryPlanAssertions
 
 #  1. UNIT TESTS
 
@@ -174,3 +179,255 @@ class AuthIntegrationFlowTests(APITestCase):
         logout_res = self.client.post(self.logout_url)
         self.assertEqual(logout_res.status_code, 200)
         self.assertEqual(logout_res.data["detail"], "Logged out.")
+
+
+class TherapistBatchViewTests(APITestCase):
+    def setUp(self):
+        self.client_user = User.objects.create_user(email="viewer@example.com", password="Test123", role="client")
+        self.client.force_authenticate(self.client_user)
+        anxiety = Specialization.objects.create(name="Anxiety")
+        morning = AvailabilitySlot.objects.create(name="Morning")
+        self.counsellors = []
+        for i in range(4):
+            user = User.objects.create_user(
+                email=f"c{i}@example.com", password="Test123", role="counsellor", first_name=f"C{i}"
+            )
+            profile = CounsellorProfile.objects.create(
+                user=user, fees_per_session=500 + i, license_number=f"LIC10{i}"
+            )
+            profile.specializations.add(anxiety)
+            profile.availability.add(morning)
+            self.counsellors.append(user)
+        self.url = reverse("therapist-batch")
+
+    def batch(self, ids):
+        return self.client.get(self.url, {"ids": ",".join(str(pk) for pk in ids)})
+
+    def test_matches_detail_payload_in_request_order(self):
+        ids = [self.counsellors[2].id, self.counsellors[0].id]
+        res = self.batch(ids)
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual([row["id"] for row in res.data["results"]], ids)
+        for row in res.data["results"]:
+            detail = self.client.get(reverse("therapist-detail", args=[row["id"]]))
+            self.assertEqual(row, detail.data)
+
+    def test_query_count_is_constant(self):
+        with self.assertNumQueries(3):
+            self.batch([self.counsellors[0].id])
+        with self.assertNumQueries(3):
+            self.batch([u.id for u in self.counsellors])
+
+    def test_missing_and_duplicate_ids(self):
+        res = self.batch([self.counsellors[1].id, self.client_user.id, 99999, self.counsellors[1].id])
+        self.assertEqual([row["id"] for row in res.data["results"]], [self.counsellors[1].id])
+        self.assertEqual(res.data["not_found"], [self.client_user.id, 99999])
+
+    def test_invalid_and_too_many_ids(self):
+        self.assertEqual(self.client.get(self.url, {"ids": "1,abc"}).status_code, 400)
+        self.assertEqual(self.client.get(self.url).status_code, 400)
+        with self.settings(THERAPIST_BATCH_MAX_IDS=2):
+            self.assertEqual(self.batch([1, 2, 3]).status_code, 400)
+
+
+class TherapistListViewTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.client.force_authenticate(
+            User.objects.create_user(email="viewer@example.com", password="Test123", role="client")
+        )
+        self.anxiety = Specialization.objects.create(name="Anxiety")
+        grief = Specialization.objects.create(name="Grief")
+        self.profiles = []
+        for i, (name, fee, spec) in enumerate([("Ann", 400, self.anxiety), ("Ben", 800, grief), ("Cal", 1200, self.anxiety)]):
+            user = User.objects.create_user(
+                email=f"{name.lower()}@example.com", password="Test123", role="counsellor", first_name=name
+            )
+            profile = CounsellorProfile.objects.create(user=user, fees_per_session=fee, license_number=f"LIC20{i}")
+            profile.specializations.add(spec)
+            self.profiles.append(profile)
+        self.url = reverse("therapist-list")
+
+    def names(self, params=None):
+        res = self.client.get(self.url, params or {})
+        self.assertEqual(res.status_code, 200)
+        rows = res.data["results"] if isinstance(res.data, dict) else res.data
+        return [row["first_name"] for row in rows]
+
+    def test_default_listing_is_an_array_newest_first(self):
+        res = self.client.get(self.url)
+        self.assertIsInstance(res.data, list)
+        self.assertEqual(self.names(), ["Cal", "Ben", "Ann"])
+
+    def test_pagination_is_opt_in(self):
+        res = self.client.get(self.url, {"page_size": 2})
+        self.assertEqual(res.data["count"], 3)
+        self.assertEqual([row["first_name"] for row in res.data["results"]], ["Cal", "Ben"])
+        self.assertEqual(self.names({"page_size": 2, "page": 2}), ["Ann"])
+        self.assertEqual(self.names({"page_size": 2, "specialization": "anxiety"}), ["Cal", "Ann"])
+
+    def test_pages_are_cached_one_by_one(self):
+        from apps.accounts import views
+        with patch.object(views, "therapist_payload", wraps=views.therapist_payload) as payload:
+            first = self.client.get(self.url, {"page_size": 1, "page": 2})
+        # only the rows of the page are loaded and built, not the whole directory
+        self.assertEqual(payload.call_count, 1)
+        self.assertEqual([row["first_name"] for row in first.data["results"]], ["Ben"])
+        with self.assertNumQueries(0):
+            again = self.client.get(self.url, {"page_size": 1, "page": 2})
+        self.assertEqual(again.data, first.data)
+        self.assertEqual(self.client.get(self.url, {"page_size": 1, "page": 9}).status_code, 404)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.profiles[1].fees_per_session = 850
+            self.profiles[1].save()
+        self.assertEqual(self.client.get(self.url, {"page_size": 1, "page": 2}).data["results"][0]["fees_per_session"], "850.00")
+
+    def test_filters(self):
+        self.assertEqual(self.names({"specialization": "anxiety,grief", "max_fee": "900"}), ["Ben", "Ann"])
+        self.assertEqual(self.names({"min_fee": "500"}), ["Cal", "Ben"])
+        self.assertEqual(self.names({"q": "an"}), ["Ann"])
+        self.assertEqual(self.client.get(self.url, {"min_fee": "cheap"}).status_code, 400)
+        for value in ("NaN", "Infinity", "-inf", "sNaN"):
+            res = self.client.get(self.url, {"max_fee": value})
+            self.assertEqual(res.status_code, 400, value)
+            self.assertEqual(res.data["detail"], "min_fee and max_fee must be numbers.")
+
+    def test_default_listing_is_cached_until_a_profile_changes(self):
+        self.client.get(self.url)
+        with self.assertNumQueries(0):
+            self.client.get(self.url)
+
+        profile = self.profiles[0]
+        with self.captureOnCommitCallbacks(execute=True):
+            profile.fees_per_session = 450
+            profile.save()
+            # the generation moves only once the write commits
+            self.assertEqual(self.client.get(self.url).data[2]["fees_per_session"], "400.00")
+        rows = {row["first_name"]: row for row in self.client.get(self.url).data}
+        self.assertEqual(rows["Ann"]["fees_per_session"], "450.00")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            profile.specializations.remove(self.anxiety)
+        rows = {row["first_name"]: row for row in self.client.get(self.url).data}
+        self.assertEqual(rows["Ann"]["specializations"], [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            profile.user.first_name = "Anna"
+            profile.user.save()
+        self.assertIn("Anna", self.names())
+
+        # a full save that changes nothing listed keeps the cache
+        with self.captureOnCommitCallbacks(execute=True):
+            profile.user.set_password("Other123")
+            profile.user.save()
+        with self.assertNumQueries(0):
+            self.client.get(self.url)
+
+        # a counsellor who stops being one leaves the listing
+        with self.captureOnCommitCallbacks(execute=True):
+            profile.user.role = "client"
+            profile.user.save()
+        self.assertNotIn("Anna", self.names())
+
+
+class ConditionalGetTests(APITestCase):
+    def setUp(self):
+        self.client_user = User.objects.create_user(
+            email="viewer@example.com", password="Test123", role="client", first_name="Vic"
+        )
+        ClientProfile.objects.create(user=self.client_user, agreed_terms=True)
+        self.client.force_authenticate(self.client_user)
+        self.counsellor = User.objects.create_user(
+            email="coun@example.com", password="Test123", role="counsellor", first_name="Cora"
+        )
+        self.profile = CounsellorProfile.objects.create(
+            user=self.counsellor, fees_per_session=600, license_number="LIC300"
+        )
+        self.detail_url = reverse("therapist-detail", args=[self.counsellor.id])
+        self.profile_url = reverse("profile")
+
+    def revalidate(self, url, etag):
+        return self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+    def test_detail_not_modified_uses_one_query(self):
+        first = self.client.get(self.detail_url)
+        self.assertEqual(first.status_code, 200)
+        self.assertIn("Last-Modified", first)
+        with self.assertNumQueries(1):
+            res = self.revalidate(self.detail_url, first["ETag"])
+        self.assertEqual(res.status_code, 304)
+        self.assertEqual(res["ETag"], first["ETag"])
+        res = self.client.get(self.detail_url, HTTP_IF_MODIFIED_SINCE=first["Last-Modified"])
+        self.assertEqual(res.status_code, 304)
+
+    def test_user_saves_touch_the_profile_only_for_payload_fields(self):
+        from django.contrib.auth.models import update_last_login
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        table = CounsellorProfile._meta.db_table
+
+        def profile_touches(save):
+            with CaptureQueriesContext(connection) as ctx:
+                save()
+            return [q for q in ctx.captured_queries if q["sql"].startswith(f'UPDATE "{table}"')]
+
+        user = User.objects.get(pk=self.counsellor.pk)
+        # login bookkeeping and full saves that change nothing shown leave the profile alone
+        self.assertEqual(profile_touches(lambda: update_last_login(None, user)), [])
+        user.set_password("Other123")
+        self.assertEqual(profile_touches(user.save), [])
+
+        user.first_name = "Coral"
+        self.assertEqual(len(profile_touches(user.save)), 1)
+        self.assertEqual(profile_touches(user.save), [])
+
+    def test_detail_etag_changes_with_profile_user_and_options(self):
+        etag = self.client.get(self.detail_url)["ETag"]
+
+        self.profile.specializations.add(Specialization.objects.create(name="Grief"))
+        res = self.revalidate(self.detail_url, etag)
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.data["specializations"][0]["name"], "Grief")
+
+        spec = Specialization.objects.get(name="Grief")
+        spec.name = "Grief & Loss"
+        spec.save()
+        res = self.revalidate(self.detail_url, res["ETag"])
+        self.assertEqual(res.data["specializations"][0]["name"], "Grief & Loss")
+
+        self.counsellor.first_name = "Corinne"
+        self.counsellor.save()
+        res = self.revalidate(self.detail_url, res["ETag"])
+        self.assertEqual(res.data["first_name"], "Corinne")
+
+    def test_profile_not_modified_until_edited(self):
+        first = self.client.get(self.profile_url)
+        self.assertEqual(first.status_code, 200)
+        with self.assertNumQueries(1):
+            self.assertEqual(self.revalidate(self.profile_url, first["ETag"]).status_code, 304)
+
+        self.client.patch(self.profile_url, {"first_name": "Victor"}, format="json")
+        res = self.revalidate(self.profile_url, first["ETag"])
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.data["first_name"], "Victor")
+
+    def test_unknown_counsellor_is_404(self):
+        self.assertEqual(self.client.get(reverse("therapist-detail", args=[99999])).status_code, 404)
+
+
+class TherapistQueryPlanTests(QueryPlanAssertions, TestCase):
+    """TherapistListView reads counsellors in index order, filtered or not."""
+
+    def filtered(self, **params):
+        return TherapistListView().filter_queryset(therapist_queryset(), params)
+
+    def test_listing(self):
+        self.assertIndexedPlan(therapist_queryset().order_by("-date_joined", "-id"))
+
+    def test_fee_filter(self):
+        self.assertIndexedPlan(self.filtered(min_fee="500", max_fee="900"))
+
+    def test_option_filter(self):
+        Specialization.objects.create(name="Anxiety")
+        self.assertIndexedPlan(self.filtered(specialization="anxiety"))
@@ -2,7 +2,8 @@
 from django.urls import path
 from .views import (
     SignupView, VerifyEmailView, ResendVerificationView, LoginView, TokenRefreshView,
-    ProfileView, ProfilePictureUploadView, LogoutView, TherapistListView, TherapistDetailView
+    ProfileView, ProfilePictureUploadView, LogoutView, TherapistListView, TherapistDetailView,
+    TherapistBatchView,
 )
 
 
@@ -16,6 +17,7 @@ urlpatterns = [
     path("profile/upload-photo/", ProfilePictureUploadView.as_view(), name="profile-upload-photo"),
     path("logout/", LogoutView.as_view(), name="auth-logout"),
     path("therapists/", TherapistListView.as_view(), name="therapist-list"),
+    path("therapists/batch/", TherapistBatchView.as_view(), name="therapist-batch"),
     path("therapists/<int:pk>/", TherapistDetailView.as_view(), name="therapist-detail"),
 ]
 
@@ -15,9 +15,16 @@ from django.conf import settings
 from rest_framework.permissions import AllowAny , IsAuthenticated
 from rest_framework_simplejwt.tokens import RefreshToken, TokenError
 from django.shortcuts import get_object_or_404
-from .models import ClientProfile, CounsellorProfile
+from .models import ClientProfile, CounsellorProfile, Specialization, AvailabilitySlot
 from typing import Optional
-from django.db.models import Prefetch
+from django.db.models import Prefetch, Q
+from django.core.cache import cache
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+from decimal import Decimal, InvalidOperation
+from .pagination import TherapistPagination
+from .signals import therapist_list_generation
+from apps.search.cache import option_list, cache_timeout
 from django.core.files.base import ContentFile
 from django.core.files.storage import default_storage
 import base64
@@ -345,86 +352,207 @@ class LoginView(APIView):
         return response
 
 
+def therapist_payload(user):
+    """
+    Counsellor payload shared by the therapist list/detail/batch views.
+    Prefetch counsellor_profile__specializations / __availability to avoid
+    two queries per counsellor.
+    """
+    prof = getattr(user, 'counsellor_profile', None)
+    data = {
+        'id': user.id,
+        'email': user.email,
+        'first_name': user.first_name,
+        'last_name': user.last_name,
+        'full_name': user.get_full_name(),
+        'phone': user.phone,
+        'profile_picture': user.profile_picture,
+    }
+    if prof:
+        data.update({
+            'license_number': prof.license_number,
+            'fees_per_session': str(prof.fees_per_session) if prof.fees_per_session is not None else None,
+            'experience': prof.experience,
+            'bio': prof.bio,
+            'is_verified_professional': prof.is_verified_professional,
+            'is_approved': prof.is_approved,
+            'specializations': [{'id': s.id, 'name': s.name} for s in prof.specializations.all()],
+            'availability': [{'id': a.id, 'name': a.name} for a in prof.availability.all()],
+        })
+    return data
+
+
+def therapist_queryset():
+    """Counsellors with everything therapist_payload() reads, in three queries."""
+    return User.objects.filter(role=User.Roles.COUNSELLOR).select_related('counsellor_profile').prefetch_related(
+        Prefetch('counsellor_profile__specializations'),
+        Prefetch('counsellor_profile__availability')
+    )
+
+
 class TherapistListView(APIView):
     """
     GET /api/auth/therapists/
-    Returns a list of counsellors with their profile information.
+    Returns a list of counsellors with their profile information, newest first.
+
+    Optional filters: q (name), specialization / availability (comma-separated
+    names, any-of), min_fee, max_fee. Pass page and/or page_size to get a
+    paginated {count, next, previous, results} response instead of the array.
+    The unfiltered listing, and each page of it, is built once and cached
+    until a counsellor, profile or option changes (see signals.py).
     """
     permission_classes = [IsAuthenticated]
+    pagination_class = TherapistPagination
+    filter_params = ('q', 'specialization', 'availability', 'min_fee', 'max_fee')
 
     def get(self, request):
-        # Only include users with role counsellor
-        qs = User.objects.filter(role=User.Roles.COUNSELLOR)
-        # Prefetch related counsellor_profile and m2m fields
-        qs = qs.select_related('counsellor_profile').prefetch_related(
-            Prefetch('counsellor_profile__specializations'),
-            Prefetch('counsellor_profile__availability')
-        )
+        params = request.query_params
+        paginated = 'page' in params or 'page_size' in params
+        if not any(params.get(name) for name in self.filter_params):
+            return Response(self.cached_page(request) if paginated else self.cached_listing())
 
-        result = []
-        for u in qs:
-            prof = getattr(u, 'counsellor_profile', None)
-            item = {
-                'id': u.id,
-                'email': u.email,
-                'first_name': u.first_name,
-                'last_name': u.last_name,
-                'full_name': u.get_full_name(),
-                'phone': u.phone,
-                'profile_picture': u.profile_picture,
-            }
-            if prof:
-                item.update({
-                    'license_number': prof.license_number,
-                    'fees_per_session': str(prof.fees_per_session) if prof.fees_per_session is not None else None,
-                    'experience': prof.experience,
-                    'bio': prof.bio,
-                    'is_verified_professional': prof.is_verified_professional,
-                    'is_approved': prof.is_approved,
-                    'specializations': [{'id': s.id, 'name': s.name} for s in prof.specializations.all()],
-                    'availability': [{'id': a.id, 'name': a.name} for a in prof.availability.all()],
-                })
-            result.append(item)
-
-        return Response(result)
+        try:
+            queryset = self.filter_queryset(therapist_queryset(), params)
+        except (InvalidOperation, ValueError):
+            return Response({'detail': 'min_fee and max_fee must be numbers.'}, status=status.HTTP_400_BAD_REQUEST)
+        if not paginated:
+            return Response([therapist_payload(u) for u in queryset])
+        return self.paginated_response(queryset, request)
+
+    def paginated_response(self, queryset, request):
+        paginator = self.pagination_class()
+        page = paginator.paginate_queryset(queryset, request, view=self)
+        return paginator.get_paginated_response([therapist_payload(u) for u in page])
+
+    def filter_queryset(self, queryset, params):
+        queryset = queryset.order_by('-date_joined', '-id')
+        q = (params.get('q') or '').strip()
+        if q:
+            for word in q.split():
+                queryset = queryset.filter(Q(first_name__icontains=word) | Q(last_name__icontains=word))
+        options = (('specialization', 'specializations', Specialization), ('availability', 'availability', AvailabilitySlot))
+        for param, field, model in options:
+            names = {name.strip().lower() for name in (params.get(param) or '').split(',') if name.strip()}
+            if names:
+                # resolve names against the cached option list (case-insensitive) so
+                # the filter is an indexed lookup on the link table, not a LIKE scan
+                ids = [row['id'] for row in option_list(model)[0] if row['name'].lower() in names]
+                # subquery instead of a join + DISTINCT on the users
+                queryset = queryset.filter(
+                    counsellor_profile__in=CounsellorProfile.objects.filter(**{f'{field}__in': ids})
+                )
+        for param, lookup in (('min_fee', 'gte'), ('max_fee', 'lte')):
+            if params.get(param):
+                fee = Decimal(params[param])
+                if not fee.is_finite():
+                    # NaN / Infinity parse as decimals but aren't fees
+                    raise ValueError(param)
+                queryset = queryset.filter(**{f'counsellor_profile__fees_per_session__{lookup}': fee})
+        return queryset
+
+    @staticmethod
+    def listing_cache_timeout():
+        return cache_timeout(getattr(settings, "THERAPIST_LIST_CACHE_TIMEOUT", 300))
+
+    def cached_listing(self):
+        key = f"accounts:therapists:{therapist_list_generation()}"
+        rows = cache.get(key)
+        if rows is None:
+            rows = [therapist_payload(u) for u in therapist_queryset().order_by('-date_joined', '-id')]
+            cache.set(key, rows, self.listing_cache_timeout())
+        return rows
+
+    def cached_page(self, request):
+        """
+        One page of the unfiltered listing, cached on its own under the
+        generation, so a page request reads and builds only that page.
+        """
+        # next/previous links are absolute and keep the other params
+        url = hashlib.sha1(request.build_absolute_uri().encode()).hexdigest()
+        key = f"accounts:therapists:{therapist_list_generation()}:page:{url}"
+        data = cache.get(key)
+        if data is None:
+            data = self.paginated_response(therapist_queryset().order_by('-date_joined', '-id'), request).data
+            cache.set(key, data, self.listing_cache_timeout())
+        return data
+
+
+# User columns rendered by TherapistDetailView; part of its ETag
+THERAPIST_DETAIL_USER_FIELDS = ('email', 'first_name', 'last_name', 'phone', 'profile_picture')
+# User columns rendered by ProfileView; part of its ETag
+PROFILE_USER_FIELDS = THERAPIST_DETAIL_USER_FIELDS + ('bio', 'gender', 'date_of_birth')
+
+
+def conditional_response(request, validators, updated_at, build):
+    """
+    Answer a GET with 304 when the client's If-None-Match / If-Modified-Since
+    still matches, otherwise with build()'s payload.
+
+    ``validators`` is everything the payload depends on that can change without
+    moving ``updated_at`` (the user row, see signals.py for what does move it);
+    both come from one cheap query, so a 304 never loads M2Ms or serializes.
+    """
+    etag = '"%s"' % hashlib.sha1(repr((validators, updated_at)).encode()).hexdigest()[:20]
+    last_modified = int(updated_at.timestamp()) if updated_at else None
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        response = Response(build())
+    response['ETag'] = etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified)
+    # per-user data: browsers may keep it but must revalidate every time
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
 
 
 class TherapistDetailView(APIView):
     """
     GET /api/auth/therapists/<id>/
     Returns full counsellor profile for a single therapist.
+    Supports conditional GET (ETag / Last-Modified, 304 when unchanged).
     """
     permission_classes = [IsAuthenticated]
 
     def get(self, request, pk):
-        try:
-            user = User.objects.select_related('counsellor_profile').get(id=pk, role=User.Roles.COUNSELLOR)
-        except User.DoesNotExist:
+        row = User.objects.filter(id=pk, role=User.Roles.COUNSELLOR).values_list(
+            *THERAPIST_DETAIL_USER_FIELDS, 'counsellor_profile__updated_at'
+        ).first()
+        if row is None:
             return Response({'detail': 'Counsellor not found.'}, status=404)
 
-        prof = getattr(user, 'counsellor_profile', None)
-        data = {
-            'id': user.id,
-            'email': user.email,
-            'first_name': user.first_name,
-            'last_name': user.last_name,
-            'full_name': user.get_full_name(),
-            'phone': user.phone,
-            'profile_picture': user.profile_picture,
-        }
-        if prof:
-            data.update({
-                'license_number': prof.license_number,
-                'fees_per_session': str(prof.fees_per_session) if prof.fees_per_session is not None else None,
-                'experience': prof.experience,
-                'bio': prof.bio,
-                'is_verified_professional': prof.is_verified_professional,
-                'is_approved': prof.is_approved,
-                'specializations': [{'id': s.id, 'name': s.name} for s in prof.specializations.all()],
-                'availability': [{'id': a.id, 'name': a.name} for a in prof.availability.all()],
-            })
+        def build():
+            return therapist_payload(therapist_queryset().get(id=pk))
 
-        return Response(data)
+        return conditional_response(request, (pk,) + row[:-1], row[-1], build)
+
+
+class TherapistBatchView(APIView):
+    """
+    GET /api/auth/therapists/batch/?ids=3,7,12
+    Returns the TherapistDetailView payload for up to THERAPIST_BATCH_MAX_IDS
+    counsellor user ids in one request (three queries whatever the count).
+    Response: { "results": [...in request order...], "not_found": [ids] }
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        max_ids = getattr(settings, "THERAPIST_BATCH_MAX_IDS", 50)
+        raw = [part.strip() for part in (request.query_params.get('ids') or '').split(',') if part.strip()]
+        try:
+            # keep the caller's order, drop duplicates
+            ids = list(dict.fromkeys(int(part) for part in raw))
+        except ValueError:
+            return Response({'detail': 'ids must be a comma-separated list of integers.'}, status=status.HTTP_400_BAD_REQUEST)
+        if not ids:
+            return Response({'detail': 'ids is required.'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(ids) > max_ids:
+            return Response({'detail': f'At most {max_ids} ids per request.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        users = therapist_queryset().in_bulk(ids)
+        return Response({
+            'results': [therapist_payload(users[pk]) for pk in ids if pk in users],
+            'not_found': [pk for pk in ids if pk not in users],
+        })
 
 
 
@@ -552,8 +680,18 @@ class ProfileView(APIView):
             return CounsellorProfileSerializer(profile, *args, **kwargs)
 
     def get(self, request):
-        serializer = self._get_serializer_for_user(request.user)
-        return Response(serializer.data)
+        # one query for the validators; the payload is only built on a cache miss
+        user = request.user
+        profile_model = ClientProfile if user.role == user.Roles.CLIENT else CounsellorProfile
+        updated_at = profile_model.objects.filter(user=user).values_list('updated_at', flat=True).first()
+        if updated_at is None:
+            serializer = self._get_serializer_for_user(user)
+            return Response(serializer.data)
+
+        validators = (user.pk, user.role) + tuple(getattr(user, name) for name in PROFILE_USER_FIELDS)
+        return conditional_response(
+            request, validators, updated_at, lambda: self._get_serializer_for_user(user).data
+        )
 
     def patch(self, request):
         # Normalize incoming data: accept friendly frontend keys like 'fullName'
@@ -5,5 +5,6 @@ class AppointmentsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.appointments'
 
-
-
+    def ready(self):
+        # connect availability calendar maintenance signals
+        from . import signals  # noqa: F401
@@ -0,0 +1,393 @@
+"""
+Counsellor availability: free/busy intervals and bookable slots.
+
+A counsellor's calendar combines three sources:
+  - weekly working windows, parsed from the names of their AvailabilitySlot
+    options ("Mon - Morning", "Weekdays (9 AM - 5 PM)", "evenings", ...)
+  - UnavailableDate rows (whole days off)
+  - booked appointments (pending or confirmed), kept as a sorted list of
+    (start, end, appointment id) intervals
+
+Calendars are held per process by the module-level ``availability`` engine and
+keyed by counsellor user id. Each counsellor has a generation counter in the
+Django cache; a calendar is re-read (in grouped queries, several counsellors
+at once) when its generation moved. Appointment writes patch the in-process
+calendar directly and bump the generation, so other processes re-read while
+this one does not (see signals.py). With a per-process cache backend
+calendars are also re-read once older than LOCAL_CACHE_MAX_AGE.
+"""
+import bisect
+import re
+import threading
+import time as clock
+from datetime import date, datetime, time, timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from apps.accounts.models import CounsellorProfile, UnavailableDate
+from apps.search.cache import bump_generation, get_generations, adopts, expired
+from .models import Appointment
+
+# appointments in these states hold their time
+BLOCKING_STATUSES = (Appointment.Status.PENDING, Appointment.Status.CONFIRMED)
+
+ALL_DAYS = frozenset(range(7))
+WEEKDAYS = frozenset(range(5))
+WEEKENDS = frozenset((5, 6))
+DAY_NAMES = ("mon", "tue", "wed", "thu", "fri", "sat", "sun")
+
+_TIME_RANGE = re.compile(
+    r"(\d{1,2})(?::(\d{2}))?\s*(am|pm)?\s*(?:-|to)\s*(\d{1,2})(?::(\d{2}))?\s*(am|pm)"
+)
+
+
+def periods():
+    """Named parts of the day, as (start hour, end hour)."""
+    return getattr(settings, "AVAILABILITY_PERIODS", {
+        "morning": (9, 12),
+        "afternoon": (12, 17),
+        "evening": (18, 22),
+    })
+
+
+def day_hours():
+    """Working hours for options that name days but no time (and for counsellors without options)."""
+    return getattr(settings, "AVAILABILITY_DAY_HOURS", (9, 18))
+
+
+def _hour(value, minutes, meridiem):
+    hour = int(value) % 12 if meridiem else int(value)
+    if meridiem == "pm":
+        hour += 12
+    return time(hour, int(minutes or 0)) if hour < 24 else time.max
+
+
+def parse_slot(name):
+    """
+    Weekly windows of an availability option as [(weekdays, start, end)].
+
+    Days: mon..sun, weekday(s), weekend(s); none means every day. Times: an
+    explicit range ("9 AM - 5 PM"), or period names from AVAILABILITY_PERIODS
+    (an "s" suffix is fine); none means AVAILABILITY_DAY_HOURS.
+    """
+    text = name.lower()
+    words = re.findall(r"[a-z]+", text)
+    days = set()
+    for word in words:
+        if word.startswith("weekday"):
+            days |= WEEKDAYS
+        elif word.startswith("weekend"):
+            days |= WEEKENDS
+        elif word[:3] in DAY_NAMES and (len(word) == 3 or word.endswith("day")):
+            days.add(DAY_NAMES.index(word[:3]))
+    days = frozenset(days) or ALL_DAYS
+
+    match = _TIME_RANGE.search(text)
+    if match:
+        h1, m1, ap1, h2, m2, ap2 = match.groups()
+        return [(days, _hour(h1, m1, ap1 or ap2), _hour(h2, m2, ap2))]
+
+    named = periods()
+    hours = [named[word.rstrip("s")] for word in words if word.rstrip("s") in named]
+    if not hours:
+        hours = [day_hours()]
+    return [(days, time(start), time(end) if end < 24 else time.max) for start, end in hours]
+
+
+def _merge(intervals):
+    """Sorted, non-overlapping union of (start, end) pairs."""
+    merged = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def _subtract(free, busy):
+    """free minus busy; both sorted (start, end) lists, busy may overlap itself."""
+    result = []
+    busy = _merge(busy)
+    i = 0
+    for start, end in free:
+        while i < len(busy) and busy[i][1] <= start:
+            i += 1
+        j = i
+        while j < len(busy) and busy[j][0] < end:
+            if busy[j][0] > start:
+                result.append((start, busy[j][0]))
+            start = max(start, busy[j][1])
+            j += 1
+        if start < end:
+            result.append((start, end))
+    return result
+
+
+def _ceil_to_grid(moment, step):
+    """First boundary of the epoch-aligned ``step``-minute grid at or after ``moment``."""
+    seconds = step * 60
+    stamp = -(-moment.timestamp() // seconds) * seconds
+    return datetime.fromtimestamp(stamp, tz=moment.tzinfo)
+
+
+def _clock_spans(spans, day):
+    """Aware (start, end) pairs as local [HH:MM, HH:MM], clipped to ``day``."""
+    clocks = []
+    for start, end in spans:
+        start, end = timezone.localtime(start), timezone.localtime(end)
+        begin = "00:00" if start.date() < day else start.strftime("%H:%M")
+        finish = "24:00" if end.date() > day else end.strftime("%H:%M")
+        clocks.append([begin, finish])
+    return clocks
+
+
+class CounsellorCalendar:
+    """Free/busy state of one counsellor. Build through ``availability``."""
+
+    def __init__(self, counsellor_id, slot_names=(), unavailable=None, bookings=()):
+        self.counsellor_id = counsellor_id
+        # weekday -> sorted, merged [(start time, end time)]
+        windows = {day: [] for day in range(7)}
+        for name in slot_names or ():
+            for days, start, end in parse_slot(name):
+                for day in days:
+                    windows[day].append((start, end))
+        if not slot_names:
+            start, end = day_hours()
+            for day in range(7):
+                windows[day].append((time(start), time(end) if end < 24 else time.max))
+        self.windows = {day: _merge(spans) for day, spans in windows.items()}
+        self.unavailable = dict(unavailable or {})  # date -> reason
+        self._busy = sorted(bookings)  # [(start, end, appointment id)]
+        self._longest = max((end - start for start, end, _ in self._busy), default=timedelta(0))
+
+    # ------------------------------------------------------------------
+    # incremental maintenance
+    # ------------------------------------------------------------------
+    def add_booking(self, start, end, appointment_id):
+        bisect.insort(self._busy, (start, end, appointment_id))
+        self._longest = max(self._longest, end - start)
+
+    def remove_booking(self, appointment_id):
+        self._busy = [entry for entry in self._busy if entry[2] != appointment_id]
+
+    # ------------------------------------------------------------------
+    # queries
+    # ------------------------------------------------------------------
+    def busy_between(self, start, end, exclude=None):
+        """Bookings overlapping [start, end) as [(start, end, appointment id)], by start."""
+        # nothing starting before start - longest can still reach start
+        lo = bisect.bisect_left(self._busy, (start - self._longest,))
+        hi = bisect.bisect_left(self._busy, (end,))
+        return [
+            entry for entry in self._busy[lo:hi]
+            if entry[1] > start and entry[2] != exclude
+        ]
+
+    def conflicts(self, start, end, exclude=None):
+        """True if a booking other than ``exclude`` overlaps [start, end)."""
+        return bool(self.busy_between(start, end, exclude))
+
+    def working_hours(self, day):
+        """The day's working windows as aware (start, end) datetimes."""
+        tz = timezone.get_current_timezone()
+        spans = []
+        for start, end in self.windows[day.weekday()]:
+            begin = timezone.make_aware(datetime.combine(day, start), tz)
+            if end == time.max:
+                finish = timezone.make_aware(datetime.combine(day + timedelta(days=1), time.min), tz)
+            else:
+                finish = timezone.make_aware(datetime.combine(day, end), tz)
+            spans.append((begin, finish))
+        return spans
+
+    def intervals(self, day, now=None):
+        """
+        (busy, free, reason) for one day: busy and free as sorted (start, end)
+        datetimes, reason set when nothing on the day is bookable.
+        """
+        now = now or timezone.now()
+        if day < timezone.localdate(now):
+            return [], [], "Date is in the past."
+        if day in self.unavailable:
+            return [], [], self.unavailable[day] or "Counsellor is not available on this date."
+        hours = self.working_hours(day)
+        if not hours:
+            return [], [], "Counsellor does not work on this day."
+        day_start, day_end = hours[0][0], hours[-1][1]
+        busy = [(start, end) for start, end, _ in self.busy_between(day_start, day_end)]
+        # nothing bookable before now
+        hours = [(max(start, now), end) for start, end in hours if end > now]
+        return busy, _subtract(hours, busy), None
+
+    def day(self, day, duration_minutes=60, now=None):
+        """
+        Availability of one day: busy and free intervals and the start times
+        of bookable slots of ``duration_minutes``. Slots follow the booking
+        grid (see booking.py), so each one passes validate_booking_grid.
+        """
+        from .booking import duration_on_grid, grid_minutes  # booking imports this module
+
+        result = {"date": day.isoformat(), "available": False, "busy": [], "free": [], "slots": []}
+        busy, free, reason = self.intervals(day, now)
+        step = grid_minutes()
+        if not reason and not duration_on_grid(duration_minutes):
+            reason = f"Duration must be a positive multiple of {step} minutes."
+        if reason:
+            result["reason"] = reason
+            return result
+
+        length = timedelta(minutes=duration_minutes)
+        slots = []
+        for start, end in free:
+            slot = _ceil_to_grid(start, step)
+            while slot + length <= end:
+                slots.append(slot)
+                slot += timedelta(minutes=step)
+
+        result.update(
+            available=bool(slots),
+            busy=[{"start": start.isoformat(), "end": end.isoformat()} for start, end in busy],
+            free=[{"start": start.isoformat(), "end": end.isoformat()} for start, end in free],
+            slots=[slot.isoformat() for slot in slots],
+        )
+        if not slots:
+            result["reason"] = "No free slot of this length on this date."
+        return result
+
+    def compact_days(self, date_from, date_to, now=None):
+        """
+        {ISO date: {"busy": [[HH:MM, HH:MM], ...], "free": [...]}} in local time,
+        clipped to the day ("24:00" for midnight at the end); days with
+        nothing bookable carry an "off" reason instead of free time.
+        """
+        now = now or timezone.now()
+        result = {}
+        for offset in range((date_to - date_from).days + 1):
+            day = date_from + timedelta(days=offset)
+            busy, free, reason = self.intervals(day, now)
+            entry = {"busy": _clock_spans(busy, day), "free": _clock_spans(free, day)}
+            if reason:
+                entry["off"] = reason
+            result[day.isoformat()] = entry
+        return result
+
+    def days(self, date_from, date_to, duration_minutes=60, now=None):
+        now = now or timezone.now()
+        span = (date_to - date_from).days
+        return [self.day(date_from + timedelta(days=i), duration_minutes, now) for i in range(span + 1)]
+
+
+def _generation_key(counsellor_id):
+    return f"availability:generation:{counsellor_id}"
+
+
+class AvailabilityEngine:
+    """Per-process calendars, re-read when their generation moves. Use ``availability``."""
+
+    # bookings further back than this are not loaded (past days aren't bookable)
+    lookback = timedelta(days=1)
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._calendars = {}  # counsellor user id -> (generation, CounsellorCalendar, built at)
+
+    def reset(self):
+        with self._lock:
+            self._calendars.clear()
+
+    def calendar(self, counsellor_id):
+        return self.calendars([counsellor_id])[counsellor_id]
+
+    def calendars(self, counsellor_ids):
+        """{counsellor user id: CounsellorCalendar}; stale ones are re-read together."""
+        counsellor_ids = list(dict.fromkeys(counsellor_ids))
+        found = get_generations([_generation_key(pk) for pk in counsellor_ids])
+        generations = {pk: found[_generation_key(pk)] for pk in counsellor_ids}
+        with self._lock:
+            stale = [
+                pk for pk in counsellor_ids
+                if pk not in self._calendars or self._calendars[pk][0] != generations[pk]
+                or expired(self._calendars[pk][2])
+            ]
+            if stale:
+                built_at = clock.monotonic()
+                for pk, calendar in self._load(stale).items():
+                    self._calendars[pk] = (generations[pk], calendar, built_at)
+            return {pk: self._calendars[pk][1] for pk in counsellor_ids}
+
+    def booked(self, counsellor_ids):
+        """(counsellor_id, start, minutes, id) of the bookings that can still block a slot."""
+        return Appointment.objects.filter(
+            counsellor_id__in=counsellor_ids,
+            status__in=BLOCKING_STATUSES,
+            appointment_date__gte=timezone.now() - self.lookback,
+        ).order_by().values_list("counsellor_id", "appointment_date", "duration_minutes", "id")  # calendars sort
+
+    def _load(self, counsellor_ids):
+        """Build calendars with one query per source for all of these counsellors."""
+        names, unavailable, bookings = {}, {}, {}
+        links = CounsellorProfile.availability.through.objects.filter(
+            counsellorprofile__user_id__in=counsellor_ids
+        ).values_list("counsellorprofile__user_id", "availabilityslot__name")
+        for pk, name in links:
+            names.setdefault(pk, []).append(name)
+
+        today = timezone.localdate()
+        days_off = UnavailableDate.objects.filter(
+            counsellor_id__in=counsellor_ids, date__gte=today
+        ).values_list("counsellor_id", "date", "reason")
+        for pk, day, reason in days_off:
+            unavailable.setdefault(pk, {})[day] = reason
+
+        for pk, start, minutes, appointment_id in self.booked(counsellor_ids):
+            bookings.setdefault(pk, []).append((start, start + timedelta(minutes=minutes), appointment_id))
+
+        return {
+            pk: CounsellorCalendar(pk, names.get(pk, ()), unavailable.get(pk), bookings.get(pk, ()))
+            for pk in counsellor_ids
+        }
+
+    def booking_changed(self, appointment_id, counsellor_ids, interval=None, counsellor_id=None):
+        """
+        Apply an appointment write to the calendars of ``counsellor_ids`` (its
+        counsellor before and after the write); call after commit. ``interval``
+        is the (start, end) it now blocks for ``counsellor_id``, None once it
+        is cancelled, completed or deleted.
+        """
+        with self._lock:
+            for pk in set(counsellor_ids) - {None}:
+                cached = self._calendars.get(pk)
+                in_sync = cached is not None and cached[0] == cache.get(_generation_key(pk), 0)
+                generation = bump_generation(_generation_key(pk))
+                if not in_sync or not adopts(cached[0], generation):
+                    continue
+                previous, calendar, built_at = cached
+                calendar.remove_booking(appointment_id)
+                if interval is not None and pk == counsellor_id:
+                    calendar.add_booking(interval[0], interval[1], appointment_id)
+                # only our own write moved it, and it is applied -- no reason to re-read
+                self._calendars[pk] = (generation, calendar, built_at)
+
+    def invalidate(self, counsellor_ids):
+        """Re-read these counsellors' calendars on next use (days off, options changed)."""
+        for pk in set(counsellor_ids):
+            bump_generation(_generation_key(pk))
+
+
+availability = AvailabilityEngine()
+
+
+def date_range(params, max_days=None):
+    """(date_from, date_to) from ISO query params; date_to defaults to date_from. Raises ValueError."""
+    date_from = date.fromisoformat((params.get("date_from") or "").strip())
+    raw_to = (params.get("date_to") or "").strip()
+    date_to = date.fromisoformat(raw_to) if raw_to else date_from
+    max_days = max_days or getattr(settings, "AVAILABILITY_MAX_DAYS", 31)
+    if date_to < date_from or (date_to - date_from).days >= max_days:
+        raise ValueError("date range")
+    return date_from, date_to
@@ -0,0 +1,135 @@
+"""
+Race-free booking.
+
+Every pending or confirmed appointment holds one SlotReservation row per
+booking-grid cell it overlaps. Booking and rescheduling write the appointment
+and insert its reservations (a single multi-row INSERT) in one transaction;
+if any cell is already held the unique constraint fails the INSERT and the
+whole transaction rolls back. There is no read-then-write check to race with.
+
+Cells are BOOKING_GRID_MINUTES long (default 15) and aligned to the epoch.
+An appointment that started or ended off the grid would hold the partial
+cells too and clash with a back-to-back neighbour, so the create and
+reschedule serializers only accept times on the grid (see on_grid()).
+"""
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+
+from .availability import BLOCKING_STATUSES
+from .models import Appointment, SlotReservation
+
+
+class SlotTaken(Exception):
+    """The counsellor already has a booking overlapping the requested time."""
+
+
+# SlotReservation's unique (counsellor, slot_start) constraint
+SLOT_CONSTRAINT = "unique_counsellor_slot"
+
+
+def grid_minutes():
+    return getattr(settings, "BOOKING_GRID_MINUTES", 15)
+
+
+def start_on_grid(start):
+    """True if start falls on a grid cell boundary."""
+    return not start.microsecond and int(start.timestamp()) % (grid_minutes() * 60) == 0
+
+
+def duration_on_grid(duration_minutes):
+    """True if duration_minutes is a positive whole number of grid cells."""
+    return duration_minutes > 0 and duration_minutes % grid_minutes() == 0
+
+
+def on_grid(start, duration_minutes):
+    """True if [start, start + duration) covers whole grid cells only."""
+    return start_on_grid(start) and duration_on_grid(duration_minutes)
+
+
+def slot_starts(start, duration_minutes):
+    """Starts of the grid cells overlapping [start, start + duration)."""
+    step = grid_minutes() * 60
+    begin = start.timestamp()
+    end = begin + duration_minutes * 60
+    cell = int(begin // step) * step
+    starts = []
+    while cell < end:
+        starts.append(datetime.fromtimestamp(cell, tz=dt_timezone.utc))
+        cell += step
+    return starts
+
+
+def is_slot_clash(exc):
+    """True if an IntegrityError came from the slot constraint, not some other one."""
+    # psycopg names the constraint; SQLite names its columns, MySQL its key
+    name = getattr(getattr(exc.__cause__, "diag", None), "constraint_name", None)
+    if name is not None:
+        return name == SLOT_CONSTRAINT
+    table = SlotReservation._meta.db_table
+    message = str(exc)
+    return SLOT_CONSTRAINT in message or f"{table}.counsellor_id, {table}.slot_start" in message
+
+
+def _reservations(appointment):
+    return [
+        SlotReservation(counsellor_id=appointment.counsellor_id, slot_start=start, appointment=appointment)
+        for start in slot_starts(appointment.appointment_date, appointment.duration_minutes)
+    ]
+
+
+def book(**fields):
+    """Create an appointment and reserve its time. Raises SlotTaken."""
+    try:
+        with transaction.atomic():
+            appointment = Appointment.objects.create(**fields)
+            if appointment.status in BLOCKING_STATUSES:
+                SlotReservation.objects.bulk_create(_reservations(appointment))
+    except IntegrityError as exc:
+        if not is_slot_clash(exc):
+            raise
+        raise SlotTaken from exc
+    return appointment
+
+
+def reschedule(appointment, start, duration_minutes):
+    """Move an appointment, swapping its reservations atomically. Raises SlotTaken."""
+    previous = appointment.appointment_date, appointment.duration_minutes
+    try:
+        with transaction.atomic():
+            appointment.slot_reservations.all().delete()
+            appointment.appointment_date = start
+            appointment.duration_minutes = duration_minutes
+            appointment.save(update_fields=['appointment_date', 'duration_minutes', 'updated_at'])
+            if appointment.status in BLOCKING_STATUSES:
+                SlotReservation.objects.bulk_create(_reservations(appointment))
+    except IntegrityError as exc:
+        appointment.appointment_date, appointment.duration_minutes = previous
+        if not is_slot_clash(exc):
+            raise
+        raise SlotTaken from exc
+    return appointment
+
+
+def release(appointment):
+    """Free the time of an appointment that no longer blocks it."""
+    SlotReservation.objects.filter(appointment=appointment).delete()
+
+
+def rebuild(appointments):
+    """
+    Recreate the reservations of these appointments (earliest booked wins);
+    returns the ids that overlap an earlier booking and were left without.
+    """
+    clashes = []
+    for appointment in appointments.filter(status__in=BLOCKING_STATUSES).order_by('created_at', 'id'):
+        try:
+            with transaction.atomic():
+                release(appointment)
+                SlotReservation.objects.bulk_create(_reservations(appointment))
+        except IntegrityError as exc:
+            if not is_slot_clash(exc):
+                raise
+            clashes.append(appointment.id)
+    return clashes
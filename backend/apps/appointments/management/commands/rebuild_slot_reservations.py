@@ -0,0 +1,18 @@
+# apps/appointments/management/commands/rebuild_slot_reservations.py
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from apps.appointments.booking import rebuild
+from apps.appointments.models import Appointment
+
+
+class Command(BaseCommand):
+    help = "Recreate slot reservations for upcoming pending/confirmed appointments (e.g. after deploying them)."
+
+    def handle(self, *args, **options):
+        clashes = rebuild(Appointment.objects.filter(appointment_date__gte=timezone.now()))
+        if clashes:
+            self.stdout.write(self.style.WARNING(
+                f"Already double-booked, left without reservations: {', '.join(map(str, clashes))}"
+            ))
+        self.stdout.write(self.style.SUCCESS("Rebuilt slot reservations"))
@@ -100,6 +100,12 @@ class Appointment(models.Model):
             models.Index(fields=['payment_status']),
             models.Index(fields=['status']),
         ]
+        constraints = [
+            # the appointment list reads the client and counsellor sides as a UNION ALL
+            models.CheckConstraint(
+                condition=~models.Q(client=models.F('counsellor')), name='appointment_client_not_counsellor'
+            ),
+        ]
     
     def __str__(self):
         return f"{self.client.email} - {self.counsellor.email} - {self.appointment_date}"
@@ -133,3 +139,32 @@ class Appointment(models.Model):
         code = ''.join(random.choices(string.ascii_lowercase + string.digits, k=12))
         return f"{code[:3]}-{code[3:7]}-{code[7:]}"
 
+
+
+class SlotReservation(models.Model):
+    """
+    One booking-grid cell (BOOKING_GRID_MINUTES) of a counsellor's time, held
+    by an appointment. The unique constraint on (counsellor, slot_start) is
+    what rules out double booking; rows are written by booking.py.
+    """
+    counsellor = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='slot_reservations'
+    )
+    slot_start = models.DateTimeField('slot start')
+    appointment = models.ForeignKey(
+        Appointment,
+        on_delete=models.CASCADE,
+        related_name='slot_reservations'
+    )
+    
+    class Meta:
+        verbose_name = 'Slot Reservation'
+        verbose_name_plural = 'Slot Reservations'
+        constraints = [
+            models.UniqueConstraint(fields=['counsellor', 'slot_start'], name='unique_counsellor_slot'),
+        ]
+    
+    def __str__(self):
+        return f"{self.counsellor_id} @ {self.slot_start}"
@@ -0,0 +1,57 @@
+import base64
+import binascii
+from collections import namedtuple
+
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.utils.urls import replace_query_param
+
+
+# position: the (appointment_date, id) a page starts after; reverse: the page
+# is the one *before* position (a previous link)
+Cursor = namedtuple("Cursor", ["position", "reverse"])
+
+
+class AppointmentCursorPagination:
+    """
+    Keyset pagination over (appointment_date, id) for AppointmentListView.
+
+    DRF's CursorPagination filters the queryset it is given, which Django does
+    not allow on a UNION; the view applies the position to both sides of the
+    union itself, this class only sizes pages and encodes / decodes cursors.
+    Like DRF's, cursors point forward (next) or backward (previous).
+    """
+    page_size = 20
+    page_size_query_param = "page_size"
+    max_page_size = 100
+    cursor_query_param = "cursor"
+    invalid_cursor_message = "Invalid cursor"
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(size, self.max_page_size) if size > 0 else self.page_size
+
+    def decode_cursor(self, request):
+        """Return the Cursor of the requested page, or None for the first page."""
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            parts = base64.urlsafe_b64decode(encoded.encode()).decode().split("|")
+            if len(parts) not in (2, 3) or parts[2:] not in ([], ["prev"]):
+                raise ValueError(encoded)
+            cursor = Cursor((parse_datetime(parts[0]), int(parts[1])), reverse=len(parts) == 3)
+        except (binascii.Error, UnicodeDecodeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        if cursor.position[0] is None:
+            raise NotFound(self.invalid_cursor_message)
+        return cursor
+
+    def encode_cursor(self, request, position, reverse=False):
+        appointment_date, pk = position
+        value = f"{appointment_date.isoformat()}|{pk}" + ("|prev" if reverse else "")
+        token = base64.urlsafe_b64encode(value.encode()).decode()
+        return replace_query_param(request.build_absolute_uri(), self.cursor_query_param, token)
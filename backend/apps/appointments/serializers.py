@@ -1,10 +1,21 @@
+from django.db.models import prefetch_related_objects
 from rest_framework import serializers
 from .models import Appointment
+from .booking import duration_on_grid, grid_minutes, start_on_grid
 from apps.accounts.models import User, CounsellorProfile
+from apps.common.serializers import FastListSerializer
 
 
 class AppointmentSerializer(serializers.ModelSerializer):
-    """Serializer for Appointment model."""
+    """
+    Serializer for Appointment model.
+
+    Reads the client, the counsellor and the counsellor's profile and
+    specializations; load them with eager_load() (querysets) or load_related()
+    (instances in hand) so rendering runs no queries per appointment.
+    """
+    SELECT_RELATED = ('client', 'counsellor', 'counsellor__counsellor_profile')
+    PREFETCH_RELATED = ('counsellor__counsellor_profile__specializations',)
     client_email = serializers.EmailField(source='client.email', read_only=True)
     client_name = serializers.SerializerMethodField()
     client_phone = serializers.CharField(source='client.phone', read_only=True)
@@ -18,6 +29,7 @@ class AppointmentSerializer(serializers.ModelSerializer):
     
     class Meta:
         model = Appointment
+        list_serializer_class = FastListSerializer
         fields = [
             'id',
             'client',
@@ -66,27 +78,50 @@ class AppointmentSerializer(serializers.ModelSerializer):
             return str(obj.counsellor.profile_picture)
         return None
     
-    def get_counsellor_specializations(self, obj):
-        """Get counsellor specializations from CounsellorProfile."""
+    @classmethod
+    def eager_load(cls, queryset):
+        return queryset.select_related(*cls.SELECT_RELATED).prefetch_related(*cls.PREFETCH_RELATED)
+
+    @classmethod
+    def load_related(cls, appointments):
+        """eager_load() for appointments that are already loaded (e.g. just saved)."""
+        prefetch_related_objects(appointments, *cls.SELECT_RELATED, *cls.PREFETCH_RELATED)
+
+    def _counsellor_profile(self, obj):
         try:
-            profile = CounsellorProfile.objects.get(user=obj.counsellor)
-            return [s.name for s in profile.specializations.all()]
+            return obj.counsellor.counsellor_profile
         except CounsellorProfile.DoesNotExist:
+            return None
+
+    def get_counsellor_specializations(self, obj):
+        """Get counsellor specializations from CounsellorProfile."""
+        profile = self._counsellor_profile(obj)
+        if profile is None:
             return []
+        return [s.name for s in profile.specializations.all()]
     
     def get_counsellor_profile_id(self, obj):
         """Get CounsellorProfile ID for frontend compatibility."""
-        try:
-            profile = CounsellorProfile.objects.get(user=obj.counsellor)
-            return profile.id
-        except CounsellorProfile.DoesNotExist:
-            return None
+        profile = self._counsellor_profile(obj)
+        return profile.id if profile is not None else None
     
     def get_can_join_meet(self, obj):
         """Check if user can join Google Meet (only on appointment date and if paid)."""
         return obj.can_join_meet()
 
 
+def validate_booking_grid(start_field, start, duration_minutes):
+    """Reject times off the booking grid (see booking.py): they would clash with back-to-back bookings."""
+    step = grid_minutes()
+    errors = {}
+    if not start_on_grid(start):
+        errors[start_field] = f'Appointments must start on a {step}-minute boundary.'
+    if not duration_on_grid(duration_minutes):
+        errors['duration_minutes'] = f'Duration must be a positive multiple of {step} minutes.'
+    if errors:
+        raise serializers.ValidationError(errors)
+
+
 class CreateAppointmentSerializer(serializers.Serializer):
     """Serializer for creating an appointment."""
     counsellor_id = serializers.IntegerField()
@@ -94,6 +129,10 @@ class CreateAppointmentSerializer(serializers.Serializer):
     duration_minutes = serializers.IntegerField(default=60)
     notes = serializers.CharField(required=False, allow_blank=True)
 
+    def validate(self, attrs):
+        validate_booking_grid('appointment_date', attrs['appointment_date'], attrs['duration_minutes'])
+        return attrs
+
 
 class RazorpayOrderSerializer(serializers.Serializer):
     """Serializer for Razorpay order creation."""
@@ -114,6 +153,10 @@ class RescheduleAppointmentSerializer(serializers.Serializer):
     new_appointment_date = serializers.DateTimeField()
     duration_minutes = serializers.IntegerField(required=False, default=60)
 
+    def validate(self, attrs):
+        validate_booking_grid('new_appointment_date', attrs['new_appointment_date'], attrs['duration_minutes'])
+        return attrs
+
 
 class CheckAvailabilitySerializer(serializers.Serializer):
     """Serializer for checking counsellor availability."""
@@ -121,3 +164,8 @@ class CheckAvailabilitySerializer(serializers.Serializer):
     date = serializers.DateField()
     duration_minutes = serializers.IntegerField(required=False, default=60)
 
+    def validate_duration_minutes(self, value):
+        if not duration_on_grid(value):
+            raise serializers.ValidationError(f'Duration must be a positive multiple of {grid_minutes()} minutes.')
+        return value
+
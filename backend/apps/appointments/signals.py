@@ -0,0 +1,84 @@
+"""
+Keep the availability calendars (availability.py) in step with writes.
+
+Appointment writes are applied to this process's calendar after commit and
+bump the counsellor's generation; day-off and availability-option changes
+only bump it, and the calendar is re-read on next use. Appointments that
+stop blocking time also release their slot reservations (booking.py).
+"""
+from datetime import timedelta
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import post_init, post_save, post_delete, pre_delete, m2m_changed
+from django.dispatch import receiver
+
+from apps.accounts.models import CounsellorProfile, AvailabilitySlot, UnavailableDate
+from .availability import availability, BLOCKING_STATUSES
+from .booking import release
+from .models import Appointment
+
+
+def _invalidate_on_commit(counsellor_ids):
+    # bumping before commit would let another process re-read the old rows under the new generation
+    counsellor_ids = list(counsellor_ids)
+    transaction.on_commit(partial(availability.invalidate, counsellor_ids))
+
+
+@receiver(post_init, sender=Appointment)
+def remember_counsellor(sender, instance, **kwargs):
+    # a counsellor change must also free the time in the old calendar
+    # (read from __dict__ so a deferred column is not fetched)
+    instance._loaded_counsellor_id = instance.__dict__.get("counsellor_id")
+
+
+@receiver(post_save, sender=Appointment)
+def appointment_saved(sender, instance, raw=False, using=None, **kwargs):
+    if raw:
+        return
+    interval = None
+    if instance.status in BLOCKING_STATUSES:
+        start = instance.appointment_date
+        interval = (start, start + timedelta(minutes=instance.duration_minutes))
+    elif not kwargs.get("created"):
+        # cancelled or completed (e.g. in the admin): its slots can be booked again
+        release(instance)
+    counsellor_ids = (instance._loaded_counsellor_id, instance.counsellor_id)
+    transaction.on_commit(partial(
+        availability.booking_changed, instance.pk, counsellor_ids, interval, instance.counsellor_id
+    ), using=using)
+    instance._loaded_counsellor_id = instance.counsellor_id
+
+
+@receiver(post_delete, sender=Appointment)
+def appointment_deleted(sender, instance, using=None, **kwargs):
+    transaction.on_commit(partial(
+        availability.booking_changed, instance.pk, (instance._loaded_counsellor_id, instance.counsellor_id)
+    ), using=using)
+
+
+@receiver(post_save, sender=UnavailableDate)
+@receiver(post_delete, sender=UnavailableDate)
+def unavailable_date_changed(sender, instance, **kwargs):
+    _invalidate_on_commit([instance.counsellor_id])
+
+
+@receiver(m2m_changed, sender=CounsellorProfile.availability.through)
+def counsellor_availability_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ("post_add", "post_remove", "pre_clear"):
+        return
+    if not reverse:
+        _invalidate_on_commit([instance.user_id])
+    elif action == "pre_clear":
+        _invalidate_on_commit(instance.counsellors.values_list("user_id", flat=True))
+    else:
+        _invalidate_on_commit(
+            CounsellorProfile.objects.filter(pk__in=pk_set).values_list("user_id", flat=True)
+        )
+
+
+@receiver(post_save, sender=AvailabilitySlot)
+@receiver(pre_delete, sender=AvailabilitySlot)
+def availability_option_changed(sender, instance, created=False, **kwargs):
+    if not created:
+        _invalidate_on_commit(instance.counsellors.values_list("user_id", flat=True))
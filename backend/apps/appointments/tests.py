@@ -1,4 +1,5 @@
 from datetime import timedelta
+from urllib.parse import parse_qs, urlsplit
 import hmac
 import hashlib
 from decimal import Decimal
@@ -6,12 +7,22 @@ from unittest.mock import patch
 
 from django.urls import reverse
 from django.utils import timezone
+from django.db import IntegrityError, connection
 from django.test import TestCase, override_settings
-from rest_framework.test import APITestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.serializers import ListSerializer
+from rest_framework.request import Request
+from rest_framework.test import APITestCase, APIRequestFactory
 from rest_framework import status
 
 from apps.accounts.models import User, CounsellorProfile, ClientProfile, Specialization, AvailabilitySlot, UnavailableDate
-from .models import Appointment
+from .models import Appointment, SlotReservation
+from .booking import SlotTaken, book, slot_starts
+from .serializers import AppointmentSerializer, CreateAppointmentSerializer
+from .views import AppointmentListView
+from .pagination import AppointmentCursorPagination
+from .availability import availability, parse_slot
+from apps.search.query_plans import QueryPlanAssertions
 
 # User must be logged in for these endpoints
 class AppointmentModelUnitTests(TestCase):
@@ -52,6 +63,7 @@ class AppointmentModelUnitTests(TestCase):
 
 class AppointmentAPITests(APITestCase):
     def setUp(self):
+        availability.reset()
         # create users and profiles
         self.client_user = User.objects.create_user(email="client2@example.com", password="StrongPass123!", role=User.Roles.CLIENT)
         self.counsellor_user = User.objects.create_user(email="counsellor2@example.com", password="StrongPass123!", role=User.Roles.COUNSELLOR)
@@ -81,7 +93,7 @@ class AppointmentAPITests(APITestCase):
         self.check_avail_url = reverse('appointments:check-availability')
 
     def test_create_appointment_success(self):
-        appt_time = (timezone.now() + timedelta(days=3)).isoformat()
+        appt_time = (timezone.now() + timedelta(days=3)).replace(minute=0, second=0, microsecond=0).isoformat()
         payload = {
             "counsellor_id": self.counsellor_user.id,
             "appointment_date": appt_time,
@@ -184,6 +196,9 @@ class AppointmentAPITests(APITestCase):
         res = self.client.get(self.list_url)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
         self.assertTrue(any(a['id'] == appt.id for a in res.data))
+        # the list is rendered by the fast path; it must match DRF field for field
+        rows = Appointment.objects.filter(pk=appt.pk)
+        self.assertEqual(res.data, ListSerializer(rows, child=AppointmentSerializer()).data)
 
         # detail
         detail_url = reverse('appointments:detail', kwargs={"appointment_id": appt.id})
@@ -191,6 +206,44 @@ class AppointmentAPITests(APITestCase):
         self.assertEqual(res2.status_code, status.HTTP_200_OK)
         self.assertEqual(res2.data['id'], appt.id)
 
+    def test_list_query_count_is_constant(self):
+        anxiety = Specialization.objects.create(name="Anxiety")
+        self.c_profile.specializations.add(anxiety)
+
+        def add_appointment(i):
+            counsellor = User.objects.create_user(
+                email=f"nplus{i}@example.com", password="StrongPass123!", role=User.Roles.COUNSELLOR
+            )
+            profile = CounsellorProfile.objects.create(
+                user=counsellor, license_number=f"LIC-N{i}", fees_per_session=Decimal("500.00")
+            )
+            profile.specializations.add(anxiety)
+            Appointment.objects.create(
+                client=self.client_user, counsellor=counsellor,
+                appointment_date=timezone.now() + timedelta(days=i + 1), amount=Decimal("500.00"),
+            )
+
+        add_appointment(0)
+        with CaptureQueriesContext(connection) as one:
+            res = self.client.get(self.list_url)
+        self.assertEqual(res.data[0]["counsellor_specializations"], ["Anxiety"])
+
+        for i in range(1, 6):
+            add_appointment(i)
+        # a counsellor without a profile renders empty profile fields
+        Appointment.objects.create(
+            client=self.client_user, counsellor=User.objects.create_user(
+                email="noprofile@example.com", password="StrongPass123!", role=User.Roles.COUNSELLOR
+            ),
+            appointment_date=timezone.now() + timedelta(days=30),
+        )
+        with self.assertNumQueries(len(one)):
+            res = self.client.get(self.list_url)
+        self.assertEqual(len(res.data), 7)
+        self.assertEqual(res.data[0]["counsellor_profile_id"], None)
+        self.assertEqual(res.data[0]["counsellor_specializations"], [])
+        self.assertTrue(all(row["counsellor_specializations"] == ["Anxiety"] for row in res.data[1:]))
+
     def test_reschedule_flow(self):
         appt = Appointment.objects.create(
             client=self.client_user,
@@ -200,7 +253,7 @@ class AppointmentAPITests(APITestCase):
             payment_status=Appointment.PaymentStatus.PAID,
             status=Appointment.Status.CONFIRMED
         )
-        new_date = timezone.now() + timedelta(days=10)
+        new_date = (timezone.now() + timedelta(days=10)).replace(minute=0, second=0, microsecond=0)
         payload = {
             "appointment_id": appt.id,
             "new_appointment_date": new_date.isoformat(),
@@ -227,4 +280,455 @@ class AppointmentAPITests(APITestCase):
         payload = {"counsellor_id": self.counsellor_user.id, "date": check_date}
         res = self.client.post(self.check_avail_url, payload, format='json')
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertFalse(res.data['available'])
\ No newline at end of file
+        self.assertFalse(res.data['available'])
+
+class AppointmentQueryPlanTests(QueryPlanAssertions, TestCase):
+    """The appointment list and the availability bookings are read in index order."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(email="plan@example.com", password="StrongPass123!")
+
+    def list_keys(self, **params):
+        request = Request(APIRequestFactory().get("/api/appointments/", params))
+        request.user = self.user
+        view = AppointmentListView()
+        return view.list_keys(request, view.pagination_class().decode_cursor(request))
+
+    def test_list(self):
+        cursor = AppointmentCursorPagination()
+        request = Request(APIRequestFactory().get("/api/appointments/"))
+        after, before = (
+            parse_qs(urlsplit(cursor.encode_cursor(request, (timezone.now(), 10), reverse)).query)["cursor"][0]
+            for reverse in (False, True)
+        )
+        for params in (
+            {}, {"window": "upcoming"}, {"window": "past"}, {"date_from": "2026-01-01", "date_to": "2026-01-31"},
+            {"pagination": "cursor"}, {"window": "upcoming", "cursor": after}, {"window": "past", "cursor": after},
+            {"window": "upcoming", "cursor": before}, {"cursor": before},
+        ):
+            with self.subTest(**params):
+                self.assertIndexedPlan(self.list_keys(**params))
+
+    def test_availability_bookings(self):
+        self.assertIndexedPlan(availability.booked([self.user.pk]))
+        self.assertIndexedPlan(availability.booked([self.user.pk, 2, 3]))
+
+
+class AppointmentListWindowTests(APITestCase):
+    """Windows, date ranges and cursor pages of the appointment list."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email="busy@example.com", password="StrongPass123!", role=User.Roles.COUNSELLOR
+        )
+        other = User.objects.create_user(email="other@example.com", password="StrongPass123!")
+        self.client.force_authenticate(self.user)
+        self.url = reverse("appointments:list")
+        now = timezone.now().replace(microsecond=0)
+        self.appointments = {}
+        # the user is counsellor of some and client of others; two share a start time
+        for days, as_client in ((-20, False), (-10, True), (-3, False), (2, False), (2, True), (9, False)):
+            appointment = Appointment.objects.create(
+                client=self.user if as_client else other,
+                counsellor=other if as_client else self.user,
+                appointment_date=now + timedelta(days=days),
+            )
+            self.appointments.setdefault(days, []).append(appointment.id)
+        third = User.objects.create_user(email="third@example.com", password="StrongPass123!")
+        Appointment.objects.create(client=third, counsellor=other, appointment_date=now)
+
+    def ids(self, params=None):
+        res = self.client.get(self.url, params or {})
+        self.assertEqual(res.status_code, 200)
+        return [row["id"] for row in res.data]
+
+    def by_days(self, *days, reverse_ties=False):
+        ids = []
+        for day in days:
+            ids += sorted(self.appointments[day], reverse=reverse_ties)
+        return ids
+
+    def test_default_is_every_appointment_latest_first(self):
+        self.assertEqual(self.ids(), self.by_days(9, 2, -3, -10, -20, reverse_ties=True))
+
+    def test_windows(self):
+        self.assertEqual(self.ids({"window": "upcoming"}), self.by_days(2, 9))
+        self.assertEqual(self.ids({"window": "past"}), self.by_days(-3, -10, -20))
+
+    def test_date_range(self):
+        today = timezone.localdate()
+        params = {"date_from": (today - timedelta(days=10)).isoformat(), "date_to": today.isoformat()}
+        self.assertEqual(self.ids(params), self.by_days(-3, -10))
+        self.assertEqual(self.client.get(self.url, {"date_from": "soon"}).status_code, 400)
+
+    def test_cursor_pages(self):
+        for params, expected in (
+            ({}, self.by_days(9, 2, -3, -10, -20, reverse_ties=True)),
+            ({"window": "upcoming"}, self.by_days(2, 9)),
+        ):
+            seen = []
+            res = self.client.get(self.url, {"pagination": "cursor", "page_size": 2, **params})
+            while True:
+                self.assertLessEqual(len(res.data["results"]), 2)
+                seen += [row["id"] for row in res.data["results"]]
+                if not res.data["next"]:
+                    break
+                res = self.client.get(res.data["next"])
+            self.assertEqual(seen, expected)
+
+    def test_previous_links_walk_back(self):
+        expected = self.by_days(9, 2, -3, -10, -20, reverse_ties=True)
+        pages = [self.client.get(self.url, {"pagination": "cursor", "page_size": 2}).data]
+        self.assertIsNone(pages[0]["previous"])
+        while pages[-1]["next"]:
+            pages.append(self.client.get(pages[-1]["next"]).data)
+        self.assertEqual([[row["id"] for row in page["results"]] for page in pages], [expected[i:i + 2] for i in (0, 2, 4)])
+
+        back = self.client.get(pages[-1]["previous"]).data
+        self.assertEqual([row["id"] for row in back["results"]], expected[2:4])
+        back = self.client.get(back["previous"]).data
+        self.assertEqual([row["id"] for row in back["results"]], expected[:2])
+        self.assertIsNone(back["previous"])
+        # and forward again from a page reached backwards
+        self.assertEqual([row["id"] for row in self.client.get(back["next"]).data["results"]], expected[2:4])
+
+    def test_client_cannot_be_the_counsellor(self):
+        with self.assertRaises(IntegrityError):
+            Appointment.objects.create(client=self.user, counsellor=self.user, appointment_date=timezone.now())
+
+    def test_invalid_cursor(self):
+        self.assertEqual(self.client.get(self.url, {"cursor": "nope"}).status_code, 404)
+
+
+class AvailabilityTests(APITestCase):
+    """Counsellor calendars: parsed weekly windows, free/busy, incremental updates."""
+
+    def setUp(self):
+        availability.reset()
+        self.client_user = User.objects.create_user(
+            email="avail-client@example.com", password="StrongPass123!", role=User.Roles.CLIENT, is_active=True
+        )
+        self.counsellor = User.objects.create_user(
+            email="avail-counsellor@example.com", password="StrongPass123!", role=User.Roles.COUNSELLOR
+        )
+        self.profile = CounsellorProfile.objects.create(
+            user=self.counsellor, license_number="LIC-AV", fees_per_session=Decimal("500.00")
+        )
+        self.profile.availability.add(AvailabilitySlot.objects.create(name="Weekdays (9 AM - 5 PM)"))
+        self.client.force_authenticate(self.client_user)
+        # a Monday well ahead, so "now" never cuts into it
+        today = timezone.localdate()
+        self.monday = today + timedelta(days=14 - today.weekday())
+
+    def at(self, day, hour, minute=0):
+        return timezone.make_aware(timezone.datetime.combine(day, timezone.datetime.min.time())) + timedelta(
+            hours=hour, minutes=minute
+        )
+
+    def book(self, start, minutes=60, **fields):
+        with self.captureOnCommitCallbacks(execute=True):
+            return book(
+                client=self.client_user, counsellor=self.counsellor, appointment_date=start,
+                duration_minutes=minutes, amount=Decimal("500.00"), **fields
+            )
+
+    def test_parse_slot(self):
+        from datetime import time
+        weekdays = frozenset(range(5))
+        self.assertEqual(parse_slot("Weekdays (9 AM - 5 PM)"), [(weekdays, time(9), time(17))])
+        self.assertEqual(parse_slot("Mon - Morning"), [(frozenset([0]), time(9), time(12))])
+        self.assertEqual(parse_slot("Weekends"), [(frozenset([5, 6]), time(9), time(18))])
+        self.assertEqual(parse_slot("Evenings"), [(frozenset(range(7)), time(18), time(22))])
+        self.assertEqual(parse_slot("Saturday 10:30am to 1pm"), [(frozenset([5]), time(10, 30), time(13))])
+
+    def test_day_free_busy_and_slots(self):
+        self.book(self.at(self.monday, 10), 90)
+        day = availability.calendar(self.counsellor.id).day(self.monday)
+        self.assertTrue(day["available"])
+        self.assertEqual(day["busy"], [{"start": self.at(self.monday, 10).isoformat(),
+                                        "end": self.at(self.monday, 11, 30).isoformat()}])
+        self.assertEqual([(f["start"], f["end"]) for f in day["free"]], [
+            (self.at(self.monday, 9).isoformat(), self.at(self.monday, 10).isoformat()),
+            (self.at(self.monday, 11, 30).isoformat(), self.at(self.monday, 17).isoformat()),
+        ])
+        # slots start on the booking grid, so 11:30 is offered but not 9:15
+        self.assertEqual(day["slots"][:2], [self.at(self.monday, 9).isoformat(), self.at(self.monday, 11, 30).isoformat()])
+        self.assertEqual(len(day["slots"]), 20)
+
+        saturday = availability.calendar(self.counsellor.id).day(self.monday + timedelta(days=5))
+        self.assertFalse(saturday["available"])
+
+    def test_cancelled_bookings_do_not_block(self):
+        self.book(self.at(self.monday, 9), status=Appointment.Status.CANCELLED)
+        calendar = availability.calendar(self.counsellor.id)
+        self.assertFalse(calendar.conflicts(self.at(self.monday, 9), self.at(self.monday, 10)))
+
+    def test_unavailable_date(self):
+        availability.calendar(self.counsellor.id)
+        with self.captureOnCommitCallbacks(execute=True):
+            UnavailableDate.objects.create(counsellor=self.counsellor, date=self.monday, reason="Conference")
+        day = availability.calendar(self.counsellor.id).day(self.monday)
+        self.assertFalse(day["available"])
+        self.assertEqual(day["reason"], "Conference")
+
+    def test_bookings_are_applied_without_reloading(self):
+        calendar = availability.calendar(self.counsellor.id)
+        appointment = self.book(self.at(self.monday, 10))
+        with self.assertNumQueries(0):
+            self.assertIs(availability.calendar(self.counsellor.id), calendar)
+        self.assertTrue(calendar.conflicts(self.at(self.monday, 10, 30), self.at(self.monday, 11)))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            appointment.appointment_date = self.at(self.monday, 14)
+            appointment.save()
+        self.assertFalse(calendar.conflicts(self.at(self.monday, 10), self.at(self.monday, 11)))
+        self.assertTrue(calendar.conflicts(self.at(self.monday, 14), self.at(self.monday, 15)))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            appointment.status = Appointment.Status.CANCELLED
+            appointment.save()
+        with self.assertNumQueries(0):
+            calendar = availability.calendar(self.counsellor.id)
+        self.assertFalse(calendar.conflicts(self.at(self.monday, 14), self.at(self.monday, 15)))
+
+    def test_other_process_write_triggers_reload(self):
+        calendar = availability.calendar(self.counsellor.id)
+        self.book(self.at(self.monday, 10))
+        # simulate a write applied by another process: ours is stale, theirs bumped the generation
+        availability.reset()
+        availability.booking_changed(0, [self.counsellor.id])
+        with self.assertNumQueries(3):
+            reloaded = availability.calendar(self.counsellor.id)
+        self.assertIsNot(reloaded, calendar)
+        self.assertTrue(reloaded.conflicts(self.at(self.monday, 10), self.at(self.monday, 11)))
+
+    def test_reschedule_conflict(self):
+        self.book(self.at(self.monday, 10))
+        mine = self.book(
+            self.at(self.monday, 14), status=Appointment.Status.CONFIRMED,
+            payment_status=Appointment.PaymentStatus.PAID,
+        )
+        url = reverse("appointments:reschedule")
+        payload = {"appointment_id": mine.id, "new_appointment_date": self.at(self.monday, 10, 30).isoformat()}
+        res = self.client.post(url, payload, format="json")
+        self.assertEqual(res.status_code, status.HTTP_409_CONFLICT)
+        # moving within its own old slot is fine
+        payload["new_appointment_date"] = self.at(self.monday, 14, 30).isoformat()
+        res = self.client.post(url, payload, format="json")
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_availability_endpoint(self):
+        self.book(self.at(self.monday, 9))
+        url = reverse("appointments:availability")
+        res = self.client.get(url, {
+            "counsellor_id": self.profile.id,
+            "date_from": self.monday.isoformat(),
+            "date_to": (self.monday + timedelta(days=6)).isoformat(),
+        })
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data["counsellor_id"], self.counsellor.id)
+        self.assertEqual(len(res.data["days"]), 7)
+        self.assertEqual(len(res.data["days"][0]["slots"]), 25)
+        self.assertEqual([day["available"] for day in res.data["days"]], [True] * 5 + [False] * 2)
+
+        for params in ({"counsellor_id": self.counsellor.id, "date_from": "nope"},
+                       {"counsellor_id": self.counsellor.id, "date_from": "2030-01-10", "date_to": "2030-01-01"},
+                       {"counsellor_id": self.counsellor.id, "date_from": "2030-01-01", "date_to": "2030-06-01"}):
+            self.assertEqual(self.client.get(url, params).status_code, status.HTTP_400_BAD_REQUEST)
+        res = self.client.get(url, {"counsellor_id": 999999, "date_from": self.monday.isoformat()})
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+        res = self.client.get(url, {"counsellor_id": self.counsellor.id, "date_from": self.monday.isoformat(),
+                                    "duration_minutes": 50})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_check_availability_offers_bookable_slots(self):
+        self.book(self.at(self.monday, 10), 90)
+        url = reverse("appointments:check-availability")
+        payload = {"counsellor_id": self.counsellor.id, "date": self.monday.isoformat(), "duration_minutes": 45}
+        res = self.client.post(url, payload, format="json")
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        slots = res.data["free_slots"]
+        starts = [self.at(self.monday, 9), self.at(self.monday, 9, 15), self.at(self.monday, 11, 30)]
+        self.assertEqual(slots[:3], [start.isoformat() for start in starts])
+        for slot in slots:
+            serializer = CreateAppointmentSerializer(data={**payload, "appointment_date": slot})
+            self.assertTrue(serializer.is_valid(), serializer.errors)
+
+        payload["duration_minutes"] = 50
+        res = self.client.post(url, payload, format="json")
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_check_availability_reads_days_off_from_the_calendar(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            UnavailableDate.objects.create(counsellor=self.counsellor, date=self.monday, reason="Conference")
+        availability.calendar(self.counsellor.id)
+        url = reverse("appointments:check-availability")
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.post(url, {"counsellor_id": self.counsellor.id, "date": self.monday.isoformat()}, format="json")
+        self.assertEqual(res.data["reason"], "Conference")
+        table = UnavailableDate._meta.db_table
+        self.assertFalse([q for q in ctx.captured_queries if table in q["sql"]])
+
+    def test_range_endpoint(self):
+        other = User.objects.create_user(
+            email="avail-other@example.com", password="StrongPass123!", role=User.Roles.COUNSELLOR
+        )
+        self.book(self.at(self.monday, 10), 90)
+        with self.captureOnCommitCallbacks(execute=True):
+            UnavailableDate.objects.create(counsellor=other, date=self.monday, reason="Leave")
+        url = reverse("appointments:availability-range")
+        params = {
+            "counsellor_ids": f"{self.counsellor.id},{other.id},{self.client_user.id}",
+            "date_from": self.monday.isoformat(),
+            "date_to": (self.monday + timedelta(days=6)).isoformat(),
+        }
+        # counsellor lookup, then one query each for options, days off and appointments
+        with self.assertNumQueries(4):
+            res = self.client.get(url, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data["not_found"], [self.client_user.id])
+        mine, theirs = res.data["results"]
+        self.assertEqual(mine["counsellor_id"], self.counsellor.id)
+        self.assertEqual(len(mine["days"]), 7)
+        self.assertEqual(mine["days"][self.monday.isoformat()], {
+            "busy": [["10:00", "11:30"]],
+            "free": [["09:00", "10:00"], ["11:30", "17:00"]],
+        })
+        self.assertIn("off", mine["days"][(self.monday + timedelta(days=5)).isoformat()])
+        # no availability options: default day hours every day
+        self.assertEqual(theirs["days"][self.monday.isoformat()], {"busy": [], "free": [], "off": "Leave"})
+        self.assertEqual(theirs["days"][(self.monday + timedelta(days=1)).isoformat()]["free"], [["09:00", "18:00"]])
+
+        # calendars stay cached: only the counsellor lookup is left
+        with self.assertNumQueries(1):
+            self.client.get(url, params)
+
+        for bad in ({"counsellor_ids": "1,x", "date_from": self.monday.isoformat()},
+                    {"date_from": self.monday.isoformat()},
+                    {"counsellor_ids": str(self.counsellor.id)}):
+            self.assertEqual(self.client.get(url, bad).status_code, status.HTTP_400_BAD_REQUEST)
+        with self.settings(AVAILABILITY_MAX_COUNSELLORS=1):
+            self.assertEqual(self.client.get(url, params).status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class SlotReservationTests(APITestCase):
+    """Overlapping bookings are rejected by the unique slot constraint."""
+
+    def setUp(self):
+        availability.reset()
+        self.client_user = User.objects.create_user(
+            email="slot-client@example.com", password="StrongPass123!", role=User.Roles.CLIENT, is_active=True
+        )
+        self.counsellor = User.objects.create_user(
+            email="slot-counsellor@example.com", password="StrongPass123!", role=User.Roles.COUNSELLOR
+        )
+        CounsellorProfile.objects.create(user=self.counsellor, license_number="LIC-SL", fees_per_session=Decimal("500.00"))
+        self.client.force_authenticate(self.client_user)
+        self.start = (timezone.now() + timedelta(days=3)).replace(hour=10, minute=0, second=0, microsecond=0)
+
+    def create(self, start, minutes=60):
+        return self.client.post(reverse("appointments:create"), {
+            "counsellor_id": self.counsellor.id, "appointment_date": start.isoformat(), "duration_minutes": minutes,
+        }, format="json")
+
+    def test_slot_starts(self):
+        with self.settings(BOOKING_GRID_MINUTES=15):
+            self.assertEqual(len(slot_starts(self.start, 60)), 4)
+            # off-grid appointments hold the partial cells
+            self.assertEqual(len(slot_starts(self.start + timedelta(minutes=10), 30)), 3)
+
+    def test_overlapping_create_is_a_conflict(self):
+        self.assertEqual(self.create(self.start).status_code, status.HTTP_201_CREATED)
+        self.assertEqual(SlotReservation.objects.count(), 4)
+
+        res = self.create(self.start + timedelta(minutes=30))
+        self.assertEqual(res.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(Appointment.objects.count(), 1)
+        # back to back is fine
+        self.assertEqual(self.create(self.start + timedelta(hours=1), 30).status_code, status.HTTP_201_CREATED)
+
+    def test_adjacent_off_grid_times_are_rejected(self):
+        # 10:00-10:50 and 10:50-11:40 don't overlap, but both would hold the 10:45 cell
+        res = self.create(self.start, 50)
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(set(res.data["errors"]), {"duration_minutes"})
+        res = self.create(self.start + timedelta(minutes=50), 60)
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(set(res.data["errors"]), {"appointment_date"})
+        self.assertFalse(Appointment.objects.exists())
+
+        # back to back on the grid
+        self.assertEqual(self.create(self.start, 45).status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self.create(self.start + timedelta(minutes=45), 45).status_code, status.HTTP_201_CREATED)
+
+        moved = book(
+            client=self.client_user, counsellor=self.counsellor, appointment_date=self.start + timedelta(hours=3),
+            amount=Decimal("0"), status=Appointment.Status.CONFIRMED, payment_status=Appointment.PaymentStatus.PAID,
+        )
+        res = self.client.post(reverse("appointments:reschedule"), {
+            "appointment_id": moved.id, "new_appointment_date": (self.start + timedelta(minutes=95)).isoformat(),
+        }, format="json")
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("new_appointment_date", res.data)
+
+    def test_other_integrity_errors_are_not_slot_clashes(self):
+        with self.assertRaises(IntegrityError):
+            book(client=self.counsellor, counsellor=self.counsellor, appointment_date=self.start, amount=Decimal("0"))
+
+    def test_conflict_is_one_insert(self):
+        book(client=self.client_user, counsellor=self.counsellor, appointment_date=self.start, amount=Decimal("0"))
+        with CaptureQueriesContext(connection) as ctx, self.assertRaises(SlotTaken):
+            book(client=self.client_user, counsellor=self.counsellor, appointment_date=self.start, amount=Decimal("0"))
+        inserts = [q["sql"] for q in ctx.captured_queries if q["sql"].startswith("INSERT")]
+        self.assertEqual(len(inserts), 2)  # the appointment, then all of its cells at once
+        self.assertIn(SlotReservation._meta.db_table, inserts[1])
+        self.assertEqual(Appointment.objects.count(), 1)
+
+    def test_cancelling_releases_the_slot(self):
+        first = book(client=self.client_user, counsellor=self.counsellor, appointment_date=self.start, amount=Decimal("0"))
+        first.status = Appointment.Status.CANCELLED
+        first.save()
+        self.assertFalse(first.slot_reservations.exists())
+        self.assertEqual(self.create(self.start).status_code, status.HTTP_201_CREATED)
+
+    def test_reschedule_swaps_reservations(self):
+        first = book(
+            client=self.client_user, counsellor=self.counsellor, appointment_date=self.start, amount=Decimal("0"),
+            status=Appointment.Status.CONFIRMED, payment_status=Appointment.PaymentStatus.PAID,
+        )
+        book(client=self.client_user, counsellor=self.counsellor,
+             appointment_date=self.start + timedelta(hours=2), amount=Decimal("0"))
+        url = reverse("appointments:reschedule")
+        res = self.client.post(url, {
+            "appointment_id": first.id, "new_appointment_date": (self.start + timedelta(hours=2)).isoformat(),
+        }, format="json")
+        self.assertEqual(res.status_code, status.HTTP_409_CONFLICT)
+        first.refresh_from_db()
+        self.assertEqual(first.appointment_date, self.start)
+        self.assertEqual(first.slot_reservations.count(), 4)
+
+        res = self.client.post(url, {
+            "appointment_id": first.id, "new_appointment_date": (self.start + timedelta(hours=4)).isoformat(),
+        }, format="json")
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            sorted(first.slot_reservations.values_list("slot_start", flat=True)),
+            slot_starts(self.start + timedelta(hours=4), 60),
+        )
+        # the old time is free again
+        self.assertEqual(self.create(self.start).status_code, status.HTTP_201_CREATED)
+
+    def test_rebuild_command(self):
+        from django.core.management import call_command
+        from io import StringIO
+        for hours in (0, 0.5, 3):
+            Appointment.objects.create(
+                client=self.client_user, counsellor=self.counsellor,
+                appointment_date=self.start + timedelta(hours=hours), amount=Decimal("0"),
+            )
+        out = StringIO()
+        call_command("rebuild_slot_reservations", stdout=out)
+        clash = Appointment.objects.get(appointment_date=self.start + timedelta(minutes=30))
+        self.assertIn(str(clash.id), out.getvalue())
+        self.assertEqual(SlotReservation.objects.count(), 8)
+        self.assertFalse(clash.slot_reservations.exists())
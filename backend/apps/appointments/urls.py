@@ -9,6 +9,8 @@ from .views import (
     AppointmentDetailView,
     RescheduleAppointmentView,
     CheckAvailabilityView,
+    CounsellorAvailabilityView,
+    CounsellorAvailabilityRangeView,
 )
 
 app_name = 'appointments'
@@ -24,6 +26,8 @@ urlpatterns = [
     path('razorpay/mock/verify-payment/', MockVerifyRazorpayPaymentView.as_view(), name='razorpay-mock-verify-payment'),
     path('reschedule/', RescheduleAppointmentView.as_view(), name='reschedule'),
     path('check-availability/', CheckAvailabilityView.as_view(), name='check-availability'),
+    path('availability/', CounsellorAvailabilityView.as_view(), name='availability'),
+    path('availability/range/', CounsellorAvailabilityRangeView.as_view(), name='availability-range'),
 ]
 
 
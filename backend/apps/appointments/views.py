@@ -20,6 +20,11 @@ from .serializers import (
 )
 from apps.accounts.models import User, CounsellorProfile
 from decimal import Decimal
+from datetime import datetime, timedelta
+from django.utils.dateparse import parse_date, parse_datetime
+from .pagination import AppointmentCursorPagination
+from .availability import availability, date_range
+from .booking import SlotTaken, book, duration_on_grid, grid_minutes, reschedule
 
 # Initialize Razorpay client
 # You'll need to add RAZORPAY_KEY_ID and RAZORPAY_KEY_SECRET to settings.py
@@ -32,17 +37,140 @@ except:
 
 
 class AppointmentListView(APIView):
-    """List appointments for the authenticated user."""
+    """
+    GET /api/appointments/
+    List appointments for the authenticated user (as client or as counsellor).
+      - window    : upcoming (from now on, soonest first) | past (before now,
+                    latest first); default is every appointment, latest first
+      - date_from / date_to : ISO date or datetime bounds (a date_to date
+                    includes that whole day)
+      - pagination=cursor / cursor : keyset pages {next, previous, results} of
+                    page_size (default 20); otherwise the whole list as an array
+
+    The client side and the counsellor side are read as a UNION ALL of two
+    queries, each walking its (user, appointment_date) index in order, instead
+    of an OR that has to sort every match. No row is on both sides: the model
+    forbids an appointment whose client is its counsellor.
+    """
     permission_classes = [IsAuthenticated]
-    
+    pagination_class = AppointmentCursorPagination
+
     def get(self, request):
-        user = request.user
-        appointments = Appointment.objects.filter(
-            Q(client=user) | Q(counsellor=user)
-        ).select_related('client', 'counsellor').order_by('-appointment_date')
-        
-        serializer = AppointmentSerializer(appointments, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        paginator = self.pagination_class()
+        cursor = paginator.decode_cursor(request)
+        try:
+            keys = list(self.list_keys(request, cursor))
+        except ValueError:
+            return Response(
+                {'detail': 'date_from and date_to must be ISO dates or datetimes.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if not self.paginates(request):
+            return Response(self.serialize(keys), status=status.HTTP_200_OK)
+
+        page_size = paginator.get_page_size(request)
+        more = len(keys) > page_size
+        keys = keys[:page_size]
+        next_link = previous_link = None
+        if cursor is not None and cursor.reverse:
+            # read backwards from the cursor; the extra row means there is an earlier page
+            keys.reverse()
+            if keys:
+                next_link = paginator.encode_cursor(request, keys[-1])
+                if more:
+                    previous_link = paginator.encode_cursor(request, keys[0], reverse=True)
+        elif keys:
+            if more:
+                next_link = paginator.encode_cursor(request, keys[-1])
+            if cursor is not None:
+                previous_link = paginator.encode_cursor(request, keys[0], reverse=True)
+        return Response(
+            {'next': next_link, 'previous': previous_link, 'results': self.serialize(keys)},
+            status=status.HTTP_200_OK
+        )
+
+    @staticmethod
+    def paginates(request):
+        return 'cursor' in request.query_params or request.query_params.get('pagination') == 'cursor'
+
+    def list_keys(self, request, cursor=None):
+        """
+        The (appointment_date, id) query for this request: its window, date
+        range and, when paginated, the page at ``cursor`` plus one row (which
+        tells whether there is another page). A reverse cursor's rows come in
+        the opposite order. Raises ValueError for malformed dates.
+        """
+        bounds = self.date_bounds(request.query_params)
+        window = (request.query_params.get('window') or '').lower()
+        ascending = window == 'upcoming'
+        now = timezone.now()
+        if window == 'upcoming':
+            bounds['appointment_date__gte'] = max(bounds.get('appointment_date__gte', now), now)
+        elif window == 'past':
+            bounds['appointment_date__lt'] = min(bounds.get('appointment_date__lt', now), now)
+
+        if not self.paginates(request):
+            return self.appointment_keys(request.user, bounds, ascending)
+        limit = self.pagination_class().get_page_size(request) + 1
+        if cursor is None:
+            return self.appointment_keys(request.user, bounds, ascending, limit=limit)
+        return self.appointment_keys(
+            request.user, bounds, ascending != cursor.reverse, after=cursor.position, limit=limit
+        )
+
+    @staticmethod
+    def date_bounds(params):
+        bounds = {}
+        for param, lookup, day_lookup in (
+            ('date_from', 'appointment_date__gte', 'appointment_date__gte'),
+            ('date_to', 'appointment_date__lte', 'appointment_date__lt'),
+        ):
+            value = (params.get(param) or '').strip()
+            if not value:
+                continue
+            moment = parse_datetime(value)
+            if moment is not None:
+                bounds[lookup] = moment if timezone.is_aware(moment) else timezone.make_aware(moment)
+                continue
+            day = parse_date(value)
+            if day is None:
+                raise ValueError(value)
+            if param == 'date_to':
+                day += timedelta(days=1)
+            bounds[day_lookup] = timezone.make_aware(datetime.combine(day, datetime.min.time()))
+        return bounds
+
+    @staticmethod
+    def appointment_keys(user, bounds, ascending, after=None, limit=None):
+        """Queryset of (appointment_date, id) of the user's appointments, in list order."""
+        sides = []
+        for role in ('client', 'counsellor'):
+            side = Appointment.objects.filter(**{role: user}, **bounds)
+            if after is not None:
+                # keyset: strictly past the last row of the previous page
+                appointment_date, pk = after
+                if ascending:
+                    side = side.filter(appointment_date__gte=appointment_date).exclude(
+                        appointment_date=appointment_date, id__lte=pk
+                    )
+                else:
+                    side = side.filter(appointment_date__lte=appointment_date).exclude(
+                        appointment_date=appointment_date, id__gte=pk
+                    )
+            sides.append(side.order_by().values_list('appointment_date', 'id'))
+        ordering = ('appointment_date', 'id') if ascending else ('-appointment_date', '-id')
+        # an appointment's client is never its counsellor (a model constraint), so UNION ALL
+        keys = sides[0].union(sides[1], all=True).order_by(*ordering)
+        if limit is not None:
+            keys = keys[:limit]
+        return keys
+
+    @staticmethod
+    def serialize(keys):
+        ids = [pk for _, pk in keys]
+        rows = AppointmentSerializer.eager_load(Appointment.objects.all()).in_bulk(ids)
+        appointments = [rows[pk] for pk in ids if pk in rows]
+        return AppointmentSerializer(appointments, many=True).data
 
 
 class CreateAppointmentView(APIView):
@@ -98,18 +226,25 @@ class CreateAppointmentView(APIView):
             except CounsellorProfile.DoesNotExist:
                 amount = Decimal('0.00')
             
-            # Create appointment with pending payment
-            appointment = Appointment.objects.create(
-                client=user,
-                counsellor=counsellor,
-                appointment_date=appointment_date,
-                duration_minutes=duration_minutes,
-                amount=amount,
-                payment_status=Appointment.PaymentStatus.PENDING,
-                status=Appointment.Status.PENDING,
-                notes=notes,
-            )
+            # Create appointment with pending payment; the database rejects overlapping bookings
+            try:
+                appointment = book(
+                    client=user,
+                    counsellor=counsellor,
+                    appointment_date=appointment_date,
+                    duration_minutes=duration_minutes,
+                    amount=amount,
+                    payment_status=Appointment.PaymentStatus.PENDING,
+                    status=Appointment.Status.PENDING,
+                    notes=notes,
+                )
+            except SlotTaken:
+                return Response(
+                    {'detail': 'Counsellor has another appointment at this time. Please choose a different time.'},
+                    status=status.HTTP_409_CONFLICT
+                )
             
+            AppointmentSerializer.load_related([appointment])
             serializer = AppointmentSerializer(appointment)
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         except Exception as e:
@@ -357,6 +492,7 @@ class VerifyRazorpayPaymentView(APIView):
                         )
                     
                     try:
+                        AppointmentSerializer.load_related([appointment])
                         serializer = AppointmentSerializer(appointment)
                         return Response(serializer.data, status=status.HTTP_200_OK)
                     except Exception as serialize_error:
@@ -444,6 +580,7 @@ class MockVerifyRazorpayPaymentView(APIView):
         update_fields = ['payment_status', 'status', 'razorpay_payment_id', 'razorpay_signature', 'google_meet_link', 'feedback_form_url']
         appointment.save(update_fields=[f for f in update_fields if getattr(appointment, f, None) is not None])
 
+        AppointmentSerializer.load_related([appointment])
         serializer_out = AppointmentSerializer(appointment)
         return Response(serializer_out.data, status=status.HTTP_200_OK)
 
@@ -454,7 +591,7 @@ class AppointmentDetailView(APIView):
     
     def get(self, request, appointment_id):
         try:
-            appointment = Appointment.objects.get(
+            appointment = AppointmentSerializer.eager_load(Appointment.objects).get(
                 Q(id=appointment_id) & (Q(client=request.user) | Q(counsellor=request.user))
             )
         except Appointment.DoesNotExist:
@@ -472,9 +609,6 @@ class RescheduleAppointmentView(APIView):
     permission_classes = [IsAuthenticated]
     
     def post(self, request):
-        from apps.accounts.models import UnavailableDate
-        from datetime import timedelta
-        
         serializer = RescheduleAppointmentSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         
@@ -518,38 +652,26 @@ class RescheduleAppointmentView(APIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        counsellor = appointment.counsellor
-        
+        calendar = availability.calendar(appointment.counsellor_id)
+
         # Check if counsellor is unavailable on this date
-        appointment_date_only = new_appointment_date.date()
-        if UnavailableDate.objects.filter(counsellor=counsellor, date=appointment_date_only).exists():
-            unavailable_date = UnavailableDate.objects.get(counsellor=counsellor, date=appointment_date_only)
+        appointment_date_only = timezone.localdate(new_appointment_date)
+        if appointment_date_only in calendar.unavailable:
             return Response(
-                {'detail': f'Counsellor is not available on this date. {unavailable_date.reason or ""}'},
+                {'detail': f'Counsellor is not available on this date. {calendar.unavailable[appointment_date_only] or ""}'},
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        # Check if counsellor has another appointment at the same time
-        end_time = new_appointment_date + timedelta(minutes=duration_minutes)
-        conflicting_appointments = Appointment.objects.filter(
-            counsellor=counsellor,
-            status__in=[Appointment.Status.PENDING, Appointment.Status.CONFIRMED],
-            appointment_date__lt=end_time,
-        ).exclude(id=appointment_id)
-        
-        for conf_apt in conflicting_appointments:
-            conf_end = conf_apt.appointment_date + timedelta(minutes=conf_apt.duration_minutes)
-            if new_appointment_date < conf_end and end_time > conf_apt.appointment_date:
-                return Response(
-                    {'detail': 'Counsellor has another appointment at this time. Please choose a different time.'},
-                    status=status.HTTP_400_BAD_REQUEST
-                )
-        
-        # Update appointment
-        appointment.appointment_date = new_appointment_date
-        appointment.duration_minutes = duration_minutes
-        appointment.save(update_fields=['appointment_date', 'duration_minutes', 'updated_at'])
+        # Move the appointment; the database rejects overlapping bookings
+        try:
+            reschedule(appointment, new_appointment_date, duration_minutes)
+        except SlotTaken:
+            return Response(
+                {'detail': 'Counsellor has another appointment at this time. Please choose a different time.'},
+                status=status.HTTP_409_CONFLICT
+            )
         
+        AppointmentSerializer.load_related([appointment])
         serializer = AppointmentSerializer(appointment)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
@@ -559,7 +681,6 @@ class CheckAvailabilityView(APIView):
     permission_classes = [IsAuthenticated]
     
     def post(self, request):
-        from apps.accounts.models import UnavailableDate
         from datetime import timedelta
         
         serializer = CheckAvailabilitySerializer(data=request.data)
@@ -582,17 +703,12 @@ class CheckAvailabilityView(APIView):
                     status=status.HTTP_404_NOT_FOUND
                 )
         
-        # Check if counsellor is unavailable on this date
-        is_unavailable = UnavailableDate.objects.filter(
-            counsellor=counsellor,
-            date=check_date
-        ).exists()
-        
-        if is_unavailable:
-            unavailable_date = UnavailableDate.objects.get(counsellor=counsellor, date=check_date)
+        # Days off, existing appointments and free slots come from the counsellor's calendar
+        calendar = availability.calendar(counsellor.id)
+        if check_date in calendar.unavailable:
             return Response({
                 'available': False,
-                'reason': unavailable_date.reason or 'Counsellor is not available on this date.',
+                'reason': calendar.unavailable[check_date] or 'Counsellor is not available on this date.',
                 'date': check_date.isoformat()
             }, status=status.HTTP_200_OK)
         
@@ -604,17 +720,12 @@ class CheckAvailabilityView(APIView):
                 'date': check_date.isoformat()
             }, status=status.HTTP_200_OK)
         
-        # Get existing appointments for this date
-        from datetime import datetime
         date_start = timezone.make_aware(datetime.combine(check_date, datetime.min.time()))
         date_end = date_start + timedelta(days=1)
-        
-        existing_appointments = Appointment.objects.filter(
-            counsellor=counsellor,
-            appointment_date__gte=date_start,
-            appointment_date__lt=date_end,
-            status__in=[Appointment.Status.PENDING, Appointment.Status.CONFIRMED]
-        ).order_by('appointment_date')
+        existing_appointments = [
+            (start, end) for start, end, _ in calendar.busy_between(date_start, date_end)
+            if start >= date_start
+        ]
         
         # Return availability info
         return Response({
@@ -622,12 +733,96 @@ class CheckAvailabilityView(APIView):
             'date': check_date.isoformat(),
             'existing_appointments': [
                 {
-                    'start': apt.appointment_date.isoformat(),
-                    'end': (apt.appointment_date + timedelta(minutes=apt.duration_minutes)).isoformat(),
-                    'duration_minutes': apt.duration_minutes
+                    'start': start.isoformat(),
+                    'end': end.isoformat(),
+                    'duration_minutes': int((end - start).total_seconds() // 60)
                 }
-                for apt in existing_appointments
+                for start, end in existing_appointments
             ],
+            'free_slots': calendar.day(check_date, duration_minutes)['slots'],
             'message': 'Counsellor is available on this date.'
         }, status=status.HTTP_200_OK)
 
+
+class CounsellorAvailabilityView(APIView):
+    """
+    Free/busy intervals and bookable slots of a counsellor over a date range.
+
+    Query params: counsellor_id (user or profile id), date_from, date_to
+    (ISO dates, at most AVAILABILITY_MAX_DAYS days), duration_minutes.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        params = request.query_params
+        try:
+            counsellor_id = int(params.get('counsellor_id', ''))
+            duration_minutes = int(params.get('duration_minutes') or 60)
+            date_from, date_to = date_range(params)
+        except ValueError:
+            return Response(
+                {'detail': 'counsellor_id, date_from (YYYY-MM-DD) and a date_to within range are required.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if not (duration_on_grid(duration_minutes) and duration_minutes <= 24 * 60):
+            return Response(
+                {'detail': f'duration_minutes must be a multiple of {grid_minutes()} minutes, at most 1440.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        user_id = User.objects.filter(id=counsellor_id, role='counsellor').values_list('id', flat=True).first()
+        if user_id is None:
+            user_id = CounsellorProfile.objects.filter(id=counsellor_id).values_list('user_id', flat=True).first()
+        if user_id is None:
+            return Response({'detail': 'Counsellor not found.'}, status=status.HTTP_404_NOT_FOUND)
+
+        calendar = availability.calendar(user_id)
+        return Response({
+            'counsellor_id': user_id,
+            'duration_minutes': duration_minutes,
+            'days': calendar.days(date_from, date_to, duration_minutes),
+        }, status=status.HTTP_200_OK)
+
+
+class CounsellorAvailabilityRangeView(APIView):
+    """
+    Compact free/busy map of several counsellors over a date range.
+
+    Query params: counsellor_ids (comma-separated user ids, at most
+    AVAILABILITY_MAX_COUNSELLORS), date_from, date_to. Calendars that are not
+    cached are read together: one query each for availability options, days
+    off and appointments, whatever the number of counsellors.
+    Response: { "date_from", "date_to", "results": [{ "counsellor_id", "days": {...} }], "not_found": [ids] }
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        max_ids = getattr(settings, 'AVAILABILITY_MAX_COUNSELLORS', 20)
+        raw = [part.strip() for part in (request.query_params.get('counsellor_ids') or '').split(',') if part.strip()]
+        try:
+            # keep the caller's order, drop duplicates
+            ids = list(dict.fromkeys(int(part) for part in raw))
+            date_from, date_to = date_range(request.query_params)
+        except ValueError:
+            return Response(
+                {'detail': 'counsellor_ids (comma-separated integers), date_from (YYYY-MM-DD) and a date_to within range are required.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if not ids:
+            return Response({'detail': 'counsellor_ids is required.'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(ids) > max_ids:
+            return Response({'detail': f'At most {max_ids} counsellors per request.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        found = set(User.objects.filter(id__in=ids, role='counsellor').values_list('id', flat=True))
+        counsellor_ids = [pk for pk in ids if pk in found]
+        calendars = availability.calendars(counsellor_ids) if counsellor_ids else {}
+        now = timezone.now()
+        return Response({
+            'date_from': date_from.isoformat(),
+            'date_to': date_to.isoformat(),
+            'results': [
+                {'counsellor_id': pk, 'days': calendars[pk].compact_days(date_from, date_to, now)}
+                for pk in counsellor_ids
+            ],
+            'not_found': [pk for pk in ids if pk not in found],
+        }, status=status.HTTP_200_OK)
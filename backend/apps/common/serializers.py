@@ -0,0 +1,198 @@
+"""
+Fast read-only rendering for list endpoints.
+
+DRF's Serializer.to_representation walks every readable field per row:
+field.get_attribute() (a generic source_attrs walk with exception handling),
+a PKOnlyObject check and a to_representation() call. For list endpoints with
+plain read-only fields most of that work is the same for every row.
+
+FastListSerializer compiles a serializer's fields once per (serializer class,
+field set) into accessor steps and renders rows with them:
+  - getters are operator.attrgetter/itemgetter over the field source (the FK
+    id for PrimaryKeyRelatedField, the row itself for source="*")
+  - values are converted with str/int/identity where that is exactly what
+    the DRF field returns, decimals with a pre-bound quantize, and with the
+    field's own to_representation otherwise (datetimes, booleans, choices, ...)
+  - SerializerMethodFields call the bound get_<name> method directly
+Nested serializers, fields with their own get_attribute, and rows where a
+getter fails (a None halfway through a dotted source) go through the regular
+DRF path per field. A child serializer that overrides to_representation is
+rendered by DRF entirely. The JSON is the same either way.
+
+Opt in per serializer:
+
+    class Meta:
+        list_serializer_class = FastListSerializer
+"""
+import decimal
+import operator
+from collections.abc import Mapping
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db import models
+from rest_framework import fields as drf_fields
+from rest_framework import relations, serializers
+from rest_framework.fields import SkipField
+from rest_framework.settings import api_settings
+from rest_framework.relations import PKOnlyObject
+
+
+def _identity(value):
+    return value
+
+
+# to_representation implementations that are a plain conversion of a non-None value
+_CONVERSIONS = {
+    drf_fields.CharField.to_representation: str,  # EmailField, URLField, ... inherit it
+    drf_fields.IntegerField.to_representation: int,
+    drf_fields.ReadOnlyField.to_representation: _identity,
+}
+
+METHOD, ACCESSOR, DRF = "method", "accessor", "drf"
+
+# (serializer class, field names) -> compiled steps
+_plans = {}
+
+
+def _conversion(field):
+    """The conversion for a field's values, or None to call its to_representation."""
+    if isinstance(field, drf_fields.JSONField):
+        return None if field.binary else _identity
+    return _CONVERSIONS.get(type(field).to_representation)
+
+
+def _decimal_conversion(field):
+    """
+    DecimalField.to_representation for the common case (quantize, then format
+    as a string), with the quantize exponent and context built once per render
+    instead of once per value. None if the field is configured otherwise.
+    """
+    if (type(field).to_representation is not drf_fields.DecimalField.to_representation
+            or type(field).quantize is not drf_fields.DecimalField.quantize
+            or field.decimal_places is None or field.localize or getattr(field, "normalize_output", False)
+            or not getattr(field, "coerce_to_string", api_settings.COERCE_DECIMAL_TO_STRING)):
+        return None
+    exponent = decimal.Decimal(".1") ** field.decimal_places
+    context = decimal.getcontext().copy()
+    if field.max_digits is not None:
+        context.prec = field.max_digits
+    rounding = field.rounding
+
+    def convert(value):
+        if not isinstance(value, decimal.Decimal):
+            value = decimal.Decimal(str(value).strip())
+        return "{:f}".format(value.quantize(exponent, rounding=rounding, context=context))
+    return convert
+
+
+def _getters(field, model):
+    """Return (getter for objects, getter for mappings or None), or None if unsupported."""
+    if field.source == "*":
+        return _identity, _identity
+    attrs = field.source_attrs
+    if isinstance(field, relations.PrimaryKeyRelatedField):
+        # DRF renders the FK column without loading the related row; so do we
+        if (len(attrs) != 1 or model is None or field.pk_field is not None
+                or type(field).get_attribute is not relations.RelatedField.get_attribute
+                or type(field).to_representation is not relations.PrimaryKeyRelatedField.to_representation):
+            return None
+        try:
+            model_field = model._meta.get_field(attrs[0])
+        except FieldDoesNotExist:
+            return None
+        if not isinstance(model_field, models.ForeignKey):
+            return None
+        return operator.attrgetter(model_field.attname), operator.itemgetter(attrs[0])
+    if isinstance(field, (relations.RelatedField, relations.ManyRelatedField)):
+        return None
+    if type(field).get_attribute is not drf_fields.Field.get_attribute:
+        # the field finds its own value; only DRF knows how
+        return None
+    if len(attrs) == 1:
+        return operator.attrgetter(attrs[0]), operator.itemgetter(attrs[0])
+    # dotted sources (client.email): objects only, dict rows take the DRF path
+    return operator.attrgetter(".".join(attrs)), None
+
+
+def compile_plan(serializer):
+    """
+    Compile the readable fields of a serializer into render steps of
+    (field name, kind, object getter, mapping getter, conversion).
+    """
+    readable = list(serializer._readable_fields)
+    key = (type(serializer), tuple(field.field_name for field in readable))
+    plan = _plans.get(key)
+    if plan is None:
+        model = getattr(getattr(serializer, "Meta", None), "model", None)
+        steps = []
+        for field in readable:
+            if isinstance(field, drf_fields.SerializerMethodField):
+                steps.append((field.field_name, METHOD, None, None, None))
+                continue
+            getters = None if isinstance(field, serializers.BaseSerializer) else _getters(field, model)
+            if getters is None:
+                steps.append((field.field_name, DRF, None, None, None))
+            else:
+                # a PrimaryKeyRelatedField getter already yields the id
+                conversion = _identity if isinstance(field, relations.PrimaryKeyRelatedField) else _conversion(field)
+                steps.append((field.field_name, ACCESSOR, getters[0], getters[1], conversion))
+        plan = _plans[key] = tuple(steps)
+    return plan
+
+
+def _render_field(field, instance):
+    """The regular DRF rendering of one field; raises SkipField like DRF does."""
+    attribute = field.get_attribute(instance)
+    check_for_none = attribute.pk if isinstance(attribute, PKOnlyObject) else attribute
+    return None if check_for_none is None else field.to_representation(attribute)
+
+
+class FastListSerializer(serializers.ListSerializer):
+    """ListSerializer that renders its child with a compiled plan (see module docstring)."""
+
+    def to_representation(self, data):
+        child = self.child
+        if type(child).to_representation is not serializers.Serializer.to_representation:
+            # the child renders rows its own way
+            return super().to_representation(data)
+        iterable = data.all() if isinstance(data, models.manager.BaseManager) else data
+        fields = child.fields
+
+        # bind this serializer's field objects / methods once per render, not per row
+        steps = []
+        for name, kind, get_obj, get_map, conversion in compile_plan(child):
+            field = fields[name]
+            if kind == METHOD:
+                steps.append((name, field, getattr(child, field.method_name), None, None))
+            elif kind == ACCESSOR:
+                convert = conversion or _decimal_conversion(field) or field.to_representation
+                steps.append((name, field, get_obj, get_map, convert))
+            else:
+                steps.append((name, field, None, None, None))
+
+        rendered = []
+        for row in iterable:
+            is_mapping = isinstance(row, Mapping)
+            ret = {}
+            for name, field, getter, map_getter, convert in steps:
+                if convert is None and getter is not None:
+                    # SerializerMethodField
+                    ret[name] = getter(row)
+                    continue
+                if is_mapping:
+                    getter = map_getter
+                if getter is not None:
+                    try:
+                        value = getter(row)
+                    except (AttributeError, KeyError):
+                        pass  # e.g. a None halfway through a dotted source; let DRF decide
+                    else:
+                        if not callable(value):  # DRF calls method sources; leave those to it
+                            ret[name] = None if value is None else convert(value)
+                            continue
+                try:
+                    ret[name] = _render_field(field, row)
+                except SkipField:
+                    pass
+            rendered.append(ret)
+        return rendered
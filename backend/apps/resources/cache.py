@@ -0,0 +1,75 @@
+"""
+Response cache for the public resources listing.
+
+Cached pages depend on the resource types they can contain, and each type has
+its own generation counter in the Django cache. A page filtered by type embeds
+that type's generation in its cache key, and an unfiltered page embeds all of
+them. Saving or deleting a resource bumps only its type(s), so pages of the
+other types stay cached.
+
+Responses carry the same dependencies as Surrogate-Key header values
+("resources-<type>", plus "resource-<id>" for every row on the page). Whenever
+a generation moves, surrogate_keys_invalidated is sent with the keys to purge,
+so a reverse proxy / CDN purge can be connected to it.
+"""
+import hashlib
+
+from django.conf import settings
+from django.dispatch import Signal
+
+from apps.search.cache import bump_generation, cache_timeout, get_generations
+from .models import Resource
+
+TYPES = tuple(Resource.Types.values)
+
+# sent with keys=[surrogate keys] after cached listings went stale
+surrogate_keys_invalidated = Signal()
+
+
+def type_surrogate_key(rtype):
+    return f"resources-{rtype}"
+
+
+def resource_surrogate_key(pk):
+    return f"resource-{pk}"
+
+
+def _generation_key(rtype):
+    return f"resources:generation:{rtype}"
+
+
+def generations(types):
+    """Current generation per type, in the order given."""
+    found = get_generations([_generation_key(rtype) for rtype in types])
+    return [found[_generation_key(rtype)] for rtype in types]
+
+
+def invalidate(types, resource_ids=()):
+    """Make every cached listing that can contain these types stale."""
+    types = [rtype for rtype in TYPES if rtype in set(types)]
+    for rtype in types:
+        bump_generation(_generation_key(rtype))
+    keys = [type_surrogate_key(rtype) for rtype in types]
+    keys += [resource_surrogate_key(pk) for pk in resource_ids]
+    if keys:
+        surrogate_keys_invalidated.send(sender=Resource, keys=keys)
+
+
+def response_key(parts, types):
+    """Cache key for one listing page; ``parts`` are the normalized query params."""
+    digest = hashlib.sha1("\x1f".join(parts).encode()).hexdigest()
+    version = ".".join(str(generation) for generation in generations(types))
+    return f"resources:list:{version}:{digest}"
+
+
+def response_cache_timeout():
+    return cache_timeout(getattr(settings, "RESOURCES_CACHE_TIMEOUT", 300))
+
+
+def browser_max_age():
+    return getattr(settings, "RESOURCES_CACHE_MAX_AGE", 60)
+
+
+def shared_max_age():
+    """s-maxage for reverse proxies, which can be purged by surrogate key."""
+    return getattr(settings, "RESOURCES_CACHE_S_MAXAGE", 300)
@@ -0,0 +1,38 @@
+"""
+Full-text index over the resource catalogue (title, description).
+
+Uses the engines from apps.search.fulltext: an FTS5 table with bm25() ranking
+on SQLite, a tsvector column with ts_rank() on Postgres, icontains otherwise.
+Documents are rewritten on Resource save/delete (see signals.py) and can be
+rebuilt with ``manage.py rebuild_resource_fulltext``.
+"""
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models import Q
+
+from apps.search import fulltext
+
+from .models import Resource
+
+
+class ResourceDocuments(fulltext.Documents):
+    table = "resources_resource_fts"
+    key = "resource_id"
+    columns = ("title", "description")
+    # a title hit outranks the same word in a description
+    weights = (10.0, 1.0)
+    pg_weights = "AB"
+    # partial words ("stre") match, as the old icontains filter did
+    prefix = True
+
+    def load(self, ids=None):
+        qs = Resource.objects.all()
+        if ids is not None:
+            qs = qs.filter(id__in=ids)
+        return {pk: (title, description or "") for pk, title, description in qs.values_list("id", "title", "description")}
+
+    def like_search(self, q):
+        return Resource.objects.filter(Q(title__icontains=q) | Q(description__icontains=q)).values_list("id", flat=True)
+
+
+def get_engine(using=DEFAULT_DB_ALIAS):
+    return fulltext.get_engine(using, ResourceDocuments)
@@ -0,0 +1,22 @@
+# apps/resources/management/commands/rebuild_resource_fulltext.py
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS, transaction
+
+from apps.resources.cache import TYPES, invalidate
+from apps.resources.fulltext import get_engine
+
+
+class Command(BaseCommand):
+    help = "Recreate the resource full-text documents from the Resource table."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--database", default=DEFAULT_DB_ALIAS, help="Database alias to rebuild")
+
+    def handle(self, *args, **options):
+        engine = get_engine(options["database"])
+        with transaction.atomic(using=options["database"]):
+            engine.ensure_schema()
+            engine.rebuild()
+        # cached listings were answered from the old documents
+        invalidate(TYPES)
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt resource full-text documents with {type(engine).__name__}"))
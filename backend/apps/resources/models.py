@@ -20,6 +20,11 @@ class Resource(models.Model):
         ordering = ["-created_at"]
         verbose_name = "Resource"
         verbose_name_plural = "Resources"
+        indexes = [
+            # newest-first listing and its keyset cursor, with and without ?type=
+            models.Index(fields=["-created_at", "-id"]),
+            models.Index(fields=["resource_type", "-created_at", "-id"]),
+        ]
 
     def __str__(self):
         return f"{self.title} ({self.resource_type})"
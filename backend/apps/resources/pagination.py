@@ -1,6 +1,19 @@
-from rest_framework.pagination import PageNumberPagination
+from rest_framework.pagination import PageNumberPagination, CursorPagination
 
-class ResourcePagination(PageNumberPagination):
+from apps.search.pagination import CountStrategyMixin
+
+class ResourcePagination(CountStrategyMixin, PageNumberPagination):
+    page_size = 9
+    page_size_query_param = "page_size"
+    max_page_size = 15
+
+
+class ResourceCursorPagination(CursorPagination):
+    """
+    Keyset pagination for infinite scroll: newest first, no COUNT and no OFFSET.
+    id breaks ties between resources created in the same instant.
+    """
     page_size = 9
     page_size_query_param = "page_size"
     max_page_size = 15
+    ordering = ("-created_at", "-id")
@@ -1,7 +1,9 @@
 from rest_framework import serializers
 from .models import Resource
+from apps.common.serializers import FastListSerializer
 
 class ResourceSerializer(serializers.ModelSerializer):
     class Meta:
         model = Resource
+        list_serializer_class = FastListSerializer
         fields = ("id", "title", "description", "resource_type", "url", "thumbnail_url")
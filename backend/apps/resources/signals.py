@@ -0,0 +1,37 @@
+"""
+Keep state derived from Resource in step with writes: the full-text documents
+(in the same transaction) and the cached listing pages (after commit, see
+cache.py).
+"""
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+
+from .cache import invalidate
+from .fulltext import get_engine
+from .models import Resource
+
+
+@receiver(post_save, sender=Resource)
+@receiver(post_delete, sender=Resource)
+def reindex_resource(sender, instance, using, **kwargs):
+    get_engine(using).index([instance.pk])
+
+
+@receiver(pre_save, sender=Resource)
+def remember_resource_type(sender, instance, raw=False, **kwargs):
+    # a type change makes the resource leave its old type's listings too
+    if instance.pk and not raw:
+        instance._previous_type = (
+            Resource.objects.filter(pk=instance.pk).values_list("resource_type", flat=True).first()
+        )
+
+
+@receiver(post_save, sender=Resource)
+@receiver(post_delete, sender=Resource)
+def invalidate_resource_listings(sender, instance, using=None, **kwargs):
+    types = {instance.resource_type, getattr(instance, "_previous_type", None)}
+    # after commit: a listing read in between would cache the old rows under the new version
+    transaction.on_commit(partial(invalidate, types, [instance.pk]), using=using)
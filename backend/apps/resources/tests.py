@@ -1,10 +1,27 @@
+from io import StringIO
+from unittest.mock import patch
+
+from django.core.management import call_command
+
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.utils import timezone
-from rest_framework.test import APITestCase
+from rest_framework.serializers import ListSerializer
+from django.test import TestCase
+from rest_framework.request import Request
+from rest_framework.test import APITestCase, APIRequestFactory
 from rest_framework import status
 
 from apps.resources.models import Resource
 from apps.resources.serializers import ResourceSerializer
+from apps.resources.pagination import ResourcePagination
+from apps.resources.cache import surrogate_keys_invalidated
+from apps.resources.fulltext import ResourceDocuments, get_engine
+from apps.resources.views import ResourceListView
+from apps.search.fulltext import LikeEngine
+from apps.search.query_plans import QueryPlanAssertions, plan_problems
 
 
 class ResourceModelTests(APITestCase):
@@ -58,6 +75,17 @@ class ResourceSerializerTests(APITestCase):
         self.assertIn("resource_type", serializer.errors)
 
 
+    def test_list_fast_path_matches_drf(self):
+        Resource.objects.create(title="A", resource_type="pdf", url="https://example.com/a")
+        Resource.objects.create(
+            title="B", description="d", resource_type="video", url="https://example.com/b",
+            thumbnail_url="https://example.com/b.png",
+        )
+        rows = list(Resource.objects.all())
+        drf = ListSerializer(rows, child=ResourceSerializer()).data
+        self.assertEqual(ResourceSerializer(rows, many=True).data, drf)
+        self.assertEqual(ResourceSerializer(Resource.objects.values(), many=True).data, drf)
+
 class ResourceAPITests(APITestCase):
     """API tests for Resource list endpoint with search & filter."""
 
@@ -132,4 +160,259 @@ class ResourceAPITests(APITestCase):
     def test_no_results(self):
         response = self.client.get(self.url, {"q": "abcdxyz"})
         self.assertEqual(len(response.data["results"]), 0)
-        
\ No newline at end of file
+        
+
+class ResourceCursorPaginationTests(APITestCase):
+    """Opt-in keyset pagination for infinite scroll."""
+
+    def setUp(self):
+        cache.clear()  # page-number counts are cached per filter signature
+        self.url = reverse("resources-list")
+        now = timezone.now()
+        for i in range(5):
+            Resource.objects.create(
+                title=f"Resource {i}", resource_type="article",
+                url=f"https://example.com/{i}",
+                # two resources share a timestamp to exercise the id tie-break
+                created_at=now - timezone.timedelta(minutes=min(i, 3)),
+            )
+
+    def test_walk_all_pages_without_count(self):
+        titles = []
+        res = self.client.get(self.url, {"pagination": "cursor", "page_size": 2})
+        while True:
+            self.assertEqual(res.status_code, 200)
+            self.assertNotIn("count", res.data)
+            titles += [r["title"] for r in res.data["results"]]
+            if not res.data["next"]:
+                break
+            res = self.client.get(res.data["next"])
+        self.assertEqual(sorted(titles), [f"Resource {i}" for i in range(5)])
+        self.assertEqual(len(titles), 5)
+
+    def test_page_number_mode_is_default(self):
+        res = self.client.get(self.url)
+        self.assertEqual(res.data["count"], 5)
+
+
+class ResourceCountStrategyTests(APITestCase):
+    """Cached and estimated totals for page-number pagination."""
+
+    def setUp(self):
+        cache.clear()
+        self.url = reverse("resources-list")
+        for i in range(5):
+            Resource.objects.create(
+                title=f"Sleep guide {i}", resource_type="pdf", url=f"https://example.com/s{i}"
+            )
+
+    def test_count_is_cached_per_filter_signature(self):
+        res = self.client.get(self.url, {"type": "pdf", "page_size": 2})
+        self.assertEqual(res.data["count"], 5)
+        self.assertTrue(res.data["count_exact"])
+        # another page of the same filter set only runs the page query
+        with self.assertNumQueries(1):
+            self.client.get(self.url, {"type": "pdf", "page_size": 2, "page": 2})
+
+    def test_cached_count_follows_writes(self):
+        self.client.get(self.url, {"type": "pdf", "page_size": 2})
+        with self.captureOnCommitCallbacks(execute=True):
+            Resource.objects.create(title="Sleep guide 5", resource_type="pdf", url="https://example.com/s5")
+        res = self.client.get(self.url, {"type": "pdf", "page_size": 2, "page": 3})
+        self.assertEqual(res.data["count"], 6)
+
+    def test_count_is_not_cached_without_a_version(self):
+        from types import SimpleNamespace
+        from django.test import RequestFactory
+        from rest_framework.request import Request
+        request = Request(RequestFactory().get(self.url, {"page_size": 2}))
+        view = SimpleNamespace()  # no count_cache_version()
+        ResourcePagination().paginate_queryset(Resource.objects.order_by("id"), request, view)
+        Resource.objects.create(title="Sleep guide 5", resource_type="pdf", url="https://example.com/s5")
+        paginator = ResourcePagination()
+        paginator.paginate_queryset(Resource.objects.order_by("id"), request, view)
+        self.assertEqual(paginator.page.paginator.count, 6)
+
+    def test_expensive_filter_reports_lower_bound(self):
+        # only the icontains fallback is expensive; full-text matches are counted exactly
+        like = LikeEngine(documents=ResourceDocuments())
+        with patch.object(ResourcePagination, "count_lookahead_pages", 1), \
+                patch("apps.resources.views.get_engine", return_value=like):
+            res = self.client.get(self.url, {"q": "sleep", "page_size": 2})
+        self.assertEqual(res.data["count"], 4)
+        self.assertFalse(res.data["count_exact"])
+        self.assertIsNotNone(res.data["next"])
+
+    def test_small_expensive_result_is_exact(self):
+        res = self.client.get(self.url, {"q": "guide 3"})
+        self.assertEqual(res.data["count"], 1)
+        self.assertTrue(res.data["count_exact"])
+
+
+class ResourceFullTextTests(APITestCase):
+    """Full-text matching and relevance ordering."""
+
+    def setUp(self):
+        cache.clear()
+        self.url = reverse("resources-list")
+        now = timezone.now()
+        self.body = Resource.objects.create(
+            title="Evening routine", description="A calm routine helps sleep come sooner",
+            resource_type="article", url="https://example.com/r1", created_at=now,
+        )
+        self.title = Resource.objects.create(
+            title="Sleep hygiene basics", description="Small habits for better nights",
+            resource_type="pdf", url="https://example.com/r2", created_at=now - timezone.timedelta(days=1),
+        )
+        Resource.objects.create(
+            title="Breathing exercises", description="Short practice for anxious moments",
+            resource_type="video", url="https://example.com/r3", created_at=now,
+        )
+
+    def titles(self, params):
+        res = self.client.get(self.url, params)
+        self.assertEqual(res.status_code, 200)
+        return [row["title"] for row in res.data["results"]]
+
+    def test_default_ordering_is_newest_first(self):
+        self.assertEqual(self.titles({"q": "sleep"}), ["Evening routine", "Sleep hygiene basics"])
+
+    def test_relevance_ordering_prefers_title_hits(self):
+        if isinstance(get_engine(), LikeEngine):
+            self.skipTest("database has no full-text support")
+        self.assertEqual(
+            self.titles({"q": "sleep", "ordering": "relevance"}), ["Sleep hygiene basics", "Evening routine"]
+        )
+        res = self.client.get(self.url, {"q": "sleep", "ordering": "relevance", "page_size": 1, "page": 2})
+        self.assertEqual(res.data["count"], 2)
+        self.assertEqual([row["title"] for row in res.data["results"]], ["Evening routine"])
+
+    def test_partial_words_match_as_prefixes(self):
+        self.assertEqual(self.titles({"q": "slee"}), ["Evening routine", "Sleep hygiene basics"])
+        self.assertEqual(self.titles({"q": "breath exer"}), ["Breathing exercises"])
+        if not isinstance(get_engine(), LikeEngine):
+            self.assertEqual(
+                self.titles({"q": "slee", "ordering": "relevance"}), ["Sleep hygiene basics", "Evening routine"]
+            )
+
+    def test_matches_are_filtered_and_ranked_in_sql(self):
+        if isinstance(get_engine(), LikeEngine):
+            self.skipTest("database has no full-text support")
+        table = get_engine().documents.table
+        for params in ({"q": "sleep"}, {"q": "sleep", "ordering": "relevance", "page_size": 1}):
+            cache.clear()
+            with CaptureQueriesContext(connection) as queries:
+                self.client.get(self.url, params)
+            # the full-text table is only ever read inside a query over resources
+            fts = [q["sql"] for q in queries if table in q["sql"]]
+            self.assertTrue(fts)
+            self.assertTrue(all('"resources_resource"' in sql for sql in fts), fts)
+        self.assertTrue(any("ORDER BY bm25" in sql and "LIMIT 1" in sql for sql in fts), fts)
+
+    def test_index_follows_saves_and_deletes(self):
+        self.title.title = "Night habits"
+        self.title.description = "Wind down earlier"
+        with self.captureOnCommitCallbacks(execute=True):
+            self.title.save()
+        self.assertEqual(self.titles({"q": "sleep"}), ["Evening routine"])
+        self.assertEqual(self.titles({"q": "habits"}), ["Night habits"])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.body.delete()
+        self.assertEqual(self.titles({"q": "sleep"}), [])
+
+    def test_rebuild_command(self):
+        Resource.objects.bulk_create([
+            Resource(title="Sleep diary", resource_type="pdf", url="https://example.com/r4"),
+        ])  # bulk_create skips the signals
+        self.assertNotIn("Sleep diary", self.titles({"q": "diary"}))
+        call_command("rebuild_resource_fulltext", stdout=StringIO())
+        self.assertEqual(self.titles({"q": "diary"}), ["Sleep diary"])
+
+
+class ResourceListingCacheTests(APITestCase):
+    """Server-side page cache, ETag and surrogate keys."""
+
+    def setUp(self):
+        cache.clear()
+        self.url = reverse("resources-list")
+        self.article = Resource.objects.create(
+            title="Stress at work", resource_type="article", url="https://example.com/c1"
+        )
+        self.video = Resource.objects.create(
+            title="Stress relief video", resource_type="video", url="https://example.com/c2"
+        )
+
+    def test_repeat_requests_are_served_from_cache(self):
+        first = self.client.get(self.url, {"type": "article"})
+        self.assertEqual(first["Surrogate-Key"], f"resources-article resource-{self.article.pk}")
+        self.assertIn("public", first["Cache-Control"])
+        self.assertIn("s-maxage", first["Cache-Control"])
+        with self.assertNumQueries(0):
+            again = self.client.get(self.url, {"type": "article"})
+        self.assertEqual(again.data, first.data)
+        with self.assertNumQueries(0):
+            res = self.client.get(self.url, {"type": "article"}, HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual(res.status_code, 304)
+
+    def test_save_retires_only_pages_of_its_type(self):
+        self.client.get(self.url, {"type": "article"})
+        self.client.get(self.url, {"type": "video"})
+        self.client.get(self.url)
+        purged = []
+        receiver = lambda sender, keys, **kwargs: purged.extend(keys)
+        surrogate_keys_invalidated.connect(receiver)
+        self.addCleanup(surrogate_keys_invalidated.disconnect, receiver)
+
+        self.video.title = "Stress relief clip"
+        with self.captureOnCommitCallbacks(execute=True):
+            self.video.save()
+            self.assertEqual(purged, [])  # nothing is retired before the write commits
+        self.assertEqual(purged, ["resources-video", f"resource-{self.video.pk}"])
+
+        with self.assertNumQueries(0):
+            self.client.get(self.url, {"type": "article"})
+        res = self.client.get(self.url, {"type": "video"})
+        self.assertEqual(res.data["results"][0]["title"], "Stress relief clip")
+        res = self.client.get(self.url)
+        self.assertIn("Stress relief clip", [row["title"] for row in res.data["results"]])
+
+    def test_type_change_retires_old_and_new_type(self):
+        self.assertEqual(self.client.get(self.url, {"type": "article"}).data["count"], 1)
+        self.article.resource_type = "pdf"
+        with self.captureOnCommitCallbacks(execute=True):
+            self.article.save()
+        self.assertEqual(self.client.get(self.url, {"type": "article"}).data["count"], 0)
+        self.assertEqual(self.client.get(self.url, {"type": "pdf"}).data["count"], 1)
+
+    def test_cursor_pages_are_not_cached(self):
+        res = self.client.get(self.url, {"pagination": "cursor"})
+        self.assertNotIn("Surrogate-Key", res)
+
+
+class ResourceQueryPlanTests(QueryPlanAssertions, TestCase):
+    """The listing pages are read in index order, with or without ?type=."""
+
+    def listing_queryset(self, **params):
+        view = ResourceListView()
+        view.request = Request(APIRequestFactory().get("/api/resources/", params))
+        return view.get_queryset()
+
+    def test_newest_first(self):
+        self.assertIndexedPlan(self.listing_queryset()[:9])
+
+    def test_newest_first_by_type(self):
+        self.assertIndexedPlan(self.listing_queryset(type="pdf")[:9])
+
+    def test_index_walk_needs_a_limit(self):
+        if connection.vendor != "sqlite":
+            self.skipTest("query plans are only checked on SQLite")
+        # reading the whole index in order is as unbounded as reading the table
+        self.assertTrue(plan_problems(self.listing_queryset()))
+        self.assertEqual(plan_problems(self.listing_queryset()[:9]), [])
+
+    def test_cursor_pages(self):
+        before = timezone.now()
+        self.assertIndexedPlan(Resource.objects.filter(created_at__lt=before).order_by("-created_at", "-id")[:9])
+        self.assertIndexedPlan(
+            Resource.objects.filter(resource_type="video", created_at__lt=before).order_by("-created_at", "-id")[:9]
+        )
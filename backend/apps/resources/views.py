@@ -1,31 +1,155 @@
-from django.db.models import Q
+from django.core.cache import cache
+from django.utils.cache import patch_cache_control
+from django.utils.http import parse_etags
+from rest_framework import status
 from rest_framework.generics import ListAPIView
 from rest_framework.permissions import AllowAny
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+import hashlib
 
+from . import cache as listing_cache
 from .models import Resource
 from .serializers import ResourceSerializer
-from .pagination import ResourcePagination
+from .pagination import ResourcePagination, ResourceCursorPagination
+from .fulltext import get_engine
+from apps.search.fulltext import LikeEngine
+from apps.search.pagination import CursorPaginationOptInMixin
 
-class ResourceListView(ListAPIView):
+class RankedMatches:
+    """
+    The ids of a full-text filtered queryset in relevance order, fetched one
+    slice at a time (ORDER BY rank LIMIT/OFFSET) when the paginator asks.
+    """
+
+    def __init__(self, queryset, q):
+        self.queryset = queryset
+        self.q = q
+
+    def count(self):
+        return self.queryset.count()
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice) or index.step is not None:
+            raise TypeError("RankedMatches supports plain slices only")
+        start = index.start or 0
+        if index.stop is None or index.stop <= start:
+            return []
+        return get_engine().ranked_ids(self.queryset, self.q, index.stop - start, start)
+
+
+class ResourceListView(CursorPaginationOptInMixin, ListAPIView):
     """
     GET /api/resources/?q=stress&type=article&page=1&page_size=9
-    - q: search text (title/description)
+    - q: search text, matched against the full-text index of title/description;
+      every word also matches as a prefix ("stre" finds "stress")
     - type: article | video | pdf
+    - ordering: newest (default) | relevance (bm25 / ts_rank of q; page-number
+      pagination only)
+    - pagination=cursor / cursor: keyset pagination without a total count
+
+    Page-number responses are cached per (q, type, ordering, page, page_size)
+    and sent with Cache-Control, ETag and Surrogate-Key headers; saving or
+    deleting a resource retires only the pages of its type (see cache.py).
     """
     permission_classes = [AllowAny]
     serializer_class = ResourceSerializer
     pagination_class = ResourcePagination
+    cursor_pagination_class = ResourceCursorPagination
+
+    def search_text(self):
+        return (self.request.query_params.get("q") or "").strip()
+
+    def orders_by_relevance(self):
+        ordering = (self.request.query_params.get("ordering") or "").lower()
+        return ordering == "relevance" and bool(self.search_text())
+
+    def uses_cursor_pagination(self):
+        # cursors are positioned on created_at, which relevance pages aren't sorted by
+        return not self.orders_by_relevance() and super().uses_cursor_pagination()
+
+    def count_is_expensive(self):
+        # the icontains fallback scans the whole table; full-text matches are counted exactly
+        return bool(self.search_text()) and isinstance(get_engine(), LikeEngine)
+
+    def resource_type(self):
+        rtype = (self.request.query_params.get("type") or "").strip().lower()
+        return rtype if rtype in listing_cache.TYPES else None
+
+    def listing_types(self):
+        """The resource types this request's pages can contain."""
+        rtype = self.resource_type()
+        return (rtype,) if rtype else listing_cache.TYPES
+
+    def count_cache_version(self):
+        return ".".join(str(g) for g in listing_cache.generations(self.listing_types()))
 
     def get_queryset(self):
         qs = Resource.objects.all()
-        params = self.request.query_params
 
-        q = (params.get("q") or "").strip()
+        q = self.search_text()
         if q:
-            qs = qs.filter(Q(title__icontains=q) | Q(description__icontains=q))
+            # a subquery against the full-text table, so matches never leave the database
+            qs = get_engine().filter(qs, q)
 
-        rtype = (params.get("type") or "").strip().lower()
-        if rtype in ("article", "video", "pdf"):
+        rtype = self.resource_type()
+        if rtype:
             qs = qs.filter(resource_type=rtype)
 
         return qs.order_by("-created_at")
+
+    def list(self, request, *args, **kwargs):
+        if self.uses_cursor_pagination():
+            return self.build_list()
+
+        params = request.query_params
+        parts = [
+            # next/previous links are absolute
+            request.build_absolute_uri(request.path),
+            self.search_text().lower(),
+            self.resource_type() or "",
+            "relevance" if self.orders_by_relevance() else "newest",
+            params.get("page") or "1",
+            str(self.paginator.get_page_size(request)),
+        ]
+        types = self.listing_types()
+        key = listing_cache.response_key(parts, types)
+        cached = cache.get(key)
+        if cached is None:
+            response = self.build_list()
+            if response.status_code != status.HTTP_200_OK:
+                return response
+            data = response.data
+            etag = '"%s"' % hashlib.sha1(JSONRenderer().render(data)).hexdigest()[:20]
+            ids = [row["id"] for row in data["results"]]
+            cached = (data, etag, ids)
+            cache.set(key, cached, listing_cache.response_cache_timeout())
+
+        data, etag, ids = cached
+        if etag in parse_etags(request.headers.get("If-None-Match", "")):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = Response(data)
+        response["ETag"] = etag
+        response["Surrogate-Key"] = " ".join(
+            [listing_cache.type_surrogate_key(rtype) for rtype in types]
+            + [listing_cache.resource_surrogate_key(pk) for pk in ids]
+        )
+        patch_cache_control(
+            response, public=True,
+            max_age=listing_cache.browser_max_age(), s_maxage=listing_cache.shared_max_age(),
+        )
+        return response
+
+    def build_list(self):
+        if not self.orders_by_relevance():
+            return super().list(self.request)
+
+        # the database ranks the matches and reads one page of ids; then load only those rows
+        page_ids = self.paginate_queryset(RankedMatches(self.get_queryset(), self.search_text()))
+        resources = Resource.objects.in_bulk(page_ids)
+        page = [resources[pk] for pk in page_ids if pk in resources]
+        return self.get_paginated_response(self.get_serializer(page, many=True).data)
@@ -1,6 +1,20 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
+
+
+def create_fulltext_schema(sender, using, **kwargs):
+    """Create the counsellor full-text table (not a model) and fill it on first run."""
+    from .fulltext import get_engine
+    engine = get_engine(using)
+    if engine.ensure_schema():
+        engine.rebuild()
 
 
 class SearchConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.search'
+
+    def ready(self):
+        # connect search index maintenance signals
+        from . import signals  # noqa: F401
+        post_migrate.connect(create_fulltext_schema, sender=self)
@@ -0,0 +1,202 @@
+"""
+Cache helpers for the search app.
+
+Generations are integer counters kept in the Django cache. Anything derived
+from the counsellor tables (the in-memory index, cached search pages) records
+the generation it was built at and is treated as stale once the counter moves.
+
+Other processes only see a bump through a shared cache backend. With a
+per-process one (LocMemCache, the default in settings.py) in-process
+structures are also re-read after LOCAL_CACHE_MAX_AGE seconds and cached
+responses expire by then, so a write reaches every worker within that time.
+"""
+import hashlib
+import json
+import threading
+import time
+from decimal import Decimal, InvalidOperation
+from functools import partial
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import transaction
+
+INDEX_GENERATION = "search:generation"
+RESPONSE_GENERATION = "search:response-generation"
+OPTIONS_GENERATION = "search:options-generation"
+
+
+def _seed():
+    # counters (re)start from the clock, so a process still holding a value
+    # from before an eviction can't mistake the restarted counter for it
+    return time.time_ns() // 1000
+
+
+def get_generations(names):
+    """{name: generation}; missing counters are started."""
+    found = cache.get_many(names)
+    for name in names:
+        if name not in found:
+            cache.add(name, _seed(), timeout=None)
+            # another process may have won the add
+            found[name] = cache.get(name, 0)
+    return found
+
+
+def get_generation(name):
+    return get_generations([name])[name]
+
+
+def bump_generation(name):
+    """Increment a generation counter and return the new value."""
+    try:
+        return cache.incr(name)
+    except ValueError:
+        # key missing (evicted): restart it
+        seed = _seed()
+        if cache.add(name, seed, timeout=None):
+            return seed
+        return cache.incr(name)
+
+
+def bump_generation_on_commit(name, using=None):
+    """
+    Bump a generation once the current transaction commits (at once outside
+    one). Bumped earlier, a concurrent reader could cache the old committed
+    rows under the new generation, where they would outlive the write.
+    """
+    transaction.on_commit(partial(bump_generation, name), using=using)
+
+
+def adopts(previous, generation):
+    """
+    True if ``generation`` (returned by our own bump) directly follows
+    ``previous``, i.e. no other process wrote in between.
+    """
+    return previous is not None and generation == previous + 1
+
+
+def cache_is_shared():
+    """False for per-process backends, whose generation bumps other workers never see."""
+    return not isinstance(caches["default"], (LocMemCache, DummyCache))
+
+
+def local_max_age():
+    """
+    Seconds an in-process structure (search index, option lists, availability
+    calendars) is trusted without re-reading it; None when the cache is shared.
+    """
+    return getattr(settings, "LOCAL_CACHE_MAX_AGE", None if cache_is_shared() else 60)
+
+
+def expired(built_at):
+    """True if something built at ``built_at`` (time.monotonic()) is past local_max_age()."""
+    max_age = local_max_age()
+    return max_age is not None and time.monotonic() - built_at > max_age
+
+
+def cache_timeout(timeout):
+    """A response cache timeout, capped at local_max_age() when the cache isn't shared."""
+    max_age = local_max_age()
+    return timeout if max_age is None else min(timeout, max_age)
+
+
+# option tables (Specialization, AvailabilitySlot) cached per process:
+# model label -> (generation, rows, etag, built at)
+_option_lists = {}
+_option_lists_lock = threading.Lock()
+
+
+def option_list(model):
+    """
+    Return (rows, etag) for an option table as [{"id", "name"}], ordered by name.
+
+    Rows are read once per process and reused until OPTIONS_GENERATION moves
+    (admin save/delete, see signals.py). The ETag is strong and a hash of the
+    rows alone: generations differ between processes (and restart after an
+    eviction), so the same rows get the same ETag from every worker.
+    """
+    label = model._meta.label
+    generation = get_generation(OPTIONS_GENERATION)
+    cached = _option_lists.get(label)
+    if cached is not None and cached[0] == generation and not expired(cached[3]):
+        return cached[1], cached[2]
+    with _option_lists_lock:
+        rows = list(model.objects.order_by("name").values("id", "name"))
+        etag = '"%s"' % hashlib.sha1(json.dumps(rows).encode()).hexdigest()[:20]
+        _option_lists[label] = (generation, rows, etag, time.monotonic())
+    return rows, etag
+
+
+def option_list_max_age():
+    return getattr(settings, "SEARCH_OPTIONS_MAX_AGE", 3600)
+
+
+def _normalize_fee(value):
+    try:
+        return str(Decimal(value).normalize())
+    except (InvalidOperation, ValueError):
+        # keep invalid input distinct; the view answers it with an empty page
+        return f"invalid:{value}"
+
+
+def split_names(value):
+    """Comma-separated option names from a query param."""
+    return [name.strip() for name in (value or "").split(",") if name.strip()]
+
+
+def match_all(value):
+    """specialization_match / availability_match: 'all' or anything else (any-of)."""
+    return (value or "").strip().lower() == "all"
+
+
+def _names_key(value):
+    return ",".join(sorted({name.lower() for name in split_names(value)}))
+
+
+def _filter_parts(params):
+    return [
+        (params.get("q") or "").strip().lower(),
+        _names_key(params.get("specialization")),
+        "all" if match_all(params.get("specialization_match")) else "any",
+        _names_key(params.get("availability")),
+        "all" if match_all(params.get("availability_match")) else "any",
+        _normalize_fee(params["min_fee"]) if params.get("min_fee") else "",
+        _normalize_fee(params["max_fee"]) if params.get("max_fee") else "",
+    ]
+
+
+def _response_key(kind, parts):
+    digest = hashlib.sha1("\x1f".join(parts).encode()).hexdigest()
+    return f"search:{kind}:{get_generation(RESPONSE_GENERATION)}:{digest}"
+
+
+def search_response_key(params, ordering, page_size, fields=None):
+    """
+    Cache key for one page of counsellor search results.
+
+    Params are normalized so equivalent searches share an entry: q is
+    case-insensitive, specialization/availability are unordered name lists,
+    fees compare numerically, and ordering/page_size/fields are the values the
+    view actually applies.
+    """
+    parts = _filter_parts(params) + [
+        ordering, params.get("page") or "1", str(page_size), ",".join(fields) if fields else "*",
+    ]
+    return _response_key("counsellors", parts)
+
+
+def facets_response_key(params):
+    """Cache key for the facet counts of a search; same normalization as search_response_key."""
+    return _response_key("facets", _filter_parts(params))
+
+
+def fee_buckets():
+    """Ascending lower bounds of the fee facet buckets; the last one is open-ended."""
+    return getattr(settings, "SEARCH_FEE_BUCKETS", (0, 500, 1000, 1500, 2000))
+
+
+def response_cache_timeout():
+    return cache_timeout(getattr(settings, "SEARCH_RESPONSE_CACHE_TIMEOUT", 300))
@@ -0,0 +1,375 @@
+"""
+Full-text search over counsellor profiles (and, through Documents, any other
+table; see apps/resources/fulltext.py).
+
+The indexed document of a counsellor is their name, specialization names, bio
+and experience. It lives in a side table owned by this module and is rewritten
+by signal handlers whenever one of those inputs changes (see signals.py).
+
+Engines, picked per database vendor by get_engine():
+  - SQLiteFTS5Engine   : FTS5 virtual table, bm25() ranking
+  - PostgresEngine     : tsvector column + GIN index, ts_rank() ranking
+  - LikeEngine         : icontains fallback for anything else (score is 1.0)
+
+search() returns {pk: score} where a higher score is more relevant. For
+querysets too large to bring back in full, filter() narrows one to the
+matches with a SQL subquery and ranked_ids() reads a page of it ordered by
+rank, both in the database. With Documents.prefix every query word also
+matches as a prefix, so partial words ("stre") find "stress".
+"""
+import re
+
+from django.db import connections, DEFAULT_DB_ALIAS
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+from apps.accounts.models import CounsellorProfile
+
+TABLE = "search_counsellor_fts"
+
+# name, specializations, bio, experience -- a name or specialization hit
+# outranks the same word buried in a bio
+COLUMN_WEIGHTS = (10.0, 5.0, 1.0, 1.0)
+
+
+def tokenize(q):
+    return re.findall(r"\w+", q.lower())
+
+
+def load_documents(profile_ids=None):
+    """Return {profile_id: (name, specializations, bio, experience)}."""
+    qs = CounsellorProfile.objects.all()
+    through = CounsellorProfile.specializations.through.objects.all()
+    if profile_ids is not None:
+        qs = qs.filter(id__in=profile_ids)
+        through = through.filter(counsellorprofile_id__in=profile_ids)
+
+    specs = {}
+    for profile_id, name in through.values_list("counsellorprofile_id", "specialization__name"):
+        specs.setdefault(profile_id, []).append(name)
+
+    docs = {}
+    rows = qs.values_list("id", "user__first_name", "user__last_name", "bio", "experience")
+    for pk, first, last, bio, experience in rows:
+        name = f"{first or ''} {last or ''}".strip()
+        docs[pk] = (name, " ".join(specs.get(pk, ())), bio or "", experience or "")
+    return docs
+
+
+class Documents:
+    """
+    What an engine indexes: a side table keyed by ``key`` with one text column
+    per name in ``columns``, weighted by ``weights`` (bm25) and ``pg_weights``
+    (setweight letters), filled from load(). With ``prefix`` set, query words
+    match as prefixes of indexed words.
+    """
+    table = None
+    key = None
+    columns = ()
+    weights = ()
+    pg_weights = ""
+    prefix = False
+
+    def load(self, ids=None):
+        """Return {pk: (column text, ...)} for these ids, or for every row."""
+        raise NotImplementedError
+
+    def like_search(self, q):
+        """Matching ids for engines without full-text support."""
+        raise NotImplementedError
+
+
+class CounsellorDocuments(Documents):
+    table = TABLE
+    key = "profile_id"
+    columns = ("name", "specializations", "bio", "experience")
+    weights = COLUMN_WEIGHTS
+    pg_weights = "ABCC"
+
+    def load(self, ids=None):
+        return load_documents(ids)
+
+    def like_search(self, q):
+        return (
+            CounsellorProfile.objects
+            .filter(Q(bio__icontains=q) | Q(experience__icontains=q) | Q(specializations__name__icontains=q))
+            .values_list("id", flat=True)
+            .distinct()
+        )
+
+
+class FullTextEngine:
+    def __init__(self, using=DEFAULT_DB_ALIAS, documents=None):
+        self.using = using
+        self.documents = documents or CounsellorDocuments()
+
+    @property
+    def connection(self):
+        return connections[self.using]
+
+    def ensure_schema(self):
+        """Create the document table if needed; return True if it was created."""
+        return False
+
+    def index(self, ids):
+        """(Re)write the documents of these rows; missing rows are dropped."""
+        raise NotImplementedError
+
+    def rebuild(self):
+        raise NotImplementedError
+
+    def search(self, q):
+        raise NotImplementedError
+
+    def match_sql(self, q):
+        """(sql, params) of a subquery selecting the keys of matching documents, or None."""
+        raise NotImplementedError
+
+    def filter(self, queryset, q):
+        """``queryset`` narrowed to rows whose document matches q."""
+        match = self.match_sql(q)
+        if match is None:
+            return queryset.none()
+        return queryset.filter(pk__in=RawSQL(*match))
+
+    def ranked_ids(self, queryset, q, limit, offset=0):
+        """
+        Primary keys of one page of matching ``queryset`` rows, best match
+        first, ties broken by the queryset's ordering (plain field names only).
+        """
+        raise NotImplementedError
+
+    def _ranked(self, queryset, rank_join, rank_order, params, limit, offset):
+        # the filtered queryset becomes a derived table "base" joined to the documents
+        meta = queryset.model._meta
+        ties = []
+        for name in [*queryset.query.order_by, "-pk"]:
+            field = meta.pk if name.lstrip("-") == "pk" else meta.get_field(name.lstrip("-"))
+            ties.append((field, " DESC" if name.startswith("-") else ""))
+        base = queryset.order_by().values(*{field.attname: None for field, _ in ties})
+        base_sql, base_params = base.query.sql_with_params()
+        order = ", ".join([rank_order] + [f"base.{field.column}{direction}" for field, direction in ties])
+        sql = (
+            f"SELECT base.{meta.pk.column} FROM ({base_sql}) base {rank_join} "
+            f"ORDER BY {order} LIMIT %s OFFSET %s"
+        )
+        with self.connection.cursor() as cursor:
+            cursor.execute(sql, [*base_params, *params, limit, offset])
+            return [row[0] for row in cursor.fetchall()]
+
+
+class SQLiteFTS5Engine(FullTextEngine):
+
+    def ensure_schema(self):
+        table = self.documents.table
+        with self.connection.cursor() as cursor:
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE name = %s", [table])
+            if cursor.fetchone():
+                return False
+            # rowid is the row's pk, so updates are rowid lookups, not scans
+            cursor.execute(
+                f"CREATE VIRTUAL TABLE {table} USING fts5("
+                f"{', '.join(self.documents.columns)}, tokenize = 'porter unicode61')"
+            )
+        return True
+
+    def _write(self, docs):
+        columns = self.documents.columns
+        with self.connection.cursor() as cursor:
+            cursor.executemany(
+                f"INSERT INTO {self.documents.table} (rowid, {', '.join(columns)}) "
+                f"VALUES (%s, {', '.join(['%s'] * len(columns))})",
+                [(pk, *doc) for pk, doc in docs.items()],
+            )
+
+    def index(self, ids):
+        ids = list(ids)
+        if not ids:
+            return
+        with self.connection.cursor() as cursor:
+            placeholders = ", ".join(["%s"] * len(ids))
+            cursor.execute(f"DELETE FROM {self.documents.table} WHERE rowid IN ({placeholders})", ids)
+        self._write(self.documents.load(ids))
+
+    def rebuild(self):
+        with self.connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {self.documents.table}")
+        self._write(self.documents.load())
+
+    def _match_expression(self, q):
+        # quote every token so user input can't inject FTS5 query syntax; "tok"* is a prefix term
+        star = "*" if self.documents.prefix else ""
+        return " ".join(f'"{t}"{star}' for t in tokenize(q)) or None
+
+    def _bm25(self):
+        table = self.documents.table
+        return f"bm25({table}, {', '.join(str(w) for w in self.documents.weights)})"
+
+    def search(self, q):
+        match = self._match_expression(q)
+        if match is None:
+            return {}
+        table = self.documents.table
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT rowid, {self._bm25()} FROM {table} WHERE {table} MATCH %s",
+                [match],
+            )
+            # bm25() is lower-is-better
+            return {int(pk): -rank for pk, rank in cursor.fetchall()}
+
+    def match_sql(self, q):
+        match = self._match_expression(q)
+        if match is None:
+            return None
+        table = self.documents.table
+        return f"SELECT rowid FROM {table} WHERE {table} MATCH %s", [match]
+
+    def ranked_ids(self, queryset, q, limit, offset=0):
+        match = self._match_expression(q)
+        if match is None:
+            return []
+        table = self.documents.table
+        pk_column = queryset.model._meta.pk.column
+        return self._ranked(
+            queryset, f"JOIN {table} ON {table}.rowid = base.{pk_column} WHERE {table} MATCH %s",
+            # bm25() is lower-is-better
+            self._bm25(), [match], limit, offset,
+        )
+
+
+class PostgresEngine(FullTextEngine):
+    config = "english"
+
+    def ensure_schema(self):
+        table, key = self.documents.table, self.documents.key
+        with self.connection.cursor() as cursor:
+            cursor.execute("SELECT to_regclass(%s)", [table])
+            if cursor.fetchone()[0] is not None:
+                return False
+            cursor.execute(
+                f"CREATE TABLE {table} ({key} bigint PRIMARY KEY, document tsvector NOT NULL)"
+            )
+            cursor.execute(f"CREATE INDEX {table}_document_gin ON {table} USING GIN (document)")
+        return True
+
+    def _write(self, docs):
+        table, key = self.documents.table, self.documents.key
+        document = " || ".join(
+            f"setweight(to_tsvector('{self.config}', %s), '{weight}')" for weight in self.documents.pg_weights
+        )
+        with self.connection.cursor() as cursor:
+            cursor.executemany(
+                f"INSERT INTO {table} ({key}, document) VALUES (%s, {document}) "
+                f"ON CONFLICT ({key}) DO UPDATE SET document = EXCLUDED.document",
+                [(pk, *doc) for pk, doc in docs.items()],
+            )
+
+    def index(self, ids):
+        ids = list(ids)
+        if not ids:
+            return
+        docs = self.documents.load(ids)
+        gone = [pk for pk in ids if pk not in docs]
+        if gone:
+            with self.connection.cursor() as cursor:
+                cursor.execute(
+                    f"DELETE FROM {self.documents.table} WHERE {self.documents.key} = ANY(%s)", [gone]
+                )
+        self._write(docs)
+
+    def rebuild(self):
+        with self.connection.cursor() as cursor:
+            cursor.execute(f"TRUNCATE {self.documents.table}")
+        self._write(self.documents.load())
+
+    def _tsquery(self, q):
+        # tokens are \w+ only, so they can't carry tsquery syntax; tok:* is a prefix term
+        star = ":*" if self.documents.prefix else ""
+        return " & ".join(f"{t}{star}" for t in tokenize(q)) or None
+
+    def search(self, q):
+        tsquery = self._tsquery(q)
+        if tsquery is None:
+            return {}
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT {self.documents.key}, ts_rank(document, query) "
+                f"FROM {self.documents.table}, to_tsquery('{self.config}', %s) query "
+                "WHERE document @@ query",
+                [tsquery],
+            )
+            return {int(pk): float(rank) for pk, rank in cursor.fetchall()}
+
+    def match_sql(self, q):
+        tsquery = self._tsquery(q)
+        if tsquery is None:
+            return None
+        return (
+            f"SELECT {self.documents.key} FROM {self.documents.table} "
+            f"WHERE document @@ to_tsquery('{self.config}', %s)",
+            [tsquery],
+        )
+
+    def ranked_ids(self, queryset, q, limit, offset=0):
+        tsquery = self._tsquery(q)
+        if tsquery is None:
+            return []
+        table, key = self.documents.table, self.documents.key
+        pk_column = queryset.model._meta.pk.column
+        return self._ranked(
+            queryset,
+            f"JOIN {table} d ON d.{key} = base.{pk_column} "
+            f"CROSS JOIN to_tsquery('{self.config}', %s) query WHERE d.document @@ query",
+            "ts_rank(d.document, query) DESC", [tsquery], limit, offset,
+        )
+
+
+class LikeEngine(FullTextEngine):
+    """No full-text support: scan with icontains, every match scores the same."""
+
+    def index(self, ids):
+        pass
+
+    def rebuild(self):
+        pass
+
+    def search(self, q):
+        q = q.strip()
+        if not q:
+            return {}
+        return {pk: 1.0 for pk in self.documents.like_search(q)}
+
+    def filter(self, queryset, q):
+        q = q.strip()
+        if not q:
+            return queryset.none()
+        return queryset.filter(pk__in=self.documents.like_search(q))
+
+    def ranked_ids(self, queryset, q, limit, offset=0):
+        # every match scores the same: the queryset's own order
+        return list(self.filter(queryset, q).values_list("pk", flat=True)[offset:offset + limit])
+
+
+_engines = {}
+
+
+def get_engine(using=DEFAULT_DB_ALIAS, documents=CounsellorDocuments):
+    """The engine for a Documents class on a database, shared per process."""
+    key = (documents.table, using)
+    if key not in _engines:
+        connection = connections[using]
+        if connection.vendor == "postgresql":
+            engine_class = PostgresEngine
+        elif connection.vendor == "sqlite" and _sqlite_has_fts5(connection):
+            engine_class = SQLiteFTS5Engine
+        else:
+            engine_class = LikeEngine
+        _engines[key] = engine_class(using, documents())
+    return _engines[key]
+
+
+def _sqlite_has_fts5(connection):
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT sqlite_compileoption_used('ENABLE_FTS5')")
+        return bool(cursor.fetchone()[0])
@@ -0,0 +1,560 @@
+"""
+In-memory search index over CounsellorProfile.
+
+CounsellorSearchView used to answer every request with icontains ORs over the
+user table, an M2M join on specializations and a DISTINCT sort. The index keeps
+everything those filters need in memory so a search resolves to an ordered list
+of profile ids, and only the rows of the requested page are loaded from the DB.
+
+Structures:
+  - trigram postings over first_name / last_name / email (substring matching,
+    same semantics as icontains)
+  - padded word-trigram postings over first_name / last_name for typo-tolerant
+    matching, ranked by trigram similarity (pg_trgm style)
+  - specialization and availability membership as one int bitset per
+    counsellor; each option name (lower-cased) owns a bit, so any-of/all-of
+    filters are a mask test per candidate instead of set unions
+  - fee-sorted, name-sorted and recommended-score-sorted arrays of profile ids
+  - a prefix trie over names for search-box suggestions (see trie.py)
+
+Writes never touch the index directly: signal handlers (see signals.py) only
+mark a profile id dirty, and dirty ids are re-read in one query on the next
+search. Other processes learn about writes through a shared generation counter
+kept in the Django cache and rebuild on their next search (or, with a
+per-process cache backend, once the index is older than LOCAL_CACHE_MAX_AGE).
+"""
+import bisect
+import math
+import re
+import threading
+import time
+from decimal import Decimal
+
+from django.conf import settings
+
+from apps.accounts.models import CounsellorProfile
+from .cache import INDEX_GENERATION, get_generation, bump_generation, adopts, expired
+from .trie import PrefixTrie, word_keys
+from .models import CounsellorScore
+from .recommend import query_boost
+
+
+def trigrams(value):
+    """Return the set of 3-character substrings of a lower-cased value."""
+    value = value.lower()
+    return {value[i:i + 3] for i in range(len(value) - 2)}
+
+
+def word_trigrams(word):
+    """Trigrams of a word padded like pg_trgm ("  word "), so short words still have some."""
+    padded = f"  {word.lower()} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def similarity(a, b):
+    """Jaccard similarity of two trigram sets."""
+    shared = len(a & b)
+    return shared / (len(a) + len(b) - shared) if shared else 0.0
+
+
+def fuzzy_threshold():
+    return getattr(settings, "SEARCH_FUZZY_THRESHOLD", 0.3)
+
+
+class IndexedCounsellor:
+    """The subset of a counsellor profile the index needs to filter and order."""
+    __slots__ = ("id", "first_name", "last_name", "email", "fee", "specializations", "availability", "score")
+
+    def __init__(self, id, first_name, last_name, email, fee, specializations=0, availability=0, score=0.0):
+        self.id = id
+        self.first_name = first_name or ""
+        self.last_name = last_name or ""
+        self.email = email or ""
+        self.fee = fee if fee is not None else Decimal("0")
+        # bitsets, see OptionBits
+        self.specializations = specializations
+        self.availability = availability
+        # precomputed recommendation score, see recommend.py
+        self.score = score
+
+    @property
+    def text_fields(self):
+        return (self.first_name.lower(), self.last_name.lower(), self.email.lower())
+
+    @property
+    def label(self):
+        # what the search results show as full_name
+        return f"{self.first_name} {self.last_name}".strip() or self.email.split("@")[0]
+
+    @property
+    def name_words(self):
+        return re.findall(r"\w+", f"{self.first_name} {self.last_name}".lower())
+
+    @property
+    def name_key(self):
+        return (self.first_name, self.last_name, self.id)
+
+    @property
+    def fee_key(self):
+        return (self.fee, self.id)
+
+    @property
+    def score_key(self):
+        return (-self.score, self.first_name, self.last_name, self.id)
+
+
+class OptionBits:
+    """Assigns one bit per option name (case-insensitive) and builds masks from names."""
+
+    def __init__(self):
+        self._bits = {}
+
+    def __len__(self):
+        return len(self._bits)
+
+    def bit(self, name):
+        """Bit of an indexed name, allocating a new one for names seen for the first time."""
+        name = name.lower()
+        if name not in self._bits:
+            self._bits[name] = 1 << len(self._bits)
+        return self._bits[name]
+
+    def get(self, name):
+        return self._bits.get(name.lower())
+
+    def counts(self, by_bit):
+        """Translate {bit: count} into {name: count}."""
+        return {name: by_bit[bit] for name, bit in self._bits.items() if bit in by_bit}
+
+    def mask(self, names):
+        """Return (mask, all_known) for a list of names from a query."""
+        mask, all_known = 0, True
+        for name in names:
+            bit = self._bits.get(name.lower())
+            if bit is None:
+                all_known = False
+            else:
+                mask |= bit
+        return mask, all_known
+
+
+def iter_bits(mask):
+    """Yield the set bits of an int, lowest first."""
+    while mask:
+        low = mask & -mask
+        yield low
+        mask ^= low
+
+
+def _intersect(*sets):
+    """Intersect candidate sets where None means "everything"."""
+    sets = [s for s in sets if s is not None]
+    if not sets:
+        return None
+    sets.sort(key=len)
+    return set(sets[0]).intersection(*sets[1:])
+
+
+def mask_filter(bits, names, match_all):
+    """
+    Build a predicate over bitsets for a list of option names.
+
+    Returns None when nothing can match (any-of over unknown names only, or
+    all-of including an unknown name).
+    """
+    mask, all_known = bits.mask(names)
+    if match_all:
+        if not all_known:
+            return None
+        return lambda value: value & mask == mask
+    if not mask:
+        return None
+    return lambda value: value & mask != 0
+
+
+class CounsellorSearchIndex:
+    """Thread-safe, lazily built index. Use the module-level ``search_index``."""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._built = False
+        self._generation = None
+        self._built_at = 0.0
+        self._dirty = set()
+        self._clear()
+
+    def _clear(self):
+        self._entries = {}          # profile id -> IndexedCounsellor
+        self._trigrams = {}         # trigram -> set(profile ids)
+        self._name_grams = {}       # padded word trigram of a name -> set(profile ids)
+        self._name_trie = PrefixTrie()  # name (from each word on) -> profile ids
+        self._specialization_bits = OptionBits()
+        self._availability_bits = OptionBits()
+        self._by_fee = []           # sorted [(fee, id)]
+        self._by_name = []          # sorted [(first_name, last_name, id)]
+        self._by_score = []         # sorted [(-score, first_name, last_name, id)]
+
+    # ------------------------------------------------------------------
+    # maintenance
+    # ------------------------------------------------------------------
+    def reset(self):
+        """Drop everything; the next search rebuilds from the DB."""
+        with self._lock:
+            self._clear()
+            self._dirty.clear()
+            self._built = False
+            self._generation = None
+
+    def mark_dirty(self, profile_ids):
+        """
+        Record committed writes to these profiles; they are re-read on the next
+        search. Call after commit (see signals.py), or a search in between
+        would re-read the old rows and keep them.
+        """
+        with self._lock:
+            previous = self._generation if self._built else None
+            in_sync = previous is not None and previous == get_generation(INDEX_GENERATION)
+            self._dirty.update(profile_ids)
+            generation = bump_generation(INDEX_GENERATION)
+            if in_sync and adopts(previous, generation):
+                # only our own write moved it -- no reason to rebuild everything for it
+                self._generation = generation
+
+    def invalidate(self):
+        """Force a full rebuild on the next search (e.g. a specialization was renamed)."""
+        with self._lock:
+            self._built = False
+            bump_generation(INDEX_GENERATION)
+
+    def _load(self, profile_ids=None):
+        qs = CounsellorProfile.objects.filter(user__is_active=True)
+        spec_links = CounsellorProfile.specializations.through.objects.all()
+        slot_links = CounsellorProfile.availability.through.objects.all()
+        scores = CounsellorScore.objects.all()
+        if profile_ids is not None:
+            qs = qs.filter(id__in=profile_ids)
+            spec_links = spec_links.filter(counsellorprofile_id__in=profile_ids)
+            slot_links = slot_links.filter(counsellorprofile_id__in=profile_ids)
+            scores = scores.filter(profile_id__in=profile_ids)
+        scores = dict(scores.values_list("profile_id", "score"))
+
+        specs, slots = {}, {}
+        for profile_id, name in spec_links.values_list("counsellorprofile_id", "specialization__name"):
+            specs[profile_id] = specs.get(profile_id, 0) | self._specialization_bits.bit(name)
+        for profile_id, name in slot_links.values_list("counsellorprofile_id", "availabilityslot__name"):
+            slots[profile_id] = slots.get(profile_id, 0) | self._availability_bits.bit(name)
+
+        rows = qs.values_list("id", "user__first_name", "user__last_name", "user__email", "fees_per_session")
+        return [
+            IndexedCounsellor(pk, first, last, email, fee, specs.get(pk, 0), slots.get(pk, 0), scores.get(pk, 0.0))
+            for pk, first, last, email, fee in rows
+        ]
+
+    def _post(self, entry):
+        for field in entry.text_fields:
+            for gram in trigrams(field):
+                self._trigrams.setdefault(gram, set()).add(entry.id)
+        for word in entry.name_words:
+            for gram in word_trigrams(word):
+                self._name_grams.setdefault(gram, set()).add(entry.id)
+        for key in word_keys(entry.label):
+            self._name_trie.insert(key, entry.id)
+
+    def _add(self, entry):
+        self._entries[entry.id] = entry
+        self._post(entry)
+        bisect.insort(self._by_fee, entry.fee_key)
+        bisect.insort(self._by_name, entry.name_key)
+        bisect.insort(self._by_score, entry.score_key)
+
+    def _remove(self, profile_id):
+        entry = self._entries.pop(profile_id, None)
+        if entry is None:
+            return
+        grams = [(self._trigrams, gram) for field in entry.text_fields for gram in trigrams(field)]
+        grams += [(self._name_grams, gram) for word in entry.name_words for gram in word_trigrams(word)]
+        for index, gram in grams:
+            postings = index.get(gram)
+            if postings is not None:
+                postings.discard(profile_id)
+                if not postings:
+                    del index[gram]
+        for key in word_keys(entry.label):
+            self._name_trie.remove(key, profile_id)
+        for array, key in ((self._by_fee, entry.fee_key), (self._by_name, entry.name_key),
+                           (self._by_score, entry.score_key)):
+            pos = bisect.bisect_left(array, key)
+            if pos < len(array) and array[pos] == key:
+                del array[pos]
+
+    def _rebuild(self):
+        self._clear()
+        self._dirty.clear()
+        self._generation = get_generation(INDEX_GENERATION)
+        self._built_at = time.monotonic()
+        entries = self._load()
+        # bulk build: fill postings first, sort the arrays once at the end
+        for entry in entries:
+            self._entries[entry.id] = entry
+            self._post(entry)
+        self._by_fee = sorted(e.fee_key for e in entries)
+        self._by_name = sorted(e.name_key for e in entries)
+        self._by_score = sorted(e.score_key for e in entries)
+        self._built = True
+
+    def _refresh_dirty(self):
+        dirty, self._dirty = self._dirty, set()
+        for profile_id in dirty:
+            self._remove(profile_id)
+        # profiles that were deleted or deactivated simply don't come back
+        for entry in self._load(dirty):
+            self._add(entry)
+
+    def _ensure_fresh(self):
+        if (not self._built or self._generation != get_generation(INDEX_GENERATION)
+                or expired(self._built_at)):
+            self._rebuild()
+        elif self._dirty:
+            self._refresh_dirty()
+
+    # ------------------------------------------------------------------
+    # queries
+    # ------------------------------------------------------------------
+    def _match_text(self, q):
+        q = q.lower()
+        grams = trigrams(q)
+        if grams:
+            postings = [self._trigrams.get(g, set()) for g in grams]
+            postings.sort(key=len)
+            candidates = set(postings[0]).intersection(*postings[1:])
+        else:
+            # one or two characters: nothing to look up, scan the entries
+            candidates = self._entries.keys()
+        return {
+            pk for pk in candidates
+            if any(q in field for field in self._entries[pk].text_fields)
+        }
+
+    def _fee_slice(self, min_fee, max_fee):
+        lo = 0 if min_fee is None else bisect.bisect_left(self._by_fee, (min_fee,))
+        if max_fee is None:
+            hi = len(self._by_fee)
+        else:
+            # (max_fee, inf) sorts after every (max_fee, id) pair
+            hi = bisect.bisect_right(self._by_fee, (max_fee, float("inf")))
+        return self._by_fee[lo:hi]
+
+    def _match_options(self, candidates, attr, bits, names, match_all):
+        test = mask_filter(bits, names, match_all)
+        if test is None:
+            return set()
+        pool = self._entries.keys() if candidates is None else candidates
+        return {pk for pk in pool if test(getattr(self._entries[pk], attr))}
+
+    def _match_fuzzy(self, q):
+        """
+        Return {profile_id: similarity} for names within the fuzzy threshold.
+
+        Each query word is compared to its closest name word and the result is
+        the mean over query words. Candidates come from the gram postings and
+        must share enough grams to possibly reach the threshold, so only a few
+        names are scored exactly.
+        """
+        words = [word_trigrams(w) for w in re.findall(r"\w+", q.lower())]
+        if not words:
+            return {}
+        threshold = fuzzy_threshold()
+
+        shared = {}
+        for gram in set().union(*words):
+            for pk in self._name_grams.get(gram, ()):
+                shared[pk] = shared.get(pk, 0) + 1
+        # some query word must reach the threshold on its own: Jaccard >= t
+        # needs at least t * len(word grams) shared grams
+        needed = math.ceil(threshold * min(len(w) for w in words))
+
+        matches = {}
+        for pk, count in shared.items():
+            if count < needed:
+                continue
+            names = [word_trigrams(w) for w in self._entries[pk].name_words]
+            score = sum(max(similarity(w, n) for n in names) for w in words) / len(words)
+            if score >= threshold:
+                matches[pk] = score
+        return matches
+
+    def _text_candidates(self, q, scores):
+        """
+        Return (ids matching q, relevance by id, exact ids); ids are None when
+        there is no q ("every indexed counsellor").
+
+        Exact matches (substring or full-text) score 1 + the mean of name
+        similarity and the full-text score scaled to the best match (0..1);
+        typo-only matches score their similarity, which is below 1. So every
+        exact match outranks every typo, and neither scale swamps the other.
+        """
+        if not q:
+            return None, {}, None
+        exact = self._match_text(q)
+        fuzzy = self._match_fuzzy(q)
+        text = {pk: score for pk, score in (scores or {}).items() if pk in self._entries}
+        exact |= text.keys()
+        top = max(text.values(), default=0.0) or 1.0
+        relevance = dict(fuzzy)
+        for pk in exact:
+            relevance[pk] = 1.0 + (fuzzy.get(pk, 0.0) + max(text.get(pk, 0.0), 0.0) / top) / 2
+        return exact | fuzzy.keys(), relevance, exact
+
+    def _recommended(self, name_keys, specializations, min_fee, max_fee):
+        """Reorder matches by recommendation: precomputed score plus the query's boost."""
+        mask, _ = self._specialization_bits.mask(specializations)
+        boost = query_boost(mask, len(specializations), min_fee, max_fee)
+        if boost is None:
+            # nothing query-dependent: the presorted score array is the answer
+            if len(name_keys) == len(self._entries):
+                return list(self._by_score)
+            wanted = {key[-1] for key in name_keys}
+            return [key for key in self._by_score if key[-1] in wanted]
+        keys = []
+        for key in name_keys:
+            entry = self._entries[key[-1]]
+            keys.append((-(entry.score + boost(entry.specializations, entry.fee)), *key))
+        keys.sort()
+        return keys
+
+    def search(self, q="", specializations=(), min_fee=None, max_fee=None, ordering="",
+               scores=None, with_keys=False, availability=(), match_all_specializations=False,
+               match_all_availability=False):
+        """
+        Return the ordered list of matching CounsellorProfile ids.
+
+        Mirrors the filters of CounsellorSearchView: ``q`` is a case-insensitive
+        substring match on first name, last name or email, or a fuzzy match on
+        first/last name (see _match_fuzzy), ``specializations``
+        and ``availability`` are lists of option names (any-of, or all-of with
+        the ``match_all_*`` flags), fees are inclusive bounds.
+
+        ``scores`` are full-text matches for ``q`` ({profile_id: relevance}, see
+        fulltext.py); they widen the text match and, together with name
+        similarity, drive ``ordering="relevance"``.
+
+        With ``with_keys`` the sort keys -- (fee, id), (first_name, last_name, id),
+        (-relevance, first_name, last_name, id) or (-recommendation, first_name,
+        last_name, id) -- are returned instead of bare ids, for keyset pagination.
+        With ``q`` the keys of every ordering but relevance are prefixed with a
+        tier (exact matches before typo matches).
+        """
+        with self._lock:
+            self._ensure_fresh()
+
+            candidates, relevance, exact = self._text_candidates(q, scores)
+            if specializations:
+                candidates = self._match_options(
+                    candidates, "specializations", self._specialization_bits,
+                    specializations, match_all_specializations,
+                )
+            if availability:
+                candidates = self._match_options(
+                    candidates, "availability", self._availability_bits,
+                    availability, match_all_availability,
+                )
+
+            if ordering in ("fees_asc", "fees_desc"):
+                keys = [key for key in self._fee_slice(min_fee, max_fee)
+                        if candidates is None or key[-1] in candidates]
+            else:
+                if min_fee is not None or max_fee is not None:
+                    in_range = {pk for _, pk in self._fee_slice(min_fee, max_fee)}
+                    candidates = in_range if candidates is None else candidates & in_range
+
+                if candidates is None:
+                    keys = list(self._by_name)
+                elif len(candidates) * 8 < len(self._by_name):
+                    keys = sorted(self._entries[pk].name_key for pk in candidates)
+                else:
+                    keys = [key for key in self._by_name if key[-1] in candidates]
+
+                if ordering == "relevance":
+                    # best match first; name order among equal scores
+                    keys = sorted((-relevance.get(key[-1], 0.0), *key) for key in keys)
+                elif ordering == "recommended":
+                    keys = self._recommended(keys, specializations, min_fee, max_fee)
+
+            if exact is not None and ordering != "relevance":
+                # exact matches first, then typo matches, each in the requested order;
+                # the tier leads the key so cursors stay positional
+                descending = ordering in ("fees_desc", "name_desc")
+                exact_tier, typo_tier = (1, 0) if descending else (0, 1)
+                keys = sorted((exact_tier if key[-1] in exact else typo_tier, *key) for key in keys)
+
+            if ordering in ("fees_desc", "name_desc"):
+                keys.reverse()
+            return keys if with_keys else [key[-1] for key in keys]
+
+    def facets(self, q="", specializations=(), min_fee=None, max_fee=None, scores=None,
+               availability=(), match_all_specializations=False, match_all_availability=False,
+               fee_buckets=()):
+        """
+        Count matching counsellors per specialization, availability slot and fee bucket.
+
+        Takes the same filters as search(). Each facet is counted with every
+        filter applied except its own, so the counts say how many results
+        picking that value would add. ``fee_buckets`` are ascending lower
+        bounds; the last bucket is open-ended.
+
+        Returns {"total": int, "specializations": {name: count},
+        "availability": {name: count}, "fees": [count per bucket]}, names
+        lower-cased.
+        """
+        with self._lock:
+            self._ensure_fresh()
+
+            base, _, _ = self._text_candidates(q, scores)
+            by_spec = by_slot = by_fee = None
+            if specializations:
+                by_spec = self._match_options(
+                    base, "specializations", self._specialization_bits,
+                    specializations, match_all_specializations,
+                )
+            if availability:
+                by_slot = self._match_options(
+                    base, "availability", self._availability_bits,
+                    availability, match_all_availability,
+                )
+            if min_fee is not None or max_fee is not None:
+                by_fee = {pk for _, pk in self._fee_slice(min_fee, max_fee)}
+
+            def pool(*sets):
+                matched = _intersect(base, *sets)
+                return self._entries.keys() if matched is None else matched
+
+            spec_counts, slot_counts = {}, {}
+            for pk in pool(by_slot, by_fee):
+                for bit in iter_bits(self._entries[pk].specializations):
+                    spec_counts[bit] = spec_counts.get(bit, 0) + 1
+            for pk in pool(by_spec, by_fee):
+                for bit in iter_bits(self._entries[pk].availability):
+                    slot_counts[bit] = slot_counts.get(bit, 0) + 1
+
+            bounds = list(fee_buckets)
+            fee_counts = [0] * len(bounds)
+            for pk in pool(by_spec, by_slot):
+                pos = bisect.bisect_right(bounds, self._entries[pk].fee) - 1
+                if pos >= 0:
+                    fee_counts[pos] += 1
+
+            return {
+                "total": len(pool(by_spec, by_slot, by_fee)),
+                "specializations": self._specialization_bits.counts(spec_counts),
+                "availability": self._availability_bits.counts(slot_counts),
+                "fees": fee_counts,
+            }
+
+    def suggest(self, prefix, limit):
+        """Return up to ``limit`` (profile id, name) pairs whose name has a word starting with ``prefix``."""
+        with self._lock:
+            self._ensure_fresh()
+            return [(pk, self._entries[pk].label) for pk in self._name_trie.complete(prefix, limit)]
+
+
+search_index = CounsellorSearchIndex()
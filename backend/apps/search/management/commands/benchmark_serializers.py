@@ -0,0 +1,71 @@
+# apps/search/management/commands/benchmark_serializers.py
+"""
+Compare DRF's ListSerializer with FastListSerializer on the list endpoints'
+serializers, using rows already in the DB (seed_search_counsellors,
+seed_resources, seed_appointment_users). Also checks both render the same JSON.
+
+Run with: python manage.py benchmark_serializers --rows 500 --repeat 20
+"""
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework import serializers
+from rest_framework.renderers import JSONRenderer
+
+from apps.appointments.models import Appointment
+from apps.appointments.serializers import AppointmentSerializer
+from apps.resources.models import Resource
+from apps.resources.serializers import ResourceSerializer
+from apps.search.models import CounsellorSearchRow
+from apps.search.serializers import CounsellorSearchSerializer
+
+
+def _best_of(repeat, render):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        render()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+class Command(BaseCommand):
+    help = "Benchmark FastListSerializer against DRF's ListSerializer for the list endpoints."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=500, help="Rows to render per serializer")
+        parser.add_argument("--repeat", type=int, default=20, help="Timed runs per serializer (best is reported)")
+
+    def handle(self, *args, **options):
+        limit = max(1, options["rows"])
+        repeat = max(1, options["repeat"])
+        cases = [
+            ("CounsellorSearchSerializer", CounsellorSearchSerializer, CounsellorSearchRow.objects.all()),
+            ("ResourceSerializer", ResourceSerializer, Resource.objects.all()),
+            ("AppointmentSerializer", AppointmentSerializer,
+             AppointmentSerializer.eager_load(Appointment.objects.all())),
+        ]
+        renderer = JSONRenderer()
+
+        for label, serializer_class, queryset in cases:
+            rows = list(queryset[:limit])
+            if not rows:
+                self.stdout.write(f"{label:<28} no rows, seed some data first")
+                continue
+
+            def drf():
+                return serializers.ListSerializer(rows, child=serializer_class()).data
+
+            def fast():
+                return serializer_class(rows, many=True).data
+
+            if renderer.render(drf()) != renderer.render(fast()):
+                raise CommandError(f"{label}: fast path output differs from DRF")
+
+            drf_time = _best_of(repeat, drf)
+            fast_time = _best_of(repeat, fast)
+            self.stdout.write(
+                f"{label:<28} {len(rows):>6} rows  drf {drf_time * 1000:8.2f} ms  "
+                f"fast {fast_time * 1000:8.2f} ms  {drf_time / fast_time:5.1f}x"
+            )
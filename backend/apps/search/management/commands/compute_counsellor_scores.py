@@ -0,0 +1,16 @@
+# apps/search/management/commands/compute_counsellor_scores.py
+from django.core.management.base import BaseCommand
+
+from apps.search.recommend import compute_scores, POPULARITY_DAYS
+
+
+class Command(BaseCommand):
+    help = "Recompute the precomputed scores behind ordering=recommended (run periodically, e.g. from cron)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, default=POPULARITY_DAYS,
+                            help="Window of paid bookings counted towards popularity")
+
+    def handle(self, *args, **options):
+        count = compute_scores(days=max(1, options["days"]))
+        self.stdout.write(self.style.SUCCESS(f"Scored {count} counsellors"))
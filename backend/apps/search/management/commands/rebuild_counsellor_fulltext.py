@@ -0,0 +1,19 @@
+# apps/search/management/commands/rebuild_counsellor_fulltext.py
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS, transaction
+
+from apps.search.fulltext import get_engine
+
+
+class Command(BaseCommand):
+    help = "Recreate the counsellor full-text documents from the profile tables."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--database", default=DEFAULT_DB_ALIAS, help="Database alias to rebuild")
+
+    def handle(self, *args, **options):
+        engine = get_engine(options["database"])
+        with transaction.atomic(using=options["database"]):
+            engine.ensure_schema()
+            engine.rebuild()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt full-text documents with {type(engine).__name__}"))
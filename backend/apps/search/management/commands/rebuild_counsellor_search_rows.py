@@ -0,0 +1,14 @@
+# apps/search/management/commands/rebuild_counsellor_search_rows.py
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from apps.search.models import CounsellorSearchRow
+
+
+class Command(BaseCommand):
+    help = "Recreate the flattened CounsellorSearchRow table from the profile tables."
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            rows = CounsellorSearchRow.objects.rebuild()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {len(rows)} counsellor search rows"))
@@ -1,3 +1,128 @@
 from django.db import models
 
-# Create your models here.
+from apps.accounts.models import CounsellorProfile
+
+
+class CounsellorSearchRowManager(models.Manager):
+    """Builds rows from the normalized counsellor tables."""
+
+    def _build(self, profile_ids=None):
+        profiles = CounsellorProfile.objects.all()
+        spec_links = CounsellorProfile.specializations.through.objects.all()
+        slot_links = CounsellorProfile.availability.through.objects.all()
+        if profile_ids is not None:
+            profiles = profiles.filter(id__in=profile_ids)
+            spec_links = spec_links.filter(counsellorprofile_id__in=profile_ids)
+            slot_links = slot_links.filter(counsellorprofile_id__in=profile_ids)
+
+        # option lists are packed in the same order the serializer used to emit (by name)
+        specs, slots = {}, {}
+        rows = spec_links.order_by("specialization__name").values_list(
+            "counsellorprofile_id", "specialization_id", "specialization__name"
+        )
+        for profile_id, pk, name in rows:
+            specs.setdefault(profile_id, []).append({"id": pk, "name": name})
+        rows = slot_links.order_by("availabilityslot__name").values_list(
+            "counsellorprofile_id", "availabilityslot_id", "availabilityslot__name"
+        )
+        for profile_id, pk, name in rows:
+            slots.setdefault(profile_id, []).append({"id": pk, "name": name})
+
+        built = []
+        for profile in profiles.select_related("user"):
+            user = profile.user
+            built.append(self.model(
+                profile_id=profile.pk,
+                user_id=user.pk,
+                email=user.email,
+                phone=user.phone,
+                first_name=user.first_name,
+                last_name=user.last_name,
+                full_name=user.get_full_name() or user.get_short_name(),
+                profile_picture=user.profile_picture,
+                is_active=user.is_active,
+                fees_per_session=profile.fees_per_session,
+                experience=profile.experience,
+                specializations=specs.get(profile.pk, []),
+                availability=slots.get(profile.pk, []),
+            ))
+        return built
+
+    def build(self, profile_ids):
+        """Unsaved rows for these profiles, built from the source tables; nothing is written."""
+        profile_ids = set(profile_ids)
+        return self._build(profile_ids) if profile_ids else []
+
+    def refresh(self, profile_ids):
+        """Rewrite the rows of these profiles; rows of deleted profiles are dropped."""
+        profile_ids = set(profile_ids)
+        if not profile_ids:
+            return []
+        built = self._build(profile_ids)
+        self.filter(profile_id__in=profile_ids).delete()
+        return self.bulk_create(built)
+
+    def rebuild(self):
+        self.all().delete()
+        return self.bulk_create(self._build(), batch_size=500)
+
+
+class CounsellorSearchRow(models.Model):
+    """
+    Read model for counsellor search: one flat row per CounsellorProfile.
+
+    Holds everything CounsellorSearchSerializer emits, so a page of results is
+    a single primary-key lookup with no joins, prefetches or DISTINCT. Kept in
+    step with the source tables by signal handlers (see signals.py).
+    """
+    profile = models.OneToOneField(
+        CounsellorProfile, on_delete=models.CASCADE, primary_key=True, related_name="search_row"
+    )
+    user_id = models.BigIntegerField()
+    email = models.EmailField()
+    phone = models.CharField(max_length=10, blank=True, null=True)
+    first_name = models.CharField(max_length=150, blank=True)
+    last_name = models.CharField(max_length=150, blank=True)
+    full_name = models.CharField(max_length=301, blank=True)
+    profile_picture = models.URLField(blank=True, null=True)
+    is_active = models.BooleanField(default=True)
+    fees_per_session = models.DecimalField(max_digits=8, decimal_places=2)
+    experience = models.TextField(blank=True, null=True)
+    # [{"id": ..., "name": ...}, ...] sorted by name
+    specializations = models.JSONField(default=list)
+    availability = models.JSONField(default=list)
+
+    objects = CounsellorSearchRowManager()
+
+    class Meta:
+        verbose_name = "Counsellor Search Row"
+        verbose_name_plural = "Counsellor Search Rows"
+
+    def __str__(self):
+        return self.full_name
+
+
+class CounsellorScore(models.Model):
+    """
+    Precomputed, query-independent part of the "recommended" ordering.
+
+    Filled by ``manage.py compute_counsellor_scores`` (run periodically); see
+    apps/search/recommend.py for how the components are weighted.
+    """
+    profile = models.OneToOneField(
+        CounsellorProfile, on_delete=models.CASCADE, primary_key=True, related_name="search_score"
+    )
+    verified = models.BooleanField(default=False)
+    approved = models.BooleanField(default=False)
+    # recent paid bookings, log-scaled to 0..1 against the busiest counsellor
+    popularity = models.FloatField(default=0.0)
+    score = models.FloatField(default=0.0)
+    computed_at = models.DateTimeField()
+
+    class Meta:
+        verbose_name = "Counsellor Score"
+        verbose_name_plural = "Counsellor Scores"
+        indexes = [models.Index(fields=["-score"])]
+
+    def __str__(self):
+        return f"{self.profile_id}: {self.score:.3f}"
@@ -1,6 +1,257 @@
-from rest_framework.pagination import PageNumberPagination
+import bisect
+import hashlib
+import json
+from decimal import Decimal
+from functools import cached_property, partial
 
-class StandardResultsSetPagination(PageNumberPagination):
+from django.core.cache import cache
+from django.core.paginator import Paginator as DjangoPaginator
+from django.db.models import QuerySet
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import PageNumberPagination, CursorPagination, Cursor
+from rest_framework.response import Response
+
+
+class PresetCountPaginator(DjangoPaginator):
+    """Django paginator that takes its total from the caller instead of running COUNT."""
+
+    def __init__(self, object_list, per_page, count=None, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.preset_count = count
+
+    @cached_property
+    def count(self):
+        if self.preset_count is not None:
+            return self.preset_count
+        return super().count
+
+
+class CountStrategyMixin:
+    """
+    Count strategy for page-number pagination.
+
+    - lists (e.g. ids from the search index) are counted with len() and are exact
+    - querysets get an exact COUNT; when the view has a ``count_cache_version()``
+      (a generation that moves on every write to its rows) it is cached for
+      ``count_cache_timeout`` seconds under the filter signature (query params
+      minus paging and ordering) and that version, otherwise it is not cached
+    - when the view says its filter set is expensive (``view.count_is_expensive()``)
+      rows are only counted a few pages past the current one, and the total is
+      reported as "at least N"
+
+    Responses carry ``count_exact`` so clients can render "N+" for estimates.
+    """
+    count_cache_timeout = 30
+    count_lookahead_pages = 10
+    # params that change the page, not the set of rows being counted
+    count_ignored_params = ("ordering", "cursor", "pagination")
+
+    count_exact = True
+
+    def paginate_queryset(self, queryset, request, view=None):
+        page_size = self.get_page_size(request)
+        if page_size:
+            count, self.count_exact = self.get_count(queryset, request, view, page_size)
+            self.django_paginator_class = partial(PresetCountPaginator, count=count)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_count(self, queryset, request, view, page_size):
+        """Return ``(count, exact)`` for the rows being paginated."""
+        if not isinstance(queryset, QuerySet):
+            return len(queryset), True
+
+        limit = None
+        expensive = view is not None and getattr(view, "count_is_expensive", lambda: False)()
+        page_number = request.query_params.get(self.page_query_param) or "1"
+        if expensive and page_number not in self.last_page_strings:
+            try:
+                page_number = max(int(page_number), 1)
+            except ValueError:
+                page_number = 1  # Paginator rejects it later with a 404
+            limit = (page_number + self.count_lookahead_pages) * page_size
+
+        # without a version a cached count would be wrong until it expired
+        key = self.count_cache_key(request, view, limit) if hasattr(view, "count_cache_version") else None
+        cached = cache.get(key) if key is not None else None
+        if cached is not None:
+            return cached
+
+        if limit is None:
+            result = (queryset.count(), True)
+        else:
+            # COUNT over a LIMITed subquery: cost is bounded by the lookahead window
+            seen = queryset[:limit + 1].count()
+            result = (limit, False) if seen > limit else (seen, True)
+        if key is not None:
+            cache.set(key, result, self.count_cache_timeout)
+        return result
+
+    def count_cache_key(self, request, view, limit):
+        ignored = {self.page_query_param, self.page_size_query_param, *self.count_ignored_params}
+        signature = sorted(
+            (name, value)
+            for name, values in request.query_params.lists() if name not in ignored
+            for value in values
+        )
+        # writes move the version, which retires cached counts immediately
+        version = view.count_cache_version()
+        digest = hashlib.sha1(repr((signature, limit, version)).encode()).hexdigest()
+        return f"count:{type(view).__name__}:{digest}"
+
+    def get_paginated_response(self, data):
+        return Response({
+            "count": self.page.paginator.count,
+            "count_exact": self.count_exact,
+            "next": self.get_next_link(),
+            "previous": self.get_previous_link(),
+            "results": data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        response_schema = super().get_paginated_response_schema(schema)
+        response_schema["properties"]["count_exact"] = {
+            "type": "boolean",
+            "description": "False when count is a lower bound (\"at least N\").",
+        }
+        return response_schema
+
+
+class StandardResultsSetPagination(CountStrategyMixin, PageNumberPagination):
     page_size = 10
     page_size_query_param = "page_size"
     max_page_size = 20
+
+    def restore_page(self, request, count, page_number, page_size, count_exact=True):
+        """
+        Rebuild pagination state for a cached page so get_paginated_response()
+        can render count/next/previous without touching the queryset.
+        """
+        self.request = request
+        self.count_exact = count_exact
+        self.page = DjangoPaginator(range(count), page_size).page(page_number)
+
+
+class CursorPaginationOptInMixin:
+    """
+    Let list views switch to keyset pagination per request.
+
+    Clients opt in with ?pagination=cursor (first page) and then follow the
+    returned next/previous links, which carry ?cursor=. Everyone else keeps the
+    page-number responses. Set ``cursor_pagination_class`` on the view.
+    """
+    cursor_pagination_class = None
+
+    def uses_cursor_pagination(self):
+        request = getattr(self, "request", None)
+        if request is None or self.cursor_pagination_class is None:
+            return False
+        params = request.query_params
+        return "cursor" in params or params.get("pagination") == "cursor"
+
+    @property
+    def paginator(self):
+        if not hasattr(self, "_paginator"):
+            if self.uses_cursor_pagination():
+                self._paginator = self.cursor_pagination_class()
+            elif self.pagination_class is None:
+                self._paginator = None
+            else:
+                self._paginator = self.pagination_class()
+        return self._paginator
+
+
+class CounsellorCursorPagination(CursorPagination):
+    """
+    Keyset pagination over the ordered profile ids returned by the search index.
+
+    The cursor stores the sort key of the boundary row -- e.g. (fee, id) or
+    (first_name, last_name, id) -- rather than an offset, so pages stay stable
+    while counsellors are added or removed, and no count is computed.
+    """
+    page_size = 10
+    page_size_query_param = "page_size"
+    max_page_size = 20
+    ordering = None  # comes from the search index, see view.search_ordering()
+
+    def paginate_queryset(self, keys, request, view=None):
+        """``keys`` are the index sort keys (see search(with_keys=True)); returns page ids."""
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        self.search_ordering = view.search_ordering()
+
+        cursor = self.decode_cursor(request)
+        if cursor is None:
+            start, end = 0, self.page_size
+        elif cursor.reverse:
+            end = self._rows_before(keys, self._decode_position(cursor.position))
+            start = max(0, end - self.page_size)
+        else:
+            start = self._rows_up_to(keys, self._decode_position(cursor.position))
+            end = start + self.page_size
+        end = min(end, len(keys))
+
+        self.next_position = self._encode_position(keys[end - 1]) if end < len(keys) else None
+        self.previous_position = self._encode_position(keys[start]) if 0 < start < len(keys) else None
+        return [key[-1] for key in keys[start:end]]
+
+    def _descending(self):
+        return self.search_ordering in ("fees_desc", "name_desc")
+
+    def _rows_before(self, keys, key):
+        """Number of rows that come strictly before ``key`` in list order."""
+        if self._descending():
+            return _bisect_desc(keys, key, inclusive=False)
+        return bisect.bisect_left(keys, key)
+
+    def _rows_up_to(self, keys, key):
+        """Number of rows that come before ``key`` or equal it, in list order."""
+        if self._descending():
+            return _bisect_desc(keys, key, inclusive=True)
+        return bisect.bisect_right(keys, key)
+
+    def _encode_position(self, key):
+        return json.dumps([str(part) if isinstance(part, Decimal) else part for part in key])
+
+    def _decode_position(self, position):
+        try:
+            key = json.loads(position)
+            tier = ()
+            if self.search_ordering != "relevance" and self.request.query_params.get("q", "").strip():
+                # exact/typo tier, see CounsellorSearchIndex.search()
+                tier, key = (int(key[0]),), key[1:]
+            if self.search_ordering in ("fees_asc", "fees_desc"):
+                fee, pk = key
+                return (*tier, Decimal(fee), int(pk))
+            if self.search_ordering in ("relevance", "recommended"):
+                score, first, last, pk = key
+                return (*tier, float(score), str(first), str(last), int(pk))
+            first, last, pk = key
+            return (*tier, str(first), str(last), int(pk))
+        except (TypeError, ValueError, ArithmeticError, IndexError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def get_next_link(self):
+        if self.next_position is None:
+            return None
+        return self.encode_cursor(Cursor(offset=0, reverse=False, position=self.next_position))
+
+    def get_previous_link(self):
+        if self.previous_position is None:
+            return None
+        return self.encode_cursor(Cursor(offset=0, reverse=True, position=self.previous_position))
+
+
+def _bisect_desc(keys, key, inclusive):
+    """
+    bisect for a descending list: the number of leading elements greater than
+    ``key`` (or greater than or equal to it when ``inclusive``).
+    """
+    lo, hi = 0, len(keys)
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if keys[mid] > key or (inclusive and keys[mid] == key):
+            lo = mid + 1
+        else:
+            hi = mid
+    return lo
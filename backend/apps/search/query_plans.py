@@ -0,0 +1,39 @@
+"""
+EXPLAIN checks for the hot list queries, used by the query-plan regression
+tests in each app.
+
+plan_problems() reads SQLite's EXPLAIN QUERY PLAN and reports the steps that
+don't scale with the page size:
+  - SCAN of a table without an index (full table read)
+  - SCAN of a table USING an INDEX when the query has no LIMIT: walking the
+    index in order is only cheap when the walk stops after a page
+  - USE TEMP B-TREE (sorting the matches instead of reading them in index order)
+SEARCH steps (index lookups) always pass. Other databases are not checked --
+their planners pick sequential scans for the tiny tables of a test database.
+"""
+from django.db import connections
+
+
+def plan_problems(queryset):
+    """Steps of the queryset's plan that read a whole table or index, or sort in a temp B-tree."""
+    limited = queryset.query.is_sliced
+    problems = []
+    for line in queryset.explain().splitlines():
+        # "<id> <parent> <notused> <detail>"
+        step = line.split(maxsplit=3)[-1]
+        if step.startswith("SCAN "):
+            if " USING " not in step or not limited:
+                problems.append(step)
+        elif step.startswith("USE TEMP B-TREE"):
+            problems.append(step)
+    return problems
+
+
+class QueryPlanAssertions:
+    """TestCase mixin: fail when a hot query's plan has a full scan or a temp sort."""
+
+    def assertIndexedPlan(self, queryset):
+        if connections[queryset.db].vendor != "sqlite":
+            self.skipTest("query plans are only checked on SQLite")
+        problems = plan_problems(queryset)
+        self.assertEqual(problems, [], f"{queryset.query}\n{queryset.explain()}")
@@ -0,0 +1,104 @@
+"""
+The "recommended" ordering of counsellor search.
+
+A counsellor's rank is a weighted sum of:
+  - verified     : is_verified_professional
+  - approved     : is_approved
+  - popularity   : paid, non-cancelled bookings in the last POPULARITY_DAYS,
+                   log-scaled to 0..1 against the busiest counsellor
+  - specialization: share of the requested specializations they offer
+  - fee          : how close their fee is to the middle of the requested range
+
+The first three don't depend on the query; compute_scores() stores their sum
+in CounsellorScore and the search index keeps counsellors presorted by it. The
+last two are added per request, and only when the query has a specialization
+or fee filter.
+"""
+import math
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count
+from django.utils import timezone
+
+from apps.accounts.models import CounsellorProfile
+from apps.appointments.models import Appointment
+from .cache import RESPONSE_GENERATION, bump_generation
+from .models import CounsellorScore
+
+DEFAULT_WEIGHTS = {
+    "verified": 0.2,
+    "approved": 0.3,
+    "popularity": 0.5,
+    "specialization": 1.0,
+    "fee": 0.5,
+}
+POPULARITY_DAYS = 90
+
+
+def weights():
+    return {**DEFAULT_WEIGHTS, **getattr(settings, "SEARCH_RECOMMENDED_WEIGHTS", {})}
+
+
+def compute_scores(days=POPULARITY_DAYS):
+    """Recompute every CounsellorScore row; returns the number of rows written."""
+    from .index import search_index
+
+    w = weights()
+    now = timezone.now()
+    bookings = dict(
+        Appointment.objects
+        .filter(created_at__gte=now - timedelta(days=days), payment_status=Appointment.PaymentStatus.PAID)
+        .exclude(status=Appointment.Status.CANCELLED)
+        .values_list("counsellor_id")
+        .annotate(n=Count("id"))
+    )
+    busiest = math.log1p(max(bookings.values(), default=0))
+
+    rows = []
+    profiles = CounsellorProfile.objects.values_list("id", "user_id", "is_verified_professional", "is_approved")
+    for pk, user_id, verified, approved in profiles:
+        popularity = math.log1p(bookings.get(user_id, 0)) / busiest if busiest else 0.0
+        rows.append(CounsellorScore(
+            profile_id=pk,
+            verified=verified,
+            approved=approved,
+            popularity=popularity,
+            score=w["verified"] * verified + w["approved"] * approved + w["popularity"] * popularity,
+            computed_at=now,
+        ))
+
+    with transaction.atomic():
+        CounsellorScore.objects.all().delete()
+        CounsellorScore.objects.bulk_create(rows, batch_size=500)
+    # scores are read into the index, and cached pages may be ordered by them
+    search_index.invalidate()
+    bump_generation(RESPONSE_GENERATION)
+    return len(rows)
+
+
+def query_boost(specialization_mask, specialization_count, min_fee, max_fee):
+    """
+    Return a function scoring the query-dependent part for an index entry's
+    (specializations bitset, fee), or None when the query has neither part.
+    Fee fit needs both bounds; with one bound every match fits equally.
+    """
+    w = weights()
+    has_fee = min_fee is not None and max_fee is not None and max_fee >= min_fee
+    if not specialization_count and not has_fee:
+        return None
+    if has_fee:
+        middle = (min_fee + max_fee) / 2
+        half = (max_fee - min_fee) / 2
+
+    def boost(specializations, fee):
+        total = 0.0
+        if specialization_count:
+            overlap = bin(specializations & specialization_mask).count("1")
+            total += w["specialization"] * overlap / specialization_count
+        if has_fee:
+            fit = 1.0 if not half else max(0.0, 1.0 - float(abs(fee - middle) / half))
+            total += w["fee"] * fit
+        return total
+    return boost
@@ -1,5 +1,7 @@
 from rest_framework import serializers
-from apps.accounts.models import CounsellorProfile, Specialization, AvailabilitySlot
+from apps.accounts.models import Specialization, AvailabilitySlot
+from .models import CounsellorSearchRow
+from apps.common.serializers import FastListSerializer
 
 class SpecializationSimpleSerializer(serializers.ModelSerializer):
     class Meta:
@@ -14,26 +16,46 @@ class AvailabilitySlotSimpleSerializer(serializers.ModelSerializer):
 
 
 class CounsellorSearchSerializer(serializers.ModelSerializer):
-    full_name = serializers.SerializerMethodField()
-    profile_picture = serializers.CharField(source="user.profile_picture", read_only=True)
-    specializations = SpecializationSimpleSerializer(many=True, read_only=True)
-    availability = AvailabilitySlotSimpleSerializer(many=True, read_only=True)
+    """
+    Reads the flattened CounsellorSearchRow; no related objects are touched.
+
+    Pass ``fields=`` (an iterable of field names) to render only those fields.
+    """
+    # what list cards need (?view=card)
+    CARD_FIELDS = ("id", "full_name", "profile_picture", "specializations", "fees_per_session")
+    # row columns each field reads, so the view can .only() what it renders
+    SOURCE_COLUMNS = {
+        "id": ("profile_id",),
+        "user": ("user_id", "email", "phone", "first_name", "last_name"),
+    }
+
+    id = serializers.IntegerField(source="profile_id", read_only=True)
+    specializations = serializers.JSONField(read_only=True)
+    availability = serializers.JSONField(read_only=True)
     fees_per_session = serializers.DecimalField(max_digits=8, decimal_places=2, read_only=True)
     user = serializers.SerializerMethodField()
 
     class Meta:
-        model = CounsellorProfile
+        model = CounsellorSearchRow
+        list_serializer_class = FastListSerializer
         fields = ("id", "full_name", "profile_picture", "specializations", "fees_per_session" , "experience" , "availability", "user")
 
-    def get_full_name(self, obj):
-        # prefer full name, fallback to short name or email local part
-        return obj.user.get_full_name() or obj.user.get_short_name()
-    
+    def __init__(self, *args, fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+    @classmethod
+    def columns_for(cls, fields):
+        """Row columns needed to render these fields."""
+        return [column for name in fields for column in cls.SOURCE_COLUMNS.get(name, (name,))]
+
     def get_user(self, obj):
         return {
-            "id": obj.user.id,  # Include user ID for appointment creation
-            "email": obj.user.email,
-            "phone": obj.user.phone,
-            "first_name": obj.user.first_name,
-            "last_name": obj.user.last_name,
+            "id": obj.user_id,  # Include user ID for appointment creation
+            "email": obj.email,
+            "phone": obj.phone,
+            "first_name": obj.first_name,
+            "last_name": obj.last_name,
         }
@@ -0,0 +1,208 @@
+"""
+Keep search state derived from the counsellor tables in step with writes.
+
+- the in-memory index: handlers only mark profile ids dirty (no queries on the
+  write path), once the write commits; the index re-reads them on the next
+  search
+- cached search responses: handlers bump the response generation after
+  commit, so every cached page becomes unreachable at once
+- full-text documents and the flattened CounsellorSearchRow read model:
+  rewritten in the same transaction as the change
+"""
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete, pre_delete, m2m_changed
+from django.dispatch import receiver
+
+from apps.accounts.models import User, CounsellorProfile, Specialization, AvailabilitySlot
+from .cache import RESPONSE_GENERATION, OPTIONS_GENERATION, bump_generation_on_commit
+from .index import search_index
+from .fulltext import get_engine
+from .models import CounsellorSearchRow
+
+# User columns the index filters on
+INDEXED_USER_FIELDS = {"first_name", "last_name", "email", "is_active"}
+# User columns that show up in search results
+SERIALIZED_USER_FIELDS = INDEXED_USER_FIELDS | {"phone", "profile_picture"}
+# User columns that are part of the full-text document
+DOCUMENT_USER_FIELDS = {"first_name", "last_name"}
+
+
+def _mark_dirty(profile_ids, using=None):
+    # after commit: a search in between would re-read the old rows, clear them
+    # from the dirty set and keep them under the new generation
+    transaction.on_commit(partial(search_index.mark_dirty, list(profile_ids)), using=using)
+
+
+def _invalidate_index(using=None):
+    transaction.on_commit(search_index.invalidate, using=using)
+
+
+def _invalidate_responses(using=None):
+    bump_generation_on_commit(RESPONSE_GENERATION, using)
+
+
+@receiver(post_save, sender=CounsellorProfile)
+@receiver(post_delete, sender=CounsellorProfile)
+def counsellor_profile_changed(sender, instance, using=None, **kwargs):
+    _mark_dirty([instance.pk], using)
+    _invalidate_responses(using)
+
+
+@receiver(post_save, sender=User)
+def counsellor_user_changed(sender, instance, created, update_fields=None, using=None, **kwargs):
+    if created or instance.role != User.Roles.COUNSELLOR:
+        return
+    # e.g. last_login / token_version updates don't change search results
+    if update_fields is not None and not SERIALIZED_USER_FIELDS.intersection(update_fields):
+        return
+    _invalidate_responses(using)
+    if update_fields is not None and not INDEXED_USER_FIELDS.intersection(update_fields):
+        return
+    profile_id = CounsellorProfile.objects.filter(user=instance).values_list("id", flat=True).first()
+    if profile_id is not None:
+        _mark_dirty([profile_id], using)
+
+
+@receiver(m2m_changed, sender=CounsellorProfile.specializations.through)
+def counsellor_specializations_changed(sender, instance, action, reverse, pk_set, using=None, **kwargs):
+    if action not in ("post_add", "post_remove", "post_clear"):
+        return
+    _invalidate_responses(using)
+    if not reverse:
+        _mark_dirty([instance.pk], using)
+    elif pk_set:
+        # specialization.counsellors.add(...) -- pk_set holds profile ids
+        _mark_dirty(pk_set, using)
+    else:
+        # specialization.counsellors.clear() doesn't say which profiles were affected
+        _invalidate_index(using)
+
+
+@receiver(m2m_changed, sender=CounsellorProfile.availability.through)
+def counsellor_availability_changed(sender, instance, action, reverse, pk_set, using=None, **kwargs):
+    if action not in ("post_add", "post_remove", "post_clear"):
+        return
+    _invalidate_responses(using)
+    if not reverse:
+        _mark_dirty([instance.pk], using)
+    elif pk_set:
+        _mark_dirty(pk_set, using)
+    else:
+        _invalidate_index(using)
+
+
+@receiver(post_save, sender=Specialization)
+@receiver(post_delete, sender=Specialization)
+@receiver(post_save, sender=AvailabilitySlot)
+@receiver(post_delete, sender=AvailabilitySlot)
+def option_changed(sender, using=None, **kwargs):
+    # renames/deletes touch many bitsets at once; admin-only, so just rebuild
+    _invalidate_index(using)
+    _invalidate_responses(using)
+    bump_generation_on_commit(OPTIONS_GENERATION, using)
+
+
+def _linked_profiles(instance, action, reverse, pk_set):
+    """
+    Profile ids affected by an m2m change on CounsellorProfile.specializations
+    or .availability, or None for pre_* actions.
+
+    A reverse clear (option.counsellors.clear()) doesn't report which profiles
+    lost the option, so they are remembered on pre_clear.
+    """
+    if not reverse:
+        return None if action.startswith("pre_") else [instance.pk]
+    if action == "pre_clear":
+        instance._counsellor_ids = list(instance.counsellors.values_list("id", flat=True))
+        return None
+    if action == "post_clear":
+        return getattr(instance, "_counsellor_ids", [])
+    return None if action.startswith("pre_") else pk_set
+
+
+@receiver(pre_delete, sender=Specialization)
+@receiver(pre_delete, sender=AvailabilitySlot)
+def remember_option_counsellors(sender, instance, **kwargs):
+    # the through rows are gone by post_delete
+    instance._counsellor_ids = list(instance.counsellors.values_list("id", flat=True))
+
+
+def _option_profiles(instance, created=False):
+    """Profile ids holding a saved/deleted Specialization or AvailabilitySlot."""
+    if created:
+        return []
+    profile_ids = getattr(instance, "_counsellor_ids", None)
+    if profile_ids is None:
+        # rename: everyone holding the option gets the new name
+        profile_ids = list(instance.counsellors.values_list("id", flat=True))
+    return profile_ids
+
+
+# ----------------------------------------------------------------------
+# full-text documents
+# ----------------------------------------------------------------------
+@receiver(post_save, sender=CounsellorProfile)
+@receiver(post_delete, sender=CounsellorProfile)
+def reindex_counsellor_document(sender, instance, using, **kwargs):
+    get_engine(using).index([instance.pk])
+
+
+@receiver(post_save, sender=User)
+def reindex_counsellor_name(sender, instance, created, using, update_fields=None, **kwargs):
+    if created or instance.role != User.Roles.COUNSELLOR:
+        return
+    if update_fields is not None and not DOCUMENT_USER_FIELDS.intersection(update_fields):
+        return
+    profile_ids = CounsellorProfile.objects.using(using).filter(user=instance).values_list("id", flat=True)
+    get_engine(using).index(profile_ids)
+
+
+@receiver(m2m_changed, sender=CounsellorProfile.specializations.through)
+def reindex_counsellor_specializations(sender, instance, action, reverse, pk_set, using, **kwargs):
+    profile_ids = _linked_profiles(instance, action, reverse, pk_set)
+    if profile_ids:
+        get_engine(using).index(profile_ids)
+
+
+@receiver(post_save, sender=Specialization)
+@receiver(post_delete, sender=Specialization)
+def reindex_specialization_counsellors(sender, instance, using, created=False, **kwargs):
+    get_engine(using).index(_option_profiles(instance, created))
+
+
+# ----------------------------------------------------------------------
+# denormalized search rows (CounsellorSearchRow)
+# ----------------------------------------------------------------------
+@receiver(post_save, sender=CounsellorProfile)
+def refresh_counsellor_row(sender, instance, **kwargs):
+    # deletes cascade to the row
+    CounsellorSearchRow.objects.refresh([instance.pk])
+
+
+@receiver(post_save, sender=User)
+def refresh_counsellor_user_row(sender, instance, created, update_fields=None, **kwargs):
+    if created or instance.role != User.Roles.COUNSELLOR:
+        return
+    if update_fields is not None and not SERIALIZED_USER_FIELDS.intersection(update_fields):
+        return
+    CounsellorSearchRow.objects.refresh(
+        CounsellorProfile.objects.filter(user=instance).values_list("id", flat=True)
+    )
+
+
+@receiver(m2m_changed, sender=CounsellorProfile.specializations.through)
+@receiver(m2m_changed, sender=CounsellorProfile.availability.through)
+def refresh_counsellor_option_rows(sender, instance, action, reverse, pk_set, **kwargs):
+    profile_ids = _linked_profiles(instance, action, reverse, pk_set)
+    if profile_ids:
+        CounsellorSearchRow.objects.refresh(profile_ids)
+
+
+@receiver(post_save, sender=Specialization)
+@receiver(post_delete, sender=Specialization)
+@receiver(post_save, sender=AvailabilitySlot)
+@receiver(post_delete, sender=AvailabilitySlot)
+def refresh_option_holder_rows(sender, instance, created=False, **kwargs):
+    CounsellorSearchRow.objects.refresh(_option_profiles(instance, created))
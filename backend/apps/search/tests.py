@@ -1,13 +1,36 @@
+from decimal import Decimal
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import SimpleTestCase, TestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
-from rest_framework.test import APITestCase
-from rest_framework import status
-from apps.accounts.models import User, CounsellorProfile, Specialization
+from django.utils import timezone
+from rest_framework.request import Request
+from rest_framework.test import APITestCase, APIRequestFactory
+from rest_framework import serializers, status
+from rest_framework.serializers import ListSerializer
+from apps.accounts.models import User, CounsellorProfile, Specialization, AvailabilitySlot
+from apps.search.index import search_index
+from apps.appointments.models import Appointment
+from apps.search.models import CounsellorSearchRow, CounsellorScore
+from apps.search.trie import PrefixTrie
+from apps.common.serializers import FastListSerializer
+from apps.search.query_plans import QueryPlanAssertions
+from apps.search.serializers import CounsellorSearchSerializer, SpecializationSimpleSerializer
+from apps.search.views import CounsellorSearchView
 
 
 class CounsellorSearchAPITests(APITestCase):
     """Tests for the Counsellor Search API."""
 
     def setUp(self):
+        # the index and the cache are process-wide; start every test from the DB state
+        search_index.reset()
+        cache.clear()
+
         # Specializations
         self.spec_anxiety = Specialization.objects.create(name="Anxiety")
         self.spec_depression = Specialization.objects.create(name="Depression")
@@ -54,6 +77,8 @@ class CounsellorSearchAPITests(APITestCase):
         res = self.client.get(self.url)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
         self.assertEqual(res.data["count"], 2)
+        # index results are counted exactly, never estimated
+        self.assertTrue(res.data["count_exact"])
 
     def test_search_by_name(self):
         """Search by first_name / last_name / email."""
@@ -120,4 +145,707 @@ class CounsellorSearchAPITests(APITestCase):
         """Default 10 per page, only 2 created."""
         res = self.client.get(self.url, {"page": 1})
         self.assertEqual(res.status_code, 200)
-        self.assertEqual(len(res.data["results"]), 2)
\ No newline at end of file
+        self.assertEqual(len(res.data["results"]), 2)
+
+
+class TwoCounsellorsMixin:
+    """Alice (500, Anxiety) and Bob (900, no specialization) with a fresh index."""
+
+    def setUp(self):
+        search_index.reset()
+        cache.clear()
+        self.spec_anxiety = Specialization.objects.create(name="Anxiety")
+
+        self.user1 = User.objects.create_user(
+            email="c1@example.com", first_name="Alice", last_name="Smith",
+            role="counsellor", is_active=True
+        )
+        self.profile1 = CounsellorProfile.objects.create(
+            user=self.user1, fees_per_session=500, license_number="LIC001"
+        )
+        self.profile1.specializations.add(self.spec_anxiety)
+
+        self.user2 = User.objects.create_user(
+            email="c2@example.com", first_name="Bob", last_name="Johnson",
+            role="counsellor", is_active=True
+        )
+        self.profile2 = CounsellorProfile.objects.create(
+            user=self.user2, fees_per_session=900, license_number="LIC002"
+        )
+
+        self.url = reverse("search-counsellors")
+
+
+class CounsellorSearchIndexTests(TwoCounsellorsMixin, APITestCase):
+    """The in-memory index must follow writes made after it was built."""
+
+    def test_profile_update_is_reflected(self):
+        self.client.get(self.url)  # build the index
+        with self.captureOnCommitCallbacks(execute=True):
+            self.profile1.fees_per_session = 1200
+            self.profile1.save()
+        res = self.client.get(self.url, {"ordering": "fees_desc"})
+        self.assertEqual(res.data["results"][0]["full_name"], "Alice Smith")
+
+    def test_user_rename_is_reflected(self):
+        self.client.get(self.url)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user2.first_name = "Robert"
+            self.user2.save(update_fields=["first_name"])
+        res = self.client.get(self.url, {"q": "robert"})
+        self.assertEqual(res.data["count"], 1)
+        res = self.client.get(self.url, {"q": "Bob"})
+        self.assertEqual(res.data["count"], 0)
+
+    def test_deactivated_user_is_dropped(self):
+        self.client.get(self.url)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user1.is_active = False
+            self.user1.save()
+        res = self.client.get(self.url)
+        self.assertEqual(res.data["count"], 1)
+
+    def test_specialization_change_is_reflected(self):
+        self.client.get(self.url)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.profile2.specializations.add(self.spec_anxiety)
+        res = self.client.get(self.url, {"specialization": "anxiety"})
+        self.assertEqual(res.data["count"], 2)
+
+    def test_local_write_keeps_the_index(self):
+        self.client.get(self.url)
+        built = search_index._generation
+        with self.captureOnCommitCallbacks(execute=True):
+            self.profile1.fees_per_session = 1200
+            self.profile1.save()
+            # nothing is marked before commit: a search now would re-read the old row
+            self.assertEqual((search_index._generation, search_index._dirty), (built, set()))
+        self.assertEqual(search_index._generation, built + 1)
+        self.assertEqual(search_index._dirty, {self.profile1.pk})
+
+    def test_concurrent_write_forces_rebuild(self):
+        from unittest.mock import patch
+        from apps.search import index
+        from apps.search.cache import INDEX_GENERATION, bump_generation, get_generation
+        self.client.get(self.url)
+
+        def bumped_twice(name):
+            # another process writes between our read and our bump
+            bump_generation(name)
+            return bump_generation(name)
+
+        with patch.object(index, "bump_generation", bumped_twice):
+            search_index.mark_dirty([self.profile1.id])
+        self.assertNotEqual(search_index._generation, get_generation(INDEX_GENERATION))
+
+    def test_evicted_generation_restarts_out_of_reach(self):
+        from apps.search.cache import INDEX_GENERATION, bump_generation, get_generation
+        self.client.get(self.url)
+        built = search_index._generation
+        cache.delete(INDEX_GENERATION)
+        self.assertNotIn(bump_generation(INDEX_GENERATION), (0, 1, built, built + 1))
+        self.assertNotEqual(get_generation(INDEX_GENERATION), built)
+
+    def test_max_age_rebuild_without_a_shared_cache(self):
+        from apps.search.cache import cache_is_shared
+        self.assertFalse(cache_is_shared())  # tests run on LocMemCache
+        self.client.get(self.url)
+        User.objects.filter(pk=self.user2.pk).update(first_name="Robert")  # no signals
+        self.assertEqual(self.client.get(self.url, {"q": "robert"}).data["count"], 0)
+        with self.settings(LOCAL_CACHE_MAX_AGE=0):
+            # (a different query, so no cached response answers it)
+            self.assertEqual(self.client.get(self.url, {"q": "rober"}).data["count"], 1)
+
+    def test_short_query_and_fee_range(self):
+        res = self.client.get(self.url, {"q": "bo", "min_fee": 500, "max_fee": 900})
+        self.assertEqual(res.data["count"], 1)
+        self.assertEqual(res.data["results"][0]["full_name"], "Bob Johnson")
+
+
+class CounsellorFuzzySearchTests(TwoCounsellorsMixin, APITestCase):
+    """Misspelled names still match, ranked by trigram similarity."""
+
+    def names(self, params):
+        return [r["full_name"] for r in self.client.get(self.url, params).data["results"]]
+
+    def test_misspelled_names(self):
+        self.assertEqual(self.names({"q": "Alise"}), ["Alice Smith"])
+        self.assertEqual(self.names({"q": "jonson"}), ["Bob Johnson"])
+        self.assertEqual(self.names({"q": "alice smoth"}), ["Alice Smith"])
+        self.assertEqual(self.names({"q": "zzyzx"}), [])
+
+    def test_ranked_by_similarity(self):
+        user = User.objects.create_user(email="c3@example.com", first_name="Alicia", role="counsellor", is_active=True)
+        CounsellorProfile.objects.create(user=user, fees_per_session=100, license_number="LIC003")
+        self.assertEqual(self.names({"q": "alicia", "ordering": "relevance"}), ["Alicia", "Alice Smith"])
+        self.assertEqual(self.names({"q": "alice", "ordering": "relevance"}), ["Alice Smith", "Alicia"])
+
+    def test_exact_matches_come_before_typos_in_every_ordering(self):
+        user = User.objects.create_user(email="c3@example.com", first_name="Alicia", role="counsellor", is_active=True)
+        CounsellorProfile.objects.create(user=user, fees_per_session=100, license_number="LIC003")
+        # "alice" is exact for Alice Smith and a typo for Alicia, who is cheaper
+        for ordering in ("fees_asc", "fees_desc", "name_asc", "name_desc", "recommended"):
+            self.assertEqual(self.names({"q": "alice", "ordering": ordering}), ["Alice Smith", "Alicia"], ordering)
+
+        # the tier is part of the cursor position
+        res = self.client.get(self.url, {"q": "alice", "ordering": "fees_asc", "pagination": "cursor", "page_size": 1})
+        self.assertEqual([r["full_name"] for r in res.data["results"]], ["Alice Smith"])
+        res = self.client.get(res.data["next"])
+        self.assertEqual([r["full_name"] for r in res.data["results"]], ["Alicia"])
+        res = self.client.get(res.data["previous"])
+        self.assertEqual([r["full_name"] for r in res.data["results"]], ["Alice Smith"])
+
+    def test_relevance_scales_are_normalized(self):
+        from apps.search.index import search_index
+        # a raw full-text score can't swamp name similarity: it is scaled to the best match
+        scores = {self.profile1.id: 1.0, self.profile2.id: 1000.0}
+        ids = search_index.search(q="alice", ordering="relevance", scores=scores)
+        self.assertEqual(ids, [self.profile1.id, self.profile2.id])
+        _, relevance, exact = search_index._text_candidates("alise", {})
+        self.assertFalse(exact)
+        self.assertTrue(all(0 < score < 1 for score in relevance.values()))
+
+    def test_rename_is_reflected(self):
+        self.client.get(self.url, {"q": "alise"})
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user1.first_name = "Margaret"
+            self.user1.save(update_fields=["first_name"])
+        self.assertEqual(self.names({"q": "margret"}), ["Margaret Smith"])
+        self.assertEqual(self.names({"q": "alise"}), [])
+
+
+class CounsellorRecommendedOrderingTests(TwoCounsellorsMixin, APITestCase):
+    """ordering=recommended uses the precomputed CounsellorScore table."""
+
+    def setUp(self):
+        super().setUp()
+        user = User.objects.create_user(email="c3@example.com", first_name="Cara", role="counsellor", is_active=True)
+        self.profile3 = CounsellorProfile.objects.create(user=user, fees_per_session=700, license_number="LIC003")
+        self.client_user = User.objects.create_user(email="client@example.com", role="client", is_active=True)
+
+    def names(self, params):
+        res = self.client.get(self.url, {"ordering": "recommended", **params})
+        return [r["user"]["first_name"] for r in res.data["results"]]
+
+    def book(self, counsellor, times):
+        for _ in range(times):
+            Appointment.objects.create(
+                client=self.client_user, counsellor=counsellor, appointment_date=timezone.now(),
+                payment_status=Appointment.PaymentStatus.PAID,
+            )
+
+    def test_without_scores_falls_back_to_names(self):
+        self.assertEqual(self.names({}), ["Alice", "Bob", "Cara"])
+
+    def test_static_score(self):
+        self.profile3.is_approved = True
+        self.profile3.is_verified_professional = True
+        self.profile3.save()
+        self.book(self.user2, 3)
+        call_command("compute_counsellor_scores", stdout=StringIO())
+        self.assertEqual(CounsellorScore.objects.get(pk=self.profile2.pk).popularity, 1.0)
+        # approved + verified (0.5) beats the busiest counsellor (0.5) on name; Alice has neither
+        self.assertEqual(self.names({}), ["Bob", "Cara", "Alice"])
+
+    def test_query_boost(self):
+        self.book(self.user2, 1)
+        call_command("compute_counsellor_scores", stdout=StringIO())
+        self.assertEqual(self.names({})[0], "Bob")
+        # the specialization match outweighs Bob's popularity
+        self.assertEqual(self.names({"specialization": "anxiety,depression"}), ["Alice"])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.profile3.specializations.add(self.spec_anxiety)
+        self.assertEqual(self.names({"specialization": "anxiety", "min_fee": 600, "max_fee": 800}), ["Cara"])
+        # Cara sits on the middle of the range, but Bob's popularity still wins
+        self.assertEqual(self.names({"min_fee": 400, "max_fee": 1000}), ["Bob", "Cara", "Alice"])
+        self.assertEqual(self.names({"min_fee": 600, "max_fee": 800}), ["Cara"])
+
+    def test_cursor_pages(self):
+        self.book(self.user2, 1)
+        call_command("compute_counsellor_scores", stdout=StringIO())
+        res = self.client.get(self.url, {"ordering": "recommended", "pagination": "cursor", "page_size": 2})
+        names = [r["user"]["first_name"] for r in res.data["results"]]
+        res = self.client.get(res.data["next"])
+        names += [r["user"]["first_name"] for r in res.data["results"]]
+        self.assertEqual(names, ["Bob", "Alice", "Cara"])
+
+
+class CounsellorSearchOptionFilterTests(TwoCounsellorsMixin, APITestCase):
+    """Specialization and availability filters, any-of and all-of."""
+
+    def setUp(self):
+        super().setUp()
+        self.spec_cbt = Specialization.objects.create(name="CBT")
+        self.monday = AvailabilitySlot.objects.create(name="Mon - Morning")
+        self.friday = AvailabilitySlot.objects.create(name="Fri - Morning")
+        self.profile1.specializations.add(self.spec_cbt)
+        self.profile1.availability.add(self.monday, self.friday)
+        self.profile2.specializations.add(self.spec_cbt)
+        self.profile2.availability.add(self.friday)
+
+    def names(self, params):
+        return [r["full_name"] for r in self.client.get(self.url, params).data["results"]]
+
+    def test_all_of_specializations(self):
+        self.assertEqual(self.names({"specialization": "anxiety,cbt"}), ["Alice Smith", "Bob Johnson"])
+        params = {"specialization": "anxiety,cbt", "specialization_match": "all"}
+        self.assertEqual(self.names(params), ["Alice Smith"])
+
+    def test_availability_filter(self):
+        self.assertEqual(self.names({"availability": "Fri - Morning"}), ["Alice Smith", "Bob Johnson"])
+        self.assertEqual(self.names({"availability": "mon - morning"}), ["Alice Smith"])
+        params = {"availability": "Mon - Morning,Fri - Morning", "availability_match": "all"}
+        self.assertEqual(self.names(params), ["Alice Smith"])
+
+    def test_unknown_names(self):
+        self.assertEqual(self.names({"specialization": "Nope,CBT"}), ["Alice Smith", "Bob Johnson"])
+        self.assertEqual(self.names({"specialization": "Nope,CBT", "specialization_match": "all"}), [])
+        self.assertEqual(self.names({"availability": "Sun - Night"}), [])
+
+    def test_availability_change_is_reflected(self):
+        self.client.get(self.url)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.profile2.availability.add(self.monday)
+        self.assertEqual(self.names({"availability": "Mon - Morning"}), ["Alice Smith", "Bob Johnson"])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.monday.counsellors.clear()
+        self.assertEqual(self.names({"availability": "Mon - Morning"}), [])
+
+
+class CounsellorFacetsTests(TwoCounsellorsMixin, APITestCase):
+    """Facet counts per specialization, availability slot and fee bucket."""
+
+    def setUp(self):
+        super().setUp()
+        self.spec_cbt = Specialization.objects.create(name="CBT")
+        self.friday = AvailabilitySlot.objects.create(name="Fri - Morning")
+        self.profile2.specializations.add(self.spec_cbt)
+        self.profile2.availability.add(self.friday)
+        self.facets_url = reverse("search-counsellor-facets")
+
+    def counts(self, data, facet):
+        return {row["name"]: row["count"] for row in data[facet]}
+
+    def test_counts(self):
+        data = self.client.get(self.facets_url).data
+        self.assertEqual(data["count"], 2)
+        self.assertEqual(self.counts(data, "specializations"), {"Anxiety": 1, "CBT": 1})
+        self.assertEqual(self.counts(data, "availability"), {"Fri - Morning": 1})
+        self.assertEqual([b["count"] for b in data["fees"]], [0, 2, 0, 0, 0])
+        self.assertEqual((data["fees"][-1]["min"], data["fees"][-1]["max"]), (2000, None))
+
+    def test_facet_ignores_its_own_filter(self):
+        data = self.client.get(self.facets_url, {"specialization": "Anxiety", "max_fee": 600}).data
+        self.assertEqual(data["count"], 1)
+        # specialization counts still apply the fee filter, but not the specialization one
+        self.assertEqual(self.counts(data, "specializations"), {"Anxiety": 1, "CBT": 0})
+        self.assertEqual(self.counts(data, "availability"), {"Fri - Morning": 0})
+        self.assertEqual([b["count"] for b in data["fees"]], [0, 1, 0, 0, 0])
+
+    def test_query_filter(self):
+        data = self.client.get(self.facets_url, {"q": "bob"}).data
+        self.assertEqual(data["count"], 1)
+        self.assertEqual(self.counts(data, "specializations"), {"Anxiety": 0, "CBT": 1})
+
+    def test_invalid_fee(self):
+        data = self.client.get(self.facets_url, {"min_fee": "abc"}).data
+        self.assertEqual(data["count"], 0)
+
+
+class CounsellorSearchCacheTests(TwoCounsellorsMixin, APITestCase):
+    """Anonymous search pages are cached until a relevant write bumps the generation."""
+
+    def test_repeat_search_skips_the_database(self):
+        first = self.client.get(self.url, {"ordering": "fees_asc", "page_size": 1})
+        with self.assertNumQueries(0):
+            second = self.client.get(self.url, {"page_size": "1", "ordering": "FEES_ASC"})
+        self.assertEqual(first.data["results"], second.data["results"])
+        # links are rendered per request, not replayed from the cache
+        self.assertIn("ordering=FEES_ASC", second.data["next"])
+
+    def test_profile_save_invalidates_cached_pages(self):
+        self.client.get(self.url, {"ordering": "fees_asc"})
+        with self.captureOnCommitCallbacks(execute=True):
+            self.profile2.fees_per_session = 100
+            self.profile2.save()
+        res = self.client.get(self.url, {"ordering": "fees_asc"})
+        self.assertEqual(res.data["results"][0]["full_name"], "Bob Johnson")
+
+    def test_pages_are_retired_after_commit(self):
+        from apps.search.cache import RESPONSE_GENERATION, get_generation
+        before = get_generation(RESPONSE_GENERATION)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.profile2.fees_per_session = 100
+            self.profile2.save()
+            # a search before the commit would read the old rows; they must not be cached as new
+            self.assertEqual(get_generation(RESPONSE_GENERATION), before)
+        self.assertEqual(get_generation(RESPONSE_GENERATION), before + 1)
+
+    def test_availability_change_invalidates_cached_pages(self):
+        from apps.accounts.models import AvailabilitySlot
+        self.client.get(self.url, {"q": "alice"})
+        with self.captureOnCommitCallbacks(execute=True):
+            slot = AvailabilitySlot.objects.create(name="Mon - Morning")
+            self.profile1.availability.add(slot)
+        res = self.client.get(self.url, {"q": "alice"})
+        self.assertEqual(res.data["results"][0]["availability"], [{"id": slot.id, "name": "Mon - Morning"}])
+
+    def test_login_does_not_invalidate_cached_pages(self):
+        self.client.get(self.url)
+        self.user1.last_login = timezone.now()
+        self.user1.save(update_fields=["last_login"])
+        with self.assertNumQueries(0):
+            self.client.get(self.url)
+
+
+class CounsellorSearchCursorTests(APITestCase):
+    """Keyset pagination over the index ordering."""
+
+    def setUp(self):
+        search_index.reset()
+        cache.clear()
+        fees = [700, 300, 300, 900, 500]
+        names = ["Eve", "Cara", "Ann", "Dan", "Ben"]
+        for i, (fee, name) in enumerate(zip(fees, names)):
+            user = User.objects.create_user(
+                email=f"k{i}@example.com", first_name=name, last_name="Doe",
+                role="counsellor", is_active=True
+            )
+            CounsellorProfile.objects.create(user=user, fees_per_session=fee, license_number=f"LICK{i}")
+        self.url = reverse("search-counsellors")
+
+    def walk(self, ordering):
+        names, url = [], None
+        res = self.client.get(self.url, {"pagination": "cursor", "ordering": ordering, "page_size": 2})
+        while True:
+            self.assertEqual(res.status_code, 200)
+            self.assertNotIn("count", res.data)
+            names += [r["user"]["first_name"] for r in res.data["results"]]
+            url = res.data["next"]
+            if not url:
+                return names, res
+            res = self.client.get(url)
+
+    def test_walk_every_ordering(self):
+        # equal fees fall back to creation (id) order
+        self.assertEqual(self.walk("fees_asc")[0], ["Cara", "Ann", "Ben", "Eve", "Dan"])
+        self.assertEqual(self.walk("fees_desc")[0], ["Dan", "Eve", "Ben", "Ann", "Cara"])
+        self.assertEqual(self.walk("name_asc")[0], ["Ann", "Ben", "Cara", "Dan", "Eve"])
+        self.assertEqual(self.walk("name_desc")[0], ["Eve", "Dan", "Cara", "Ben", "Ann"])
+
+    def test_previous_link(self):
+        _, last = self.walk("fees_asc")
+        res = self.client.get(last.data["previous"])
+        self.assertEqual([r["user"]["first_name"] for r in res.data["results"]], ["Ben", "Eve"])
+
+    def test_cursor_is_stable_across_inserts(self):
+        first = self.client.get(self.url, {"pagination": "cursor", "ordering": "name_asc", "page_size": 2})
+        user = User.objects.create_user(email="k9@example.com", first_name="Aaron", role="counsellor", is_active=True)
+        CounsellorProfile.objects.create(user=user, fees_per_session=100, license_number="LICK9")
+        res = self.client.get(first.data["next"])
+        self.assertEqual([r["user"]["first_name"] for r in res.data["results"]], ["Cara", "Dan"])
+
+    def test_invalid_cursor(self):
+        res = self.client.get(self.url, {"cursor": "not-a-cursor"})
+        self.assertEqual(res.status_code, 404)
+
+
+class CounsellorSparseFieldsTests(TwoCounsellorsMixin, APITestCase):
+    """?fields= and ?view=card render (and load) only part of each row."""
+
+    def test_card_view(self):
+        self.client.get(self.url)  # build the index
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.get(self.url, {"view": "card"})
+        self.assertEqual(
+            set(res.data["results"][0]),
+            {"id", "full_name", "profile_picture", "specializations", "fees_per_session"},
+        )
+        self.assertEqual(res.data["results"][0]["specializations"], [{"id": self.spec_anxiety.id, "name": "Anxiety"}])
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn("availability", queries[0]["sql"])
+
+    def test_fields(self):
+        res = self.client.get(self.url, {"fields": "user,full_name,bogus"})
+        self.assertEqual(list(res.data["results"][0]), ["id", "full_name", "user"])
+        self.assertEqual(res.data["results"][0]["user"]["email"], "c1@example.com")
+
+    def test_cached_pages_are_per_fieldset(self):
+        self.client.get(self.url, {"view": "card"})
+        res = self.client.get(self.url)
+        self.assertIn("availability", res.data["results"][0])
+
+
+class CounsellorFullTextSearchTests(TwoCounsellorsMixin, APITestCase):
+    """q also matches bio, experience and specialization words through the full-text table."""
+
+    def setUp(self):
+        super().setUp()
+        self.profile2.bio = "I work with anxious teenagers and their families."
+        self.profile2.experience = "12 years of trauma counselling"
+        self.profile2.save()
+
+    def names(self, res):
+        return [r["full_name"] for r in res.data["results"]]
+
+    def test_matches_bio_and_experience(self):
+        self.assertEqual(self.names(self.client.get(self.url, {"q": "teenagers"})), ["Bob Johnson"])
+        self.assertEqual(self.names(self.client.get(self.url, {"q": "trauma"})), ["Bob Johnson"])
+
+    def test_matches_specialization(self):
+        self.assertEqual(self.names(self.client.get(self.url, {"q": "anxiety"})), ["Alice Smith"])
+
+    def test_relevance_ordering(self):
+        self.profile2.bio = "Anxiety is one of many things I treat."
+        self.profile2.save()
+        res = self.client.get(self.url, {"q": "anxiety", "ordering": "relevance"})
+        # a specialization hit outranks the same word in a bio
+        self.assertEqual(self.names(res), ["Alice Smith", "Bob Johnson"])
+
+    def test_document_follows_writes(self):
+        self.profile2.bio = "Mindfulness based practice."
+        self.profile2.save()
+        self.assertEqual(self.client.get(self.url, {"q": "teenagers"}).data["count"], 0)
+        self.assertEqual(self.client.get(self.url, {"q": "mindfulness"}).data["count"], 1)
+
+        self.spec_anxiety.name = "Panic"
+        self.spec_anxiety.save()
+        self.assertEqual(self.names(self.client.get(self.url, {"q": "panic"})), ["Alice Smith"])
+
+
+class CounsellorSearchRowTests(TwoCounsellorsMixin, APITestCase):
+    """Result pages are read from the flattened CounsellorSearchRow table."""
+
+    def test_page_is_one_query(self):
+        self.client.get(self.url)  # build the index
+        with self.assertNumQueries(1):
+            res = self.client.get(self.url, {"ordering": "fees_desc"})
+        self.assertEqual(res.data["results"][1]["specializations"], [{"id": self.spec_anxiety.id, "name": "Anxiety"}])
+        self.assertEqual(res.data["results"][1]["user"]["id"], self.user1.id)
+
+    def test_option_changes_are_reflected(self):
+        slot = AvailabilitySlot.objects.create(name="Mon - Morning")
+        self.profile1.availability.add(slot)
+        self.spec_anxiety.name = "Panic"
+        self.spec_anxiety.save()
+        row = CounsellorSearchRow.objects.get(pk=self.profile1.pk)
+        self.assertEqual(row.specializations, [{"id": self.spec_anxiety.id, "name": "Panic"}])
+        self.assertEqual(row.availability, [{"id": slot.id, "name": "Mon - Morning"}])
+
+        slot.delete()
+        self.spec_anxiety.delete()
+        row.refresh_from_db()
+        self.assertEqual((row.specializations, row.availability), ([], []))
+
+    def test_user_change_is_reflected(self):
+        self.user2.phone = "9876543210"
+        self.user2.save(update_fields=["phone"])
+        self.assertEqual(CounsellorSearchRow.objects.get(pk=self.profile2.pk).phone, "9876543210")
+
+    def test_missing_row_is_built_without_writing(self):
+        CounsellorSearchRow.objects.all().delete()
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.get(self.url)
+        self.assertEqual([r["full_name"] for r in res.data["results"]], ["Alice Smith", "Bob Johnson"])
+        # a GET never writes: backfilling is left to the signals and the rebuild command
+        self.assertFalse([q["sql"] for q in queries if not q["sql"].startswith("SELECT")])
+        self.assertEqual(CounsellorSearchRow.objects.count(), 0)
+
+
+class OptionListCachingTests(APITestCase):
+    """Specialization / availability lists are cached per process and revalidated via ETag."""
+
+    def setUp(self):
+        cache.clear()
+        self.spec = Specialization.objects.create(name="Anxiety")
+        self.url = reverse("specializations-list")
+
+    def test_repeat_request_skips_the_database(self):
+        first = self.client.get(self.url)
+        self.assertEqual(first.data, [{"id": self.spec.id, "name": "Anxiety"}])
+        self.assertIn("max-age=", first["Cache-Control"])
+        with self.assertNumQueries(0):
+            second = self.client.get(self.url)
+        self.assertEqual(second["ETag"], first["ETag"])
+
+    def test_etag_depends_on_the_rows_only(self):
+        from apps.search.cache import OPTIONS_GENERATION
+        etag = self.client.get(self.url)["ETag"]
+        # another worker, or this one after an eviction, has a different generation
+        cache.delete(OPTIONS_GENERATION)
+        res = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_not_modified(self):
+        etag = self.client.get(self.url)["ETag"]
+        res = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(res["ETag"], etag)
+
+    def test_admin_save_changes_the_etag(self):
+        etag = self.client.get(self.url)["ETag"]
+        with self.captureOnCommitCallbacks(execute=True):
+            self.spec.name = "Panic"
+            self.spec.save()
+        res = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data[0]["name"], "Panic")
+
+        AvailabilitySlot.objects.create(name="Mon - Morning")
+        res = self.client.get(reverse("availability-list"))
+        self.assertEqual([row["name"] for row in res.data], ["Mon - Morning"])
+
+
+class PrefixTrieTests(SimpleTestCase):
+
+    def test_complete_in_key_order(self):
+        trie = PrefixTrie()
+        for key, value in (("anna", 1), ("ann", 2), ("anton", 3), ("bea", 4)):
+            trie.insert(key, value)
+        self.assertEqual(trie.complete("an", 10), [2, 1, 3])
+        self.assertEqual(trie.complete("an", 2), [2, 1])
+        self.assertEqual(trie.complete("x", 10), [])
+
+    def test_remove_prunes(self):
+        trie = PrefixTrie()
+        trie.insert("ann", 1)
+        trie.insert("anna", 2)
+        trie.remove("anna", 2)
+        self.assertEqual(trie.complete("a", 10), [1])
+        trie.remove("ann", 1)
+        self.assertEqual(trie._root.children, {})
+
+
+class SuggestTests(TwoCounsellorsMixin, APITestCase):
+    """Typeahead over counsellor and specialization names."""
+
+    def setUp(self):
+        super().setUp()
+        Specialization.objects.create(name="Stress Management")
+        self.suggest_url = reverse("search-suggest")
+
+    def labels(self, q, **params):
+        res = self.client.get(self.suggest_url, {"q": q, **params})
+        return [(r["type"], r["label"]) for r in res.data["results"]]
+
+    def test_prefixes(self):
+        self.assertEqual(self.labels("al"), [("counsellor", "Alice Smith")])
+        self.assertEqual(self.labels("SMI"), [("counsellor", "Alice Smith")])
+        self.assertEqual(self.labels("alice s"), [("counsellor", "Alice Smith")])
+        self.assertEqual(self.labels("an"), [("specialization", "Anxiety")])
+        self.assertEqual(self.labels("manag"), [("specialization", "Stress Management")])
+        self.assertEqual(self.labels(""), [])
+
+    def test_limit_and_ids(self):
+        res = self.client.get(self.suggest_url, {"q": "a", "limit": 1})
+        self.assertEqual(res.data["results"], [
+            {"type": "counsellor", "id": self.profile1.id, "label": "Alice Smith"},
+            {"type": "specialization", "id": self.spec_anxiety.id, "label": "Anxiety"},
+        ])
+
+    def test_warm_lookup_skips_the_database(self):
+        self.labels("a")
+        with self.assertNumQueries(0):
+            self.labels("b")
+
+    def test_rename_is_reflected(self):
+        self.labels("a")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user2.first_name = "Robert"
+            self.user2.save(update_fields=["first_name"])
+        self.assertEqual(self.labels("rob"), [("counsellor", "Robert Johnson")])
+        self.assertEqual(self.labels("bob"), [])
+
+
+class FastListSerializerTests(TwoCounsellorsMixin, APITestCase):
+    """The compiled list path renders exactly what DRF renders."""
+
+    class ProfileSerializer(serializers.ModelSerializer):
+        email = serializers.EmailField(source="user.email")
+        picture = serializers.CharField(source="user.profile_picture")
+        name = serializers.CharField(source="user.get_full_name")
+        specializations = SpecializationSimpleSerializer(many=True)
+        label = serializers.SerializerMethodField()
+
+        class Meta:
+            model = CounsellorProfile
+            fields = ("id", "user", "email", "picture", "name", "fees_per_session", "is_approved",
+                      "created_at", "specializations", "label")
+            list_serializer_class = FastListSerializer
+
+        def get_label(self, obj):
+            return f"#{obj.pk}"
+
+    def test_matches_drf(self):
+        rows = list(CounsellorProfile.objects.select_related("user").order_by("id"))
+        drf = ListSerializer(rows, child=self.ProfileSerializer()).data
+        self.assertEqual(self.ProfileSerializer(rows, many=True).data, drf)
+        self.assertEqual(drf[0]["name"], "Alice Smith")
+        self.assertIsNone(drf[0]["picture"])
+
+    def test_falls_back_where_fields_differ_from_the_shortcuts(self):
+        class Upper(serializers.CharField):
+            def get_attribute(self, instance):
+                return instance["name"].upper()
+
+        class DictSerializer(serializers.Serializer):
+            flag = serializers.BooleanField()
+            kind = serializers.ChoiceField(choices=[(1, "one"), (2, "two")])
+            fee = serializers.DecimalField(max_digits=8, decimal_places=2, normalize_output=True)
+            raw_fee = serializers.DecimalField(max_digits=8, decimal_places=2, coerce_to_string=False)
+            shout = Upper()
+
+            class Meta:
+                list_serializer_class = FastListSerializer
+
+        class Overriding(DictSerializer):
+            def to_representation(self, instance):
+                data = super().to_representation(instance)
+                data["extra"] = True
+                return data
+
+            class Meta:
+                list_serializer_class = FastListSerializer
+
+        rows = [
+            {"flag": "false", "kind": "2", "fee": Decimal("12.50"), "raw_fee": "3.456", "name": "ann"},
+            {"flag": 0, "kind": 1, "fee": Decimal("7"), "raw_fee": 1, "name": "bo"},
+        ]
+        for serializer_class in (DictSerializer, Overriding):
+            drf = ListSerializer(rows, child=serializer_class()).data
+            self.assertEqual(serializer_class(rows, many=True).data, drf, serializer_class.__name__)
+        self.assertEqual(drf[0]["flag"], False)
+        self.assertEqual(drf[0]["fee"], "12.5")
+        self.assertEqual(drf[0]["shout"], "ANN")
+        self.assertTrue(drf[0]["extra"])
+
+    def test_counsellor_search_rows(self):
+        rows = list(CounsellorSearchRow.objects.order_by("pk"))
+        for fields in (None, CounsellorSearchSerializer.CARD_FIELDS):
+            drf = ListSerializer(rows, child=CounsellorSearchSerializer(fields=fields)).data
+            self.assertEqual(CounsellorSearchSerializer(rows, many=True, fields=fields).data, drf)
+
+    def test_benchmark_command(self):
+        out = StringIO()
+        call_command("benchmark_serializers", rows=5, repeat=1, stdout=out)
+        self.assertIn("CounsellorSearchSerializer", out.getvalue())
+        self.assertIn("x", out.getvalue())
+
+
+class SearchQueryPlanTests(TwoCounsellorsMixin, QueryPlanAssertions, TestCase):
+    """A search page, however it was filtered, is a primary-key read of CounsellorSearchRow."""
+
+    def page_queryset(self, **params):
+        view = CounsellorSearchView()
+        view.request = Request(APIRequestFactory().get("/api/search/counsellors/", params))
+        page_ids = view.search_ids()[:10]
+        self.assertTrue(page_ids)
+        return view.page_queryset(page_ids)
+
+    def test_page_rows(self):
+        for params in (
+            {}, {"q": "alice"}, {"specialization": "Anxiety", "min_fee": "100", "ordering": "fees_desc"},
+            {"ordering": "recommended", "view": "card"}, {"q": "smith", "fields": "id,full_name"},
+        ):
+            with self.subTest(**params):
+                self.assertIndexedPlan(self.page_queryset(**params))
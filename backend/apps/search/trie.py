@@ -0,0 +1,109 @@
+"""
+Prefix trie for search-box suggestions.
+
+Keys are lower-cased strings, values are hashable ids; a key can hold several
+values (two counsellors with the same name). complete() walks the subtree under
+a prefix in key order and stops as soon as it has ``limit`` distinct values,
+so a lookup costs the prefix length plus the few nodes it visits -- never the
+size of the trie.
+"""
+import re
+
+from .cache import option_list
+
+
+def normalize(text):
+    """Lower-case words joined by single spaces ("Child & Adolescent" -> "child adolescent")."""
+    return " ".join(re.findall(r"\w+", text.lower()))
+
+
+def word_keys(text):
+    """
+    Keys to insert for a label: the label from each word on, so "Stress
+    Management" is found by "str" and by "man".
+    """
+    words = normalize(text).split(" ")
+    return [" ".join(words[i:]) for i in range(len(words)) if words[i]]
+
+
+class _Node:
+    __slots__ = ("children", "values")
+
+    def __init__(self):
+        self.children = {}
+        self.values = None  # set of values ending here, created on demand
+
+
+class PrefixTrie:
+
+    def __init__(self):
+        self._root = _Node()
+
+    def insert(self, key, value):
+        node = self._root
+        for char in key.lower():
+            node = node.children.setdefault(char, _Node())
+        if node.values is None:
+            node.values = set()
+        node.values.add(value)
+
+    def remove(self, key, value):
+        path = [self._root]
+        for char in key.lower():
+            node = path[-1].children.get(char)
+            if node is None:
+                return
+            path.append(node)
+        node = path[-1]
+        if node.values:
+            node.values.discard(value)
+            if not node.values:
+                node.values = None
+        # prune branches that no longer lead to a value
+        for char, (parent, child) in zip(reversed(key.lower()), reversed(list(zip(path, path[1:])))):
+            if child.values or child.children:
+                break
+            del parent.children[char]
+
+    def complete(self, prefix, limit):
+        """Return up to ``limit`` distinct values whose key starts with ``prefix``, in key order."""
+        node = self._root
+        for char in prefix.lower():
+            node = node.children.get(char)
+            if node is None:
+                return []
+        found, seen = [], set()
+        stack = [node]
+        while stack and len(found) < limit:
+            node = stack.pop()
+            for value in sorted(node.values or ()):
+                if value not in seen:
+                    seen.add(value)
+                    found.append(value)
+                    if len(found) == limit:
+                        break
+            # push in reverse so the smallest child is visited first
+            stack.extend(node.children[char] for char in sorted(node.children, reverse=True))
+        return found
+
+
+# option table -> (etag, trie, labels); rebuilt when the option list changes
+_option_tries = {}
+
+
+def option_trie(model):
+    """
+    Return (trie, {id: name}) over an option table's names, shared per process
+    and rebuilt whenever option_list() hands out a new ETag.
+    """
+    rows, etag = option_list(model)
+    label = model._meta.label
+    cached = _option_tries.get(label)
+    if cached is None or cached[0] != etag:
+        trie = PrefixTrie()
+        for row in rows:
+            for key in word_keys(row["name"]):
+                trie.insert(key, row["id"])
+        cached = (etag, trie, {row["id"]: row["name"] for row in rows})
+        _option_tries[label] = cached
+    return cached[1], cached[2]
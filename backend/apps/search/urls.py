@@ -1,7 +1,9 @@
 from django.urls import path
-from .views import CounsellorSearchView , list_availability, list_specializations
+from .views import CounsellorSearchView , list_availability, list_specializations, counsellor_facets, suggest
 urlpatterns = [
     path("counsellors/", CounsellorSearchView.as_view(), name="search-counsellors"),
+    path("counsellors/facets/", counsellor_facets, name="search-counsellor-facets"),
+    path("suggest/", suggest, name="search-suggest"),
     path("specializations/", list_specializations, name="specializations-list"),
     path("availability/", list_availability, name="availability-list"),
 ]
@@ -1,93 +1,271 @@
 from decimal import Decimal, InvalidOperation
-from django.db.models import Q
+from django.core.cache import cache
+from django.utils.cache import patch_cache_control
+from django.utils.http import parse_etags
+from rest_framework import status
 from rest_framework.generics import ListAPIView
 from rest_framework.permissions import AllowAny
 
-from apps.accounts.models import CounsellorProfile
+from .models import CounsellorSearchRow
 from .serializers import CounsellorSearchSerializer
-from .pagination import StandardResultsSetPagination
+from .pagination import StandardResultsSetPagination, CounsellorCursorPagination, CursorPaginationOptInMixin
+from .index import search_index
+from .fulltext import get_engine
+from .trie import option_trie, normalize
+from .cache import (
+    search_response_key, facets_response_key, response_cache_timeout, fee_buckets, split_names, match_all,
+    option_list, option_list_max_age,
+)
 from rest_framework.decorators import api_view
 from apps.accounts.models import Specialization, AvailabilitySlot
 from rest_framework.response import Response
 from rest_framework.decorators import api_view, permission_classes
 
+SUGGEST_LIMIT = 8
+SUGGEST_MAX_LIMIT = 20
+
+def search_filters(params):
+    """
+    Translate search query params into search_index filter kwargs.
+
+    Returns None when a fee bound is invalid (the search matches nothing).
+    """
+    # name / email search
+    q = (params.get("q") or "").strip()
+
+    # fee range
+    try:
+        min_fee = Decimal(params["min_fee"]) if params.get("min_fee") else None
+        max_fee = Decimal(params["max_fee"]) if params.get("max_fee") else None
+    except (InvalidOperation, ValueError):
+        return None
+    if any(fee is not None and not fee.is_finite() for fee in (min_fee, max_fee)):
+        return None
+
+    return {
+        "q": q,
+        "min_fee": min_fee,
+        "max_fee": max_fee,
+        # bio / experience / specialization words come from the full-text engine
+        "scores": get_engine().search(q) if q else None,
+        # specialization / availability filters (comma-separated NAMES, case-insensitive)
+        "specializations": split_names(params.get("specialization")),
+        "availability": split_names(params.get("availability")),
+        "match_all_specializations": match_all(params.get("specialization_match")),
+        "match_all_availability": match_all(params.get("availability_match")),
+    }
+
+
+def option_list_response(request, model):
+    """
+    Serve an option table from the per-process cache with a strong ETag;
+    a matching If-None-Match gets an empty 304.
+    """
+    rows, etag = option_list(model)
+    if etag in parse_etags(request.headers.get("If-None-Match", "")):
+        response = Response(status=status.HTTP_304_NOT_MODIFIED)
+    else:
+        response = Response(rows)
+    response["ETag"] = etag
+    # browsers/CDNs may reuse the list, but must revalidate once it is stale
+    patch_cache_control(response, public=True, max_age=option_list_max_age(), must_revalidate=True)
+    return response
+
 @api_view(['GET'])
 @permission_classes([AllowAny])
 def list_specializations(request):
-    qs = Specialization.objects.all().values('id', 'name')
-    return Response(qs)
+    return option_list_response(request, Specialization)
 
 @api_view(['GET'])
 @permission_classes([AllowAny])
 def list_availability(request):
-    qs = AvailabilitySlot.objects.all().values('id', 'name')
-    return Response(qs)
+    return option_list_response(request, AvailabilitySlot)
+
+def _option_facets(options, counts):
+    return [
+        {"id": option["id"], "name": option["name"], "count": counts.get(option["name"].lower(), 0)}
+        for option in options
+    ]
+
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def counsellor_facets(request):
+    """
+    GET /api/search/counsellors/facets/
+    Takes the filter params of CounsellorSearchView and returns how many
+    counsellors match per specialization, availability slot and fee bucket.
+    Each facet ignores its own filter, e.g. with specialization=Anxiety the
+    specialization counts still cover every specialization.
+    """
+    cache_key = None
+    if not request.user.is_authenticated:
+        cache_key = facets_response_key(request.query_params)
+        cached = cache.get(cache_key)
+        if cached is not None:
+            return Response(cached)
+
+    bounds = fee_buckets()
+    filters = search_filters(request.query_params)
+    if filters is None:
+        counts = {"total": 0, "specializations": {}, "availability": {}, "fees": [0] * len(bounds)}
+    else:
+        counts = search_index.facets(fee_buckets=bounds, **filters)
 
-class CounsellorSearchView(ListAPIView):
+    data = {
+        "count": counts["total"],
+        "specializations": _option_facets(option_list(Specialization)[0], counts["specializations"]),
+        "availability": _option_facets(option_list(AvailabilitySlot)[0], counts["availability"]),
+        "fees": [
+            {"min": low, "max": bounds[i + 1] if i + 1 < len(bounds) else None, "count": count}
+            for i, (low, count) in enumerate(zip(bounds, counts["fees"]))
+        ],
+    }
+    if cache_key is not None:
+        cache.set(cache_key, data, response_cache_timeout())
+    return Response(data)
+
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def suggest(request):
+    """
+    GET /api/search/suggest/?q=<prefix>&limit=<k>
+    Typeahead for the search box: counsellors and specializations with a word
+    starting with q, as {"type", "id", "label"} (the id is the profile id for
+    counsellors). Answered from in-memory prefix tries without touching the DB.
+    """
+    prefix = normalize(request.query_params.get("q") or "")
+    try:
+        limit = int(request.query_params.get("limit") or SUGGEST_LIMIT)
+    except ValueError:
+        limit = SUGGEST_LIMIT
+    limit = min(max(limit, 1), SUGGEST_MAX_LIMIT)
+    if not prefix:
+        return Response({"results": []})
+
+    results = [
+        {"type": "counsellor", "id": pk, "label": label}
+        for pk, label in search_index.suggest(prefix, limit)
+    ]
+    trie, names = option_trie(Specialization)
+    results += [
+        {"type": "specialization", "id": pk, "label": names[pk]}
+        for pk in trie.complete(prefix, limit)
+    ]
+    return Response({"results": results})
+
+
+class CounsellorSearchView(CursorPaginationOptInMixin, ListAPIView):
     """
     GET /api/search/counsellors/
     Query params:
-      - q              : search string for first_name/last_name/email
+      - q              : search string; substring of first_name/last_name/email,
+                         or full-text words from bio, experience and specializations
       - specialization : comma-separated specialization NAMES (e.g. Anxiety,Depression)
+      - availability   : comma-separated availability slot NAMES (e.g. Mon - Morning)
+      - specialization_match / availability_match : any (default) | all
       - min_fee        : decimal
       - max_fee        : decimal
-      - ordering       : fees_asc | fees_desc | name_asc | name_desc
+      - ordering       : fees_asc | fees_desc | name_asc | name_desc | relevance
+                         | recommended (precomputed score, see apps.search.recommend)
       - page, page_size for pagination
+      - pagination=cursor / cursor : keyset pagination without a total count
+        (for infinite scroll); follow the returned next/previous links
+      - fields=a,b / view=card : render only these fields (card: id, full_name,
+        profile_picture, specializations, fees_per_session)
+
+    Filtering and ordering are answered by the in-memory search index
+    (apps.search.index); the rows of the requested page are then read from the
+    flattened CounsellorSearchRow table in one query.
+    Anonymous responses are cached per normalized query (apps.search.cache).
     """
     serializer_class = CounsellorSearchSerializer
     pagination_class = StandardResultsSetPagination
+    cursor_pagination_class = CounsellorCursorPagination
     permission_classes = [AllowAny]
 
     def get_queryset(self):
-        qs = (
-            CounsellorProfile.objects
-            .select_related("user")
-            .prefetch_related("specializations", "availability")
-            .filter(user__is_active=True)
-        )
+        # base queryset used to load the rows of the current page
+        fields = self.requested_fields()
+        if fields is None:
+            return CounsellorSearchRow.objects.all()
+        return CounsellorSearchRow.objects.only(*CounsellorSearchSerializer.columns_for(fields))
 
+    def requested_fields(self):
+        """
+        Fields asked for with ?fields=a,b or ?view=card, in serializer order;
+        None means every field. Unknown names are ignored and id is always kept.
+        """
         params = self.request.query_params
+        if params.get("fields"):
+            wanted = set(split_names(params["fields"])) | {"id"}
+        elif (params.get("view") or "").lower() == "card":
+            wanted = set(CounsellorSearchSerializer.CARD_FIELDS)
+        else:
+            return None
+        return tuple(name for name in CounsellorSearchSerializer.Meta.fields if name in wanted)
+
+    def get_serializer(self, *args, **kwargs):
+        kwargs.setdefault("fields", self.requested_fields())
+        return super().get_serializer(*args, **kwargs)
+
+    def search_ordering(self):
+        ordering = (self.request.query_params.get("ordering") or "").lower()
+        if ordering in ("fees_asc", "fees_desc", "name_desc", "relevance", "recommended"):
+            return ordering
+        return "name_asc"
+
+    def search_ids(self, with_keys=False):
+        """Resolve the query params to an ordered list of profile ids via the search index."""
+        filters = search_filters(self.request.query_params)
+        if filters is None:
+            return []
+        return search_index.search(ordering=self.search_ordering(), with_keys=with_keys, **filters)
+
+    def page_queryset(self, page_ids):
+        """The rows of one page of search results (in any order)."""
+        return self.get_queryset().filter(pk__in=page_ids)
 
-        # name / email search
-        q = (params.get("q") or "").strip()
-        if q:
-            qs = qs.filter(
-                Q(user__first_name__icontains=q)
-                | Q(user__last_name__icontains=q)
-                | Q(user__email__icontains=q)
+    def serialize_page(self, page_ids):
+        rows = {row.pk: row for row in self.page_queryset(page_ids)}
+        missing = [pk for pk in page_ids if pk not in rows]
+        if missing:
+            # rows not written yet (e.g. data loaded around the signals): build them for this
+            # response only; writing them is left to the signals and rebuild_counsellor_search_rows
+            rows.update((row.pk, row) for row in CounsellorSearchRow.objects.build(missing))
+        # keep the index ordering; skip rows deleted since the index was read
+        page = [rows[pk] for pk in page_ids if pk in rows]
+        return self.get_serializer(page, many=True).data
+
+    def list(self, request, *args, **kwargs):
+        if self.uses_cursor_pagination():
+            # cursor pages are positioned by sort key, so ask the index for keys
+            page_ids = self.paginate_queryset(self.search_ids(with_keys=True))
+            return self.get_paginated_response(self.serialize_page(page_ids))
+
+        # anonymous searches are served from a response cache keyed on the
+        # normalized params; the key embeds a generation that signals bump
+        cache_key = None
+        if not request.user.is_authenticated:
+            cache_key = search_response_key(
+                request.query_params, self.search_ordering(), self.paginator.get_page_size(request),
+                self.requested_fields(),
             )
+            cached = cache.get(cache_key)
+            if cached is not None:
+                count, count_exact, page_number, page_size, results = cached
+                self.paginator.restore_page(request, count, page_number, page_size, count_exact)
+                return self.get_paginated_response(results)
 
-        # specialization filter (accepts comma-separated NAMES, case-insensitive)
-        spec = (params.get("specialization") or "").strip()
-        if spec:
-            names = [s.strip() for s in spec.split(",") if s.strip()]
-            if names:
-                # build OR queries using case-insensitive exact match for each name
-                name_q = Q()
-                for name in names:
-                    name_q |= Q(specializations__name__iexact=name)
-                qs = qs.filter(name_q)
-
-        # fee range
-        min_fee = params.get("min_fee")
-        max_fee = params.get("max_fee")
-        try:
-            if min_fee:
-                qs = qs.filter(fees_per_session__gte=Decimal(min_fee))
-            if max_fee:
-                qs = qs.filter(fees_per_session__lte=Decimal(max_fee))
-        except (InvalidOperation, ValueError):
-            return qs.none()
-
-        # ordering
-        ordering = (params.get("ordering") or "").lower()
-        if ordering == "fees_asc":
-            qs = qs.order_by("fees_per_session")
-        elif ordering == "fees_desc":
-            qs = qs.order_by("-fees_per_session")
-        elif ordering == "name_desc":
-            qs = qs.order_by("-user__first_name", "-user__last_name")
-        else:
-            qs = qs.order_by("user__first_name", "user__last_name")
+        page_ids = self.paginate_queryset(self.search_ids())
+        data = self.serialize_page(page_ids)
 
-        return qs.distinct()
+        if cache_key is not None:
+            page = self.paginator.page
+            cache.set(
+                cache_key,
+                (page.paginator.count, self.paginator.count_exact, page.number, page.paginator.per_page, data),
+                response_cache_timeout(),
+            )
+        return self.get_paginated_response(data)